@@ -0,0 +1,87 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from common import ROOT
+
+from utils.access_log import AccessLog, note
+
+# What the access log costs a request: begin() + note() + record() with the
+# writer stopped (the disabled fast path) and running, how many records per
+# second the writer gets to disk, and how many a burst from several threads
+# loses to the bounded queue.
+
+
+def per_call_ns(log: AccessLog, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        log.begin()
+        note(app_ids=('PCDesktopClient',), flags=10)
+        log.record('/api/check', 'POST', 200, 0.0012, 42)
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def burst(log: AccessLog, threads: int, per_thread: int) -> dict:
+    def produce():
+        for _ in range(per_thread):
+            log.begin()
+            log.record('/api/application/<app_id>', 'GET', 200, 0.0004, 42)
+
+    written, dropped = log.written, log.dropped
+    workers = [threading.Thread(target=produce) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    produced = time.perf_counter() - start
+    log.stop()
+    elapsed = time.perf_counter() - start
+    return {
+        'records': threads * per_thread,
+        'produce_records_per_s': threads * per_thread / produced,
+        'written': log.written - written,
+        'dropped': log.dropped - dropped,
+        'written_records_per_s': (log.written - written) / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Access log overhead and writer throughput")
+    parser.add_argument('--calls', type=int, default=100000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--per-thread', type=int, default=50000)
+    parser.add_argument('--max-bytes', type=int, default=16 * 1024 * 1024)
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    directory = tempfile.mkdtemp(prefix='flagsman-access-log-')
+    try:
+        log = AccessLog.instance()
+        log.path = os.path.join(directory, 'requests.jsonl')
+        log.max_bytes = args.max_bytes
+
+        stopped_ns = per_call_ns(log, args.calls)
+        log.start()
+        running_ns = per_call_ns(log, args.calls)
+        log.stop()
+
+        log.start()
+        results = {
+            'stopped_ns': stopped_ns,
+            'running_ns': running_ns,
+            'burst': burst(log, args.threads, args.per_thread),
+            'files': len(os.listdir(directory)),
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    print(json.dumps({'benchmark': 'access_log', 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from common import ROOT, summarize, synthetic_flag_data
+
+from api import handlers
+from core.flag_service import FlagService
+
+
+async def run(args) -> dict:
+    service = FlagService.instance()
+    build_start = time.perf_counter()
+    service.build_cache(synthetic_flag_data(args.github_flags, args.client_flags))
+    build_s = time.perf_counter() - build_start
+
+    async def legacy():
+        flags = await service.get_application_flags(args.app)
+        json.dumps({'success': True, 'flags': [flag.to_dict() for flag in flags]})
+
+    async def prerendered(encoding):
+        await handlers.get_application_flags(args.app, encoding)
+
+    results = {}
+    cases = [("legacy_render", legacy)] + [
+        (f"prerendered_{encoding}", lambda e=encoding: prerendered(e))
+        for encoding in service.get_application_response(args.app).bodies
+    ]
+    for label, fn in cases:
+        samples = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            await fn()
+            samples.append(time.perf_counter() - start)
+        results[label] = summarize(samples)
+
+    rendered = service.get_application_response(args.app)
+    return {
+        'benchmark': 'application_response',
+        'app': args.app,
+        'build_cache_s': build_s,
+        'body_bytes': {encoding: len(body) for encoding, body in rendered.bodies.items()},
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/api/application/<app_id> response cost")
+    parser.add_argument('--app', default='ALL')
+    parser.add_argument('--runs', type=int, default=50)
+    parser.add_argument('--github-flags', type=int, default=40000)
+    parser.add_argument('--client-flags', type=int, default=2000)
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+import argparse
+import json
+import os
+import time
+
+# Read by config at import time.
+os.environ.setdefault('APPLEBLOX_RATE_LIMIT', '0')
+
+from common import ROOT, summarize
+
+from app import create_app
+from utils.event_loop import EventLoopThread
+
+
+def sample(fn, runs: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-request overhead of async_handler")
+    parser.add_argument('--runs', type=int, default=2000)
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    client = create_app().test_client()
+    loop_thread = EventLoopThread.instance()
+
+    def get_stats():
+        response = client.get('/')
+        assert response.status_code == 200
+
+    results = {'per_request_loop': sample(get_stats, args.runs)}
+
+    loop_thread.start()
+    try:
+        results['shared_loop'] = sample(get_stats, args.runs)
+    finally:
+        loop_thread.stop()
+
+    print(json.dumps({
+        'benchmark': 'async_handler',
+        'route': '/',
+        'results': results,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+from common import ROOT, summarize, synthetic_flag_data
+
+from config import VALID_APPLICATIONS
+from core.flag_service import FlagService
+
+
+async def legacy_check(service: FlagService, flags, applications):
+    # The pre-index implementation: one name set per application per call.
+    valid = set()
+    risk = service._risk_list.intersection(flags)
+    remaining = set(flags) - risk
+    for app_id in applications:
+        names = {f.name for f in await service.get_application_flags(app_id)}
+        valid.update(names.intersection(remaining))
+        remaining -= names
+    return valid, remaining, risk
+
+
+async def run(args) -> dict:
+    service = FlagService.instance()
+    flag_data = synthetic_flag_data(args.github_flags, args.client_flags)
+    service.build_cache(flag_data)
+
+    rng = random.Random(7)
+    known = list(flag_data["ALL"]["applicationSettings"])
+    payloads = []
+    for _ in range(args.runs):
+        flags = rng.sample(known, args.payload - args.payload // 5)
+        flags += [f"FFlagMissing{rng.randint(0, 10 ** 9)}" for _ in range(args.payload // 5)]
+        payloads.append(flags)
+
+    results = {}
+    for label, check in (("indexed", service.check_flags), ("legacy", lambda f, a: legacy_check(service, f, a))):
+        samples = []
+        for flags in payloads:
+            start = time.perf_counter()
+            await check(flags, VALID_APPLICATIONS)
+            samples.append(time.perf_counter() - start)
+        results[label] = summarize(samples)
+
+    return {
+        'benchmark': 'check_flags',
+        'payload_flags': args.payload,
+        'applications': len(VALID_APPLICATIONS),
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="check_flags latency with all applications")
+    parser.add_argument('--payload', type=int, default=500)
+    parser.add_argument('--runs', type=int, default=200)
+    parser.add_argument('--github-flags', type=int, default=40000)
+    parser.add_argument('--client-flags', type=int, default=2000)
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+import argparse
+import json
+import os
+import random
+import time
+
+# Read by config at import time.
+os.environ.setdefault('APPLEBLOX_RATE_LIMIT', '0')
+
+from common import ROOT, summarize, synthetic_flag_data
+
+from app import create_app
+from core.flag_service import FlagService
+from utils.event_loop import EventLoopThread
+
+# N profiles checked as N POSTs to /api/check vs one POST to
+# /api/check/batch, through the Flask app (test client, shared loop).
+
+
+def run(args) -> dict:
+    service = FlagService.instance()
+    flag_data = synthetic_flag_data(args.github_flags, args.client_flags)
+    service.build_cache(flag_data)
+    EventLoopThread.instance().start()
+    client = create_app().test_client()
+
+    rng = random.Random(7)
+    # Profiles share most of their flags, like real launcher presets.
+    common = rng.sample(list(flag_data["ALL"]["applicationSettings"]), args.payload * 2)
+    jobs = [
+        {'flags': rng.sample(common, args.payload), 'applications': [rng.choice(list(flag_data))]}
+        for _ in range(args.jobs)
+    ]
+
+    single, batch = [], []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        for job in jobs:
+            assert client.post('/api/check', json=job).status_code == 200
+        single.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        response = client.post('/api/check/batch', json=jobs)
+        lines = response.get_data().splitlines()
+        batch.append(time.perf_counter() - start)
+        assert len(lines) == len(jobs)
+
+    EventLoopThread.instance().stop()
+    return {
+        'benchmark': 'check_batch',
+        'jobs': args.jobs,
+        'flags_per_job': args.payload,
+        'results': {
+            'separate_posts': summarize(single),
+            'batch_post': summarize(batch),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/api/check per profile vs /api/check/batch")
+    parser.add_argument('--jobs', type=int, default=200)
+    parser.add_argument('--payload', type=int, default=100)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--github-flags', type=int, default=40000)
+    parser.add_argument('--client-flags', type=int, default=2000)
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    print(json.dumps(run(args), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+
+from common import synthetic_fvariables
+
+from core.fvariables import default_value, iter_fvariables_batches
+from utils.http_client import STREAM_CHUNK_SIZE
+
+
+def legacy_parse(text: str) -> dict:
+    # FlagFetcher.fetch_flags_from_github() before the streaming parser.
+    flags = {}
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if '] ' in line and line.startswith('['):
+            type_end = line.find('] ')
+            if type_end > 0:
+                flag_name = line[type_end + 2:].strip()
+                if any(flag_name.startswith(prefix) for prefix in [
+                    'DFFlag', 'FFlag', 'BFFlag', 'FInt', 'DFInt', 'FString', 'DFString'
+                ]):
+                    flags[flag_name] = default_value(flag_name)
+    return flags
+
+
+async def chunked(data: bytes):
+    for i in range(0, len(data), STREAM_CHUNK_SIZE):
+        yield data[i:i + STREAM_CHUNK_SIZE]
+
+
+async def streaming_parse(data: bytes) -> dict:
+    # Same loop as FlagFetcher._read_fvariables()
+    flags = {}
+    async for batch in iter_fvariables_batches(chunked(data)):
+        for _, name in batch:
+            flags[name] = default_value(name)
+    return flags
+
+
+def timed(fn, runs: int):
+    best = float('inf')
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FVariables.txt parse throughput")
+    parser.add_argument('--flags', type=int, default=200000)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    data = synthetic_fvariables(args.flags)
+    # The legacy path got the body as one str from response.text()
+    cases = {
+        'legacy_split': lambda: legacy_parse(data.decode('utf-8')),
+        'streaming_regex': lambda: asyncio.run(streaming_parse(data)),
+    }
+
+    results = {}
+    parsed = {}
+    for label, fn in cases.items():
+        parsed[label], best, peak = timed(fn, args.runs)
+        results[label] = {
+            'flags': len(parsed[label]),
+            'best_s': best,
+            'mb_per_s': len(data) / best / 2 ** 20,
+            'peak_mb': peak / 2 ** 20,
+        }
+
+    print(json.dumps({
+        'benchmark': 'fvariables_parse',
+        'input_mb': len(data) / 2 ** 20,
+        'identical_output': parsed['legacy_split'] == parsed['streaming_regex'],
+        'results': results,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
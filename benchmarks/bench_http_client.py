@@ -0,0 +1,80 @@
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+from common import summarize, synthetic_fvariables, synthetic_flag_data
+from upstream_stub import UpstreamStub
+
+import config
+from core.flag_fetcher import FlagFetcher
+
+# fetch_all_flags() against a local upstream that is slow, drops connections,
+# answers 503 and stalls mid-body. Run once with --retries 0 to see the old
+# single-attempt behaviour next to the configured retries.
+
+
+async def run(args) -> dict:
+    stub = UpstreamStub(
+        data=(synthetic_fvariables(args.github_flags), synthetic_flag_data(args.github_flags, 500)),
+        latency=args.latency,
+        error_rate=args.error_rate,
+        stall_rate=args.stall_rate,
+        stall=args.stall,
+        reset_rate=args.reset_rate,
+    )
+    url = await stub.start()
+    FlagFetcher.BASE_URL = f"{url}/v2/settings/application"
+    FlagFetcher.GITHUB_URL = f"{url}/FVariables.txt"
+    config.HTTP_READ_TIMEOUT = args.read_timeout
+
+    samples = []
+    complete = 0
+    try:
+        for _ in range(args.rounds):
+            # A fresh fetcher per round, so every request is a full 200 fetch.
+            fetcher = FlagFetcher()
+            fetcher._http.retries = args.retries
+            fetcher._http.backoff = args.backoff
+            start = time.perf_counter()
+            results = await fetcher.fetch_all_flags()
+            samples.append(time.perf_counter() - start)
+            await fetcher.close()
+
+            github_ok = len(results.get("ALL", {}).get("applicationSettings", {})) > 0
+            if github_ok and len(results) == len(FlagFetcher.VALID_CLIENTS):
+                complete += 1
+    finally:
+        await stub.stop()
+
+    return {
+        'benchmark': 'http_client',
+        'retries': args.retries,
+        'complete_fetches': complete,
+        'rounds': args.rounds,
+        'upstream_requests': sum(stub.requests.values()),
+        'fetch_all_flags': summarize(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="fetch_all_flags against a faulty local upstream")
+    parser.add_argument('--rounds', type=int, default=30)
+    parser.add_argument('--retries', type=int, default=config.HTTP_RETRIES)
+    parser.add_argument('--backoff', type=float, default=0.05)
+    parser.add_argument('--read-timeout', type=float, default=0.5)
+    parser.add_argument('--github-flags', type=int, default=5000)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--error-rate', type=float, default=0.1)
+    parser.add_argument('--reset-rate', type=float, default=0.05)
+    parser.add_argument('--stall-rate', type=float, default=0.05)
+    parser.add_argument('--stall', type=float, default=5.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
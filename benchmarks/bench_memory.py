@@ -0,0 +1,85 @@
+import argparse
+import gc
+import json
+import os
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Set
+
+from common import ROOT, legacy_parse_enabled, synthetic_flag_data
+
+from core.flag_index import FlagIndex
+from core.flag_service import FlagService
+
+
+@dataclass
+class LegacyFlag:
+    # models.Flag before the columnar snapshot: a regular dataclass with a
+    # __dict__, its own timestamp and an empty places set per instance.
+    name: str
+    enabled: bool
+    last_updated: datetime
+    places: Set[str] = field(default_factory=set)
+
+
+def measure(build) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        apps, _ = build()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    flags = sum(len(flags) for flags in apps.values())
+    return {
+        'flags': flags,
+        'retained_mb': current / 2 ** 20,
+        'peak_mb': peak / 2 ** 20,
+        'bytes_per_flag': current / flags if flags else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flag storage memory, legacy dataclasses vs columnar snapshot")
+    parser.add_argument('--github-flags', type=int, default=40000)
+    parser.add_argument('--client-flags', type=int, default=2000)
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    service = FlagService.instance()
+    flag_data = synthetic_flag_data(args.github_flags, args.client_flags)
+
+    def legacy():
+        apps = {}
+        for app_name, app_data in flag_data.items():
+            apps[app_name] = [
+                LegacyFlag(name=key, enabled=legacy_parse_enabled(key, value), last_updated=datetime.now())
+                for key, value in app_data["applicationSettings"].items()
+            ]
+        return apps, None
+
+    def columnar():
+        timestamp = datetime.now()
+        apps = {
+            app_name: service._build_app_flags(app_data, timestamp)
+            for app_name, app_data in flag_data.items()
+        }
+        # Includes the process-wide name table and the check index.
+        return apps, FlagIndex(apps, ())
+
+    results = {
+        'legacy_dataclasses': measure(legacy),
+        'columnar_snapshot': measure(columnar),
+    }
+
+    print(json.dumps({
+        'benchmark': 'flag_storage_memory',
+        'github_flags': args.github_flags,
+        'apps': len(flag_data),
+        'results': results,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
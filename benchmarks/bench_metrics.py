@@ -0,0 +1,76 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from common import ROOT, synthetic_flag_data
+
+from core.flag_service import FlagService
+from utils.metrics import NULL_METRIC, Histogram, timed
+
+# Cost of the timing decorators: a bare call against the same call wrapped
+# with timed() over a live histogram and over the disabled no-op metric, and
+# the end-to-end effect on check_flags.
+
+
+def noop():
+    return None
+
+
+def per_call_ns(f, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        f()
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+async def check_ns(service: FlagService, flags, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        await service.check_flags(flags, ["PCDesktopClient"])
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def run(args) -> dict:
+    histogram = Histogram('bench_seconds', 'benchmark', ('kind',))
+    decorator = {
+        'bare_ns': per_call_ns(noop, args.calls),
+        'enabled_ns': per_call_ns(timed(histogram, kind='x')(noop), args.calls),
+        'disabled_ns': per_call_ns(timed(NULL_METRIC)(noop), args.calls),
+    }
+
+    service = FlagService.instance()
+    flag_data = synthetic_flag_data(args.github_flags, args.client_flags)
+    service.build_cache(flag_data)
+    flags = list(flag_data["ALL"]["applicationSettings"])[:args.check_flags]
+    bare = FlagService.check_flags.__wrapped__ if hasattr(FlagService.check_flags, '__wrapped__') else None
+
+    check = {'decorated_ns': asyncio.run(check_ns(service, flags, args.check_calls))}
+    if bare is not None:
+        FlagService.check_flags = bare
+        check['bare_ns'] = asyncio.run(check_ns(service, flags, args.check_calls))
+
+    return {
+        'benchmark': 'metrics',
+        'metrics_enabled': bare is not None,
+        'decorator': decorator,
+        'check_flags': check,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Overhead of the metrics timing decorators")
+    parser.add_argument('--calls', type=int, default=200000)
+    parser.add_argument('--github-flags', type=int, default=40000)
+    parser.add_argument('--client-flags', type=int, default=2000)
+    parser.add_argument('--check-flags', type=int, default=50)
+    parser.add_argument('--check-calls', type=int, default=20000)
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    print(json.dumps(run(args), indent=2))
+
+
+if __name__ == '__main__':
+    main()
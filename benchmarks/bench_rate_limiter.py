@@ -0,0 +1,93 @@
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+from common import ROOT, summarize
+
+from utils.rate_limiter import MemoryBackend, SharedMemoryBackend
+
+# Per-request cost of each rate limit backend over many client keys, and
+# whether the shared backend holds one limit across worker processes.
+
+CAPACITY = 100
+WINDOW = 60.0
+
+
+def per_call(backend, keys: int, calls: int) -> dict:
+    samples = []
+    rate = CAPACITY / WINDOW
+    for n in range(calls):
+        start = time.perf_counter()
+        backend.take(f"check:10.0.{n % keys // 256}.{n % 256}", CAPACITY, rate, time.time())
+        samples.append(time.perf_counter() - start)
+    stats = summarize(samples)
+    stats['mean_us'] = stats.pop('mean_ms') * 1000
+    stats['p50_us'] = stats.pop('p50_ms') * 1000
+    stats['p99_us'] = stats.pop('p99_ms') * 1000
+    return stats
+
+
+def hammer(path: str, slots: int, requests: int, allowed) -> None:
+    backend = SharedMemoryBackend(path, slots, WINDOW)
+    count = 0
+    for _ in range(requests):
+        if backend.take("check:203.0.113.7", CAPACITY, CAPACITY / WINDOW, time.time()) == 0:
+            count += 1
+    with allowed.get_lock():
+        allowed.value += count
+    backend.close()
+
+
+def run(args) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'ratelimit.shm')
+        results['memory'] = per_call(MemoryBackend(WINDOW), args.keys, args.calls)
+        shared = SharedMemoryBackend(path, args.slots, WINDOW)
+        results['shared'] = per_call(shared, args.keys, args.calls)
+        shared.close()
+
+        # One client spread over several workers: the shared table should
+        # let roughly CAPACITY requests through in total, not per worker.
+        shared_path = os.path.join(tmp, 'workers.shm')
+        allowed = multiprocessing.Value('i', 0)
+        workers = [
+            multiprocessing.Process(target=hammer, args=(shared_path, args.slots, args.worker_requests, allowed))
+            for _ in range(args.workers)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    return {
+        'benchmark': 'rate_limiter',
+        'keys': args.keys,
+        'results': results,
+        'cross_process': {
+            'workers': args.workers,
+            'requests': args.workers * args.worker_requests,
+            'capacity': CAPACITY,
+            'allowed': allowed.value,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rate limit backend overhead and cross-process sharing")
+    parser.add_argument('--keys', type=int, default=10000)
+    parser.add_argument('--calls', type=int, default=100000)
+    parser.add_argument('--slots', type=int, default=65536)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--worker-requests', type=int, default=200)
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    print(json.dumps(run(args), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import json
+import os
+import random
+import time
+
+from common import ROOT, summarize, synthetic_flag_data
+
+from core.flag_service import FlagService
+
+# /api/search latency per match kind over a full synthetic flag universe.
+
+
+def queries(names, rng: random.Random, count: int) -> dict:
+    sample = rng.sample(names, count)
+
+    def typo(name: str) -> str:
+        i = rng.randrange(3, len(name) - 1)
+        return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+
+    return {
+        'exact': sample,
+        'prefix': [name[:rng.randint(4, 10)] for name in sample],
+        'substring': [name[len(name) // 3:len(name) // 3 + 8] for name in sample],
+        'typo': [typo(name) for name in sample],
+        'miss': [f"qzx{rng.randint(0, 10 ** 6)}" for _ in sample],
+    }
+
+
+def run(args) -> dict:
+    service = FlagService.instance()
+    flag_data = synthetic_flag_data(args.github_flags, args.client_flags)
+    snapshot = service.build_cache(flag_data)
+
+    start = time.perf_counter()
+    snapshot.search.warm()
+    build = time.perf_counter() - start
+
+    rng = random.Random(3)
+    results = {}
+    for kind, batch in queries(list(flag_data["ALL"]["applicationSettings"]), rng, args.queries).items():
+        samples = []
+        for query in batch:
+            start = time.perf_counter()
+            service.search_flags(query, 0, args.limit)
+            samples.append(time.perf_counter() - start)
+        results[kind] = summarize(samples)
+
+    return {
+        'benchmark': 'search',
+        'indexed_names': len(snapshot.search),
+        'limit': args.limit,
+        'build_ms': build * 1000,
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flag search latency by query kind")
+    parser.add_argument('--github-flags', type=int, default=40000)
+    parser.add_argument('--client-flags', type=int, default=2000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    print(json.dumps(run(args), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import time
+
+os.environ.setdefault('APPLEBLOX_RATE_LIMIT', '0')
+
+import aiohttp
+
+from common import ROOT, summarize, synthetic_flag_data
+
+from bench_workers import memory
+
+# /api/stream fan-out: server memory per idle subscriber, and how long a
+# published snapshot takes to reach every one of them. The server runs in
+# its own process; each round it publishes a snapshot with one flag added.
+
+_fork = multiprocessing.get_context('fork')
+
+
+def serve(port: int, args, publish, ready) -> None:
+    import uvicorn
+    from api.asgi import ASGIApp, register_routes
+    from core.flag_service import FlagService
+
+    service = FlagService.instance()
+    flag_data = synthetic_flag_data(args.github_flags, args.client_flags)
+    service.build_cache(flag_data)
+
+    async def main():
+        app = ASGIApp(max_content_length=1 << 20)
+        register_routes(app)
+        config = uvicorn.Config(app, host='127.0.0.1', port=port, lifespan='off', log_level='warning',
+                                backlog=args.subscribers)
+        server = uvicorn.Server(config)
+        task = asyncio.create_task(server.serve())
+        loop = asyncio.get_running_loop()
+        ready.set()
+        for round_ in range(args.rounds):
+            await loop.run_in_executor(None, publish.wait)
+            publish.clear()
+            settings = dict(flag_data["PCDesktopClient"]["applicationSettings"])
+            settings[f"FFlagStreamBench{round_}"] = "true"
+            flag_data["PCDesktopClient"] = {"applicationSettings": settings}
+            await loop.run_in_executor(None, service.build_cache, dict(flag_data))
+        await loop.run_in_executor(None, publish.wait)
+        server.should_exit = True
+        await task
+
+    asyncio.run(main())
+
+
+async def subscribe(session, url: str, received: list, connected: asyncio.Event, counter: list, total: int):
+    async with session.get(f"{url}/api/stream", params={'diff': '1'},
+                           timeout=aiohttp.ClientTimeout(total=None)) as response:
+        counter[0] += 1
+        if counter[0] == total:
+            connected.set()
+        seen = 0
+        async for line in response.content:
+            if line.startswith(b'event: snapshot'):
+                seen += 1
+                if seen > 1:
+                    received.append(time.perf_counter())
+
+
+async def run_clients(url: str, args, publish, server_pid: int) -> dict:
+    before = memory(server_pid)
+    received: list = []
+    connected = asyncio.Event()
+    counter = [0]
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        started = time.perf_counter()
+        tasks = [
+            asyncio.create_task(subscribe(session, url, received, connected, counter, args.subscribers))
+            for _ in range(args.subscribers)
+        ]
+        await asyncio.wait_for(connected.wait(), 120)
+        connect_s = time.perf_counter() - started
+        await asyncio.sleep(1)
+        after = memory(server_pid)
+
+        rounds = []
+        for _ in range(args.rounds):
+            received.clear()
+            start = time.perf_counter()
+            publish.set()
+            while len(received) < args.subscribers and time.perf_counter() - start < 60:
+                await asyncio.sleep(0.01)
+            rounds.append({
+                'delivered': len(received),
+                'last_ms': (max(received) - start) * 1000 if received else None,
+                'latency': summarize([t - start for t in received]) if received else None,
+            })
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    return {
+        'connect_s': connect_s,
+        'server_memory_before': before,
+        'server_memory_subscribed': after,
+        'pss_kb_per_subscriber': (after['pss_mb'] - before['pss_mb']) * 1024 / args.subscribers,
+        'rounds': rounds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Server-sent events fan-out to many idle subscribers")
+    parser.add_argument('--subscribers', type=int, default=2000)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--github-flags', type=int, default=5000)
+    parser.add_argument('--client-flags', type=int, default=200)
+    parser.add_argument('--port', type=int, default=18420)
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, max(soft, 4 * args.subscribers + 256)), hard))
+
+    publish = _fork.Event()
+    ready = _fork.Event()
+    server = _fork.Process(target=serve, args=(args.port, args, publish, ready))
+    server.start()
+    try:
+        ready.wait(60)
+        time.sleep(0.5)
+        result = asyncio.run(run_clients(f"http://127.0.0.1:{args.port}", args, publish, server.pid))
+        publish.set()
+    finally:
+        server.join(10)
+        if server.is_alive():
+            server.kill()
+
+    print(json.dumps({'benchmark': 'stream', 'subscribers': args.subscribers, **result}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+import argparse
+import json
+import os
+import random
+import time
+
+from common import ROOT, summarize, synthetic_flag_data
+
+from config import VALID_APPLICATIONS
+from core.flag_service import FlagService
+
+# validate_profile() on fastflag profiles shaped like the ones users submit:
+# values taken from a client's settings, as strings, plus a few names the
+# snapshot does not know and values of the wrong type.
+
+
+def profiles(flag_data: dict, size: int, count: int) -> list:
+    rng = random.Random(size)
+    settings = list(flag_data["PCDesktopClient"]["applicationSettings"].items())
+    result = []
+    for _ in range(count):
+        profile = dict(rng.sample(settings, size - size // 20))
+        for i in range(size // 20):
+            profile[f"FIntProfileBench{rng.randint(0, 10 ** 9)}"] = rng.choice(("12", "abc", "1;2;3", 7))
+        result.append(profile)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile validation latency")
+    parser.add_argument('--github-flags', type=int, default=40000)
+    parser.add_argument('--client-flags', type=int, default=2000)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 500, 2000, 10000])
+    parser.add_argument('--runs', type=int, default=100)
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    service = FlagService.instance()
+    flag_data = synthetic_flag_data(args.github_flags, args.client_flags)
+    service.build_cache(flag_data)
+
+    results = {}
+    for size in args.sizes:
+        samples = []
+        for profile in profiles(flag_data, size, args.runs):
+            start = time.perf_counter()
+            service.validate_profile(profile, VALID_APPLICATIONS)
+            samples.append(time.perf_counter() - start)
+        results[str(size)] = summarize(samples)
+
+    print(json.dumps({'benchmark': 'validate_profile', 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+
+from common import ROOT, legacy_parse_enabled, summarize, synthetic_flag_data
+
+from core.flag_service import FlagService
+from core.flag_values import ValueTable, value_kind, parse_value
+
+# Value parsing cost of one full refresh (every app's applicationSettings):
+# the old per-flag bool parse, typed parsing without memoization, and the
+# memoized VALUES table, cold (first refresh) and warm (later refreshes).
+
+
+def run(args) -> dict:
+    service = FlagService.instance()
+    flag_data = synthetic_flag_data(args.github_flags, args.client_flags)
+    settings = [app_data["applicationSettings"] for app_data in flag_data.values()]
+    flags = sum(len(app) for app in settings)
+
+    def legacy():
+        for app in settings:
+            for name, raw in app.items():
+                legacy_parse_enabled(name, raw)
+
+    def typed_unmemoized():
+        for app in settings:
+            for name, raw in app.items():
+                parse_value(value_kind(name), raw, name)
+
+    table = ValueTable()
+
+    def memoized():
+        intern = table.intern_flag
+        for app in settings:
+            for name, raw in app.items():
+                intern(name, raw)
+
+    def memoized_cold():
+        nonlocal table
+        table = ValueTable()
+        memoized()
+
+    results = {}
+    for label, parse in (('legacy_bool', legacy), ('typed_unmemoized', typed_unmemoized),
+                         ('typed_memoized_cold', memoized_cold), ('typed_memoized_warm', memoized)):
+        samples = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            parse()
+            samples.append(time.perf_counter() - start)
+        results[label] = summarize(samples)
+
+    # The whole per-app build (names + values) as update_cache runs it.
+    samples = []
+    for _ in range(args.runs):
+        timestamp = datetime.now()
+        start = time.perf_counter()
+        for app_data in flag_data.values():
+            service._build_app_flags(app_data, timestamp)
+        samples.append(time.perf_counter() - start)
+    results['build_app_flags'] = summarize(samples)
+
+    return {
+        'benchmark': 'value_parsing',
+        'flags_per_refresh': flags,
+        'distinct_values': len(table),
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flag value parsing time per refresh")
+    parser.add_argument('--github-flags', type=int, default=40000)
+    parser.add_argument('--client-flags', type=int, default=2000)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    print(json.dumps(run(args), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import ROOT, synthetic_flag_data
+
+import config
+
+
+def child(fmt: str, path: str) -> None:
+    # Runs in a fresh interpreter so nothing is interned or cached yet.
+    started = time.perf_counter()
+    from core.flag_service import FlagService
+    service = FlagService.instance()
+    imported = time.perf_counter()
+
+    if fmt == 'json':
+        with open(path) as f:
+            flag_data = json.load(f)
+        service.build_cache(flag_data)
+    else:
+        config.SNAPSHOT_PATH = path
+        assert service.load_snapshot()
+    ready = time.perf_counter()
+
+    print(json.dumps({
+        'format': fmt,
+        'import_s': imported - started,
+        'ready_s': ready - imported,
+        'cache_size': service.stats.cache_size,
+        'file_mb': os.path.getsize(path) / 2 ** 20,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup time from flags.json vs the binary snapshot")
+    parser.add_argument('--github-flags', type=int, default=40000)
+    parser.add_argument('--client-flags', type=int, default=2000)
+    parser.add_argument('--child', nargs=2, metavar=('FORMAT', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    if args.child:
+        child(*args.child)
+        return
+
+    from core.flag_service import FlagService
+
+    with tempfile.TemporaryDirectory() as tmp:
+        flag_data = synthetic_flag_data(args.github_flags, args.client_flags)
+        json_path = os.path.join(tmp, 'flags.json')
+        with open(json_path, 'w') as f:
+            json.dump(flag_data, f)
+
+        snapshot_path = os.path.join(tmp, 'flags.snap')
+        service = FlagService.instance()
+        snapshot = service.build_cache(flag_data)
+        config.SNAPSHOT_PATH = snapshot_path
+        service.save_snapshot(snapshot)
+
+        results = {}
+        for fmt, path in (('json', json_path), ('binary', snapshot_path)):
+            output = subprocess.run(
+                [sys.executable, __file__, '--child', fmt, path],
+                check=True, capture_output=True, text=True
+            ).stdout
+            results[fmt] = json.loads(output.strip().splitlines()[-1])
+
+    print(json.dumps({
+        'benchmark': 'warm_start',
+        'github_flags': args.github_flags,
+        'results': results,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
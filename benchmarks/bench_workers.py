@@ -0,0 +1,174 @@
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+# Workers read these at import time (config).
+os.environ.setdefault('APPLEBLOX_RATE_LIMIT', '0')
+os.environ.setdefault('APPLEBLOX_SNAPSHOT_POLL_INTERVAL', '0.2')
+_tmp = tempfile.mkdtemp(prefix='flagsman-workers-')
+os.environ['APPLEBLOX_SNAPSHOT_PATH'] = os.path.join(_tmp, 'flags.snap')
+
+import aiohttp
+
+from common import ROOT, CLIENTS, summarize, synthetic_flag_data
+
+import config
+from core.flag_service import FlagService
+from core.snapshot_store import save_snapshot
+from supervisor import _child, _fork, listen_socket, run_worker
+
+# Supervisor-mode serving without the refresher: N workers follow one
+# synthetic snapshot file. Reports throughput per worker count, RSS/PSS per
+# worker (the mapped snapshot is shared page cache, so PSS is what each
+# worker really costs), and how long a new generation takes to reach every
+# worker.
+
+
+def _publish(args, generation: int) -> None:
+    snapshot = FlagService.instance().build_cache(synthetic_flag_data(args.github_flags, args.client_flags))
+    save_snapshot(config.SNAPSHOT_PATH, generation, snapshot.created_at, snapshot.apps, snapshot.index.app_masks())
+
+
+def publish(args, generation: int) -> None:
+    # Built in a child, like the refresher, so workers fork from a process
+    # that holds no flag data of its own.
+    process = _fork.Process(target=_publish, args=(args, generation))
+    process.start()
+    process.join()
+
+
+def memory(pid: int) -> dict:
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ('Rss:', 'Pss:', 'Shared_Clean:', 'Private_Dirty:'):
+                fields[parts[0][:-1].lower() + '_mb'] = int(parts[1]) / 1024
+    return fields
+
+
+async def load(url: str, duration: float, concurrency: int) -> dict:
+    samples = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def client(session, n):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            async with session.get(f"{url}/api/application/{CLIENTS[n % len(CLIENTS)]}") as response:
+                await response.read()
+                if response.status != 200:
+                    errors += 1
+                    continue
+            samples.append(time.perf_counter() - start)
+
+    connector = aiohttp.TCPConnector(limit=concurrency, force_close=True)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        started = time.perf_counter()
+        await asyncio.gather(*(client(session, n) for n in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return {'requests': len(samples), 'errors': errors, 'elapsed': elapsed, 'samples': samples}
+
+
+def load_process(url: str, duration: float, concurrency: int, results) -> None:
+    results.put(asyncio.run(load(url, duration, concurrency)))
+
+
+async def generations(url: str, probes: int) -> set:
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(force_close=True)) as session:
+        seen = set()
+        for _ in range(probes):
+            async with session.get(f"{url}/") as response:
+                seen.add((await response.json())['generation'])
+        return seen
+
+
+def run_workers(args, count: int) -> dict:
+    sock = listen_socket('127.0.0.1', 0)
+    url = f"http://127.0.0.1:{sock.getsockname()[1]}"
+    workers = [_fork.Process(target=_child, args=(run_worker, (args.mode, sock, f'worker-{i}'))) for i in range(count)]
+    for worker in workers:
+        worker.start()
+
+    try:
+        time.sleep(args.startup)
+        asyncio.run(load(url, 1.0, count * 2))  # render every app in every worker
+
+        results = _fork.Queue()
+        clients = [
+            _fork.Process(target=load_process, args=(url, args.duration, args.concurrency, results))
+            for _ in range(args.clients)
+        ]
+        for client in clients:
+            client.start()
+        runs = [results.get() for _ in clients]
+        for client in clients:
+            client.join()
+
+        samples = [s for r in runs for s in r['samples']]
+        requests = sum(r['requests'] for r in runs)
+        elapsed = max(r['elapsed'] for r in runs)
+        mem = [memory(worker.pid) for worker in workers]
+
+        # Publish a new generation and time until every worker serves it.
+        generation = int(time.time())
+        publish(args, generation)
+        started = time.perf_counter()
+        while asyncio.run(generations(url, count * 4)) != {generation}:
+            if time.perf_counter() - started > 30:
+                break
+        switch = time.perf_counter() - started
+
+        return {
+            'workers': count,
+            'requests_per_s': requests / elapsed,
+            'errors': sum(r['errors'] for r in runs),
+            'latency': summarize(samples),
+            'memory_per_worker': {key: sum(m[key] for m in mem) / count for key in mem[0]},
+            'generation_switch_s': switch,
+        }
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join()
+        sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Supervisor worker scaling and per-worker memory")
+    parser.add_argument('--mode', choices=('wsgi', 'asgi'), default='wsgi')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--github-flags', type=int, default=40000)
+    parser.add_argument('--client-flags', type=int, default=2000)
+    parser.add_argument('--clients', type=int, default=2, help="load generator processes")
+    parser.add_argument('--concurrency', type=int, default=16, help="connections per load generator")
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--startup', type=float, default=3.0)
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    try:
+        publish(args, 1)
+        results = [run_workers(args, count) for count in args.workers]
+        print(json.dumps({
+            'benchmark': 'workers',
+            'mode': args.mode,
+            'cpus': multiprocessing.cpu_count(),
+            'snapshot_mb': os.path.getsize(config.SNAPSHOT_PATH) / 2 ** 20,
+            'results': results,
+        }, indent=2))
+    finally:
+        shutil.rmtree(_tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+import random
+import statistics
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+for path in (str(ROOT / "src"), str(ROOT / "tests")):  # tests/ for upstream_stub
+    if path not in sys.path:
+        sys.path.append(path)
+
+PREFIXES = ['DFFlag', 'FFlag', 'BFFlag', 'FInt', 'DFInt', 'FString', 'DFString', 'SFFlag']
+CLIENTS = [
+    "PCDesktopClient",
+    "MacDesktopClient",
+    "AndroidApp",
+    "iOSApp",
+    "XboxClient",
+    "PCStudioApp",
+    "MacStudioApp",
+    "UWPApp",
+]
+
+
+def default_value(name: str) -> str:
+    if name.startswith(('DFInt', 'FInt')):
+        return "0"
+    if name.startswith(('DFString', 'FString')):
+        return ""
+    return "false"
+
+
+def legacy_parse_enabled(name: str, value: str) -> bool:
+    # FlagService._parse_enabled before typed values: every flag reduced to a
+    # bool, parsed again for every app.
+    enabled = True
+    if name.startswith(('DFFlag', 'FFlag', 'BFFlag')):
+        enabled = str(value).lower() == "true"
+    elif name.startswith('FInt'):
+        try:
+            if ";" in value:
+                enabled = int(value.split(";")[0].strip()) != 0
+            else:
+                enabled = int(value) != 0
+        except ValueError:
+            enabled = False
+    elif name.startswith('FString'):
+        enabled = value != ""
+    return enabled
+
+
+def synthetic_flag_names(count: int, seed: int = 1) -> List[str]:
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < count:
+        prefix = rng.choice(PREFIXES)
+        words = "".join(rng.choice(WORDS) for _ in range(rng.randint(2, 5)))
+        names.add(f"{prefix}{words}{rng.randint(0, 999)}")
+    return sorted(names)
+
+
+def synthetic_flag_data(github_count: int = 40000, client_count: int = 2000, seed: int = 1) -> Dict[str, dict]:
+    # Same shape as FlagFetcher.fetch_all_flags(): GitHub defaults under ALL,
+    # merged underneath each client's own clientsettings payload.
+    rng = random.Random(seed)
+    github = {name: default_value(name) for name in synthetic_flag_names(github_count, seed)}
+    results = {"ALL": {"applicationSettings": dict(github)}}
+
+    for client in CLIENTS:
+        settings = {}
+        for name in rng.sample(list(github), min(client_count, len(github))):
+            if name.startswith(('DFInt', 'FInt')):
+                settings[name] = str(rng.randint(0, 10000))
+            elif name.startswith(('DFString', 'FString')):
+                settings[name] = rng.choice(WORDS)
+            else:
+                settings[name] = rng.choice(("True", "False"))
+        for name, value in github.items():
+            settings.setdefault(name, value)
+        results[client] = {"applicationSettings": settings}
+
+    return results
+
+
+def synthetic_fvariables(count: int, seed: int = 1) -> bytes:
+    # FVariables.txt layout: "[Type] Name" per line, with a few comments and
+    # names whose prefix the fetcher ignores mixed in.
+    rng = random.Random(seed)
+    lines = ["# Roblox-Client-Tracker FVariables (synthetic)"]
+    for name in synthetic_flag_names(count, seed):
+        lines.append(f"[{rng.choice(('C++', 'C++', 'C++', 'Lua'))}] {name}")
+        if rng.random() < 0.02:
+            lines.append(f"[C++] UnknownPrefix{rng.randint(0, 10 ** 6)}")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    k = max(0, min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {
+        'runs': len(samples),
+        'mean_ms': statistics.fmean(samples) * 1000,
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+    }
+
+
+WORDS = [
+    "Render", "Network", "Physics", "Task", "Scheduler", "Target", "Fps", "Debug",
+    "Graphics", "Metal", "Vulkan", "Lua", "Studio", "Avatar", "Chat", "Voice",
+    "Texture", "Quality", "Level", "Enable", "Disable", "Max", "Min", "Timeout",
+    "Http", "Cache", "Asset", "Delivery", "Replication", "Streaming", "Input", "Camera",
+]
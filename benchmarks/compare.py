@@ -0,0 +1,81 @@
+import argparse
+import json
+import sys
+from typing import Dict, Optional
+
+# Compares two suite.py results, e.g. from the parent commit and this one:
+#   python benchmarks/suite.py --output base.json   (on the parent)
+#   python benchmarks/suite.py --output head.json
+#   python benchmarks/compare.py base.json head.json
+# Exits with 1 when any metric got worse by more than --threshold percent.
+
+
+def flatten(value, path: str = '') -> Dict[str, float]:
+    if isinstance(value, dict):
+        flat = {}
+        for key, item in value.items():
+            flat.update(flatten(item, f"{path}.{key}" if path else key))
+        return flat
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {path: float(value)}
+    return {}
+
+
+def direction(path: str) -> Optional[int]:
+    # +1 when bigger is better, -1 when smaller is, None for counts.
+    name = path.rsplit('.', 1)[-1]
+    if name.endswith('per_s'):
+        return 1
+    if name.endswith(('_ms', '_s', '_mb')):
+        return -1
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark suite results")
+    parser.add_argument('base')
+    parser.add_argument('head')
+    parser.add_argument('--threshold', type=float, default=10.0, help="percent change that counts")
+    parser.add_argument('--all', action='store_true', help="list unchanged metrics too")
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+    if base.get('params') != head.get('params'):
+        print("warning: the runs used different parameters", file=sys.stderr)
+
+    old = flatten(base['results'])
+    new = flatten(head['results'])
+    rows = []
+    regressions = 0
+    for path in sorted(old.keys() & new.keys()):
+        sign = direction(path)
+        if sign is None or old[path] == 0:
+            continue
+        change = (new[path] - old[path]) / abs(old[path]) * 100
+        if change * sign < -args.threshold:
+            status = 'worse'
+            regressions += 1
+        elif change * sign > args.threshold:
+            status = 'better'
+        elif args.all:
+            status = ''
+        else:
+            continue
+        rows.append({'metric': path, 'base': old[path], 'head': new[path], 'change_pct': change, 'status': status})
+
+    print(json.dumps({
+        'benchmark': 'compare',
+        'base': base.get('commit'),
+        'head': head.get('commit'),
+        'threshold_pct': args.threshold,
+        'regressions': regressions,
+        'changes': rows,
+    }, indent=2))
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
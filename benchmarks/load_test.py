@@ -0,0 +1,95 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import aiohttp
+
+from common import summarize
+
+# Start the server first, e.g. `python run.py --mode wsgi` or
+# `python run.py --mode asgi`, then point this script at it. Running it once
+# per mode with the same --concurrency shows the difference in throughput.
+# Start it with APPLEBLOX_RATE_LIMIT=0 to measure the server rather than the
+# per-IP rate limiter; 429 answers are counted apart from errors.
+
+
+async def worker(session: aiohttp.ClientSession, args, deadline: float, samples: list, errors: list,
+                 limited: list, flags: list):
+    rng = random.Random()
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            if args.route == 'check':
+                payload = {'flags': rng.sample(flags, min(args.payload, len(flags))), 'applications': args.applications}
+                request = session.post(f"{args.url}/api/check", json=payload)
+            elif args.route == 'application':
+                request = session.get(f"{args.url}/api/application/{args.applications[0]}")
+            else:
+                request = session.get(f"{args.url}/")
+
+            async with request as response:
+                await response.read()
+                if response.status == 429:
+                    limited.append(response.status)
+                    continue
+                if response.status >= 400:
+                    errors.append(response.status)
+                    continue
+        except aiohttp.ClientError as e:
+            errors.append(type(e).__name__)
+            continue
+        samples.append(time.perf_counter() - start)
+
+
+async def run(args) -> dict:
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        flags = []
+        if args.route == 'check':
+            async with session.get(f"{args.url}/api/application/{args.applications[0]}") as response:
+                data = await response.json()
+            flags = [f['name'] for f in data.get('flags', [])] or [f"FFlagLoadTest{i}" for i in range(args.payload)]
+
+        samples: list = []
+        errors: list = []
+        limited: list = []
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(
+            worker(session, args, deadline, samples, errors, limited, flags) for _ in range(args.concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+
+    result = {
+        'benchmark': 'load_test',
+        'url': args.url,
+        'route': args.route,
+        'concurrency': args.concurrency,
+        'duration_s': elapsed,
+        'requests': len(samples),
+        'errors': len(errors),
+        'rate_limited': len(limited),
+        'requests_per_s': len(samples) / elapsed if elapsed else 0.0,
+    }
+    if samples:
+        result['latency'] = summarize(samples)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load against a running FLAGSMAN server")
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--route', choices=('stats', 'application', 'check'), default='check')
+    parser.add_argument('--applications', nargs='+', default=['ALL'])
+    parser.add_argument('--payload', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,338 @@
+import argparse
+import asyncio
+import gc
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from queue import Empty
+
+# Read by config at import time.
+os.environ.setdefault('APPLEBLOX_RATE_LIMIT', '0')
+_tmp = tempfile.mkdtemp(prefix='flagsman-suite-')
+os.environ['APPLEBLOX_SNAPSHOT_PATH'] = os.path.join(_tmp, 'flags.snap')
+
+import aiohttp
+
+from common import ROOT, CLIENTS, summarize, synthetic_fvariables, synthetic_flag_data
+from upstream_stub import UpstreamStub
+
+from config import VALID_APPLICATIONS
+from core.flag_fetcher import FlagFetcher
+from core.flag_service import FlagService
+
+# The whole pipeline at several upstream sizes, against the local upstream
+# stub: FVariables.txt fetch + parse, update_cache() build time and memory,
+# check_flags() latency per payload size, and request throughput per route
+# and concurrency on the ASGI server. Every size runs in a fresh process so
+# the process-wide name/value tables start empty. The JSON result is meant to
+# be kept per commit and fed to compare.py.
+
+_fork = multiprocessing.get_context('fork')
+
+
+def serve_upstream(args, size: int, urls) -> None:
+    async def main():
+        data = (synthetic_fvariables(size), synthetic_flag_data(size, min(args.client_flags, size)))
+        stub = UpstreamStub(data=data)
+        urls.put((await stub.start(), len(stub._fvariables)))
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+def serve_api(port: int) -> None:
+    import uvicorn
+    from api.asgi import ASGIApp, register_routes
+
+    app = ASGIApp(max_content_length=1 << 24)
+    register_routes(app)
+    uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=port, lifespan='off', log_level='warning')).run()
+
+
+def rss() -> dict:
+    fields = {}
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(('VmRSS:', 'VmHWM:')):
+                fields[line[:5]] = int(line.split()[1]) / 1024
+    return fields
+
+
+def reset_peak_rss() -> None:
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+async def measure_parse(args, input_bytes: int) -> dict:
+    samples = []
+    flags = 0
+    for _ in range(args.runs):
+        fetcher = FlagFetcher()
+        start = time.perf_counter()
+        flags = len(await fetcher.fetch_flags_from_github())
+        samples.append(time.perf_counter() - start)
+        await fetcher.close()
+    best = min(samples)
+    return {
+        'flags': flags,
+        'input_mb': input_bytes / 2 ** 20,
+        'latency': summarize(samples),
+        'flags_per_s': flags / best,
+        'mb_per_s': input_bytes / best / 2 ** 20,
+    }
+
+
+async def measure_update(service: FlagService) -> dict:
+    gc.collect()
+    before = rss()
+    reset_peak_rss()
+    start = time.perf_counter()
+    await service.update_cache()
+    elapsed = time.perf_counter() - start
+    after = rss()
+    return {
+        'flags': sum(len(flags) for flags in service.snapshot.apps.values()),
+        'update_cache_s': elapsed,
+        'rss_growth_mb': after['VmRSS'] - before['VmRSS'],
+        'peak_rss_growth_mb': after['VmHWM'] - before['VmRSS'],
+    }
+
+
+def measure_build(args, service: FlagService, flag_data: dict) -> dict:
+    # A full rebuild from already fetched data, without the upstream round
+    # trips. The names and values are interned by now, as on every refresh
+    # after the first.
+    samples = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        service._build_snapshot(flag_data)
+        samples.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        snapshot = service._build_snapshot(flag_data)
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del snapshot
+    return {'latency': summarize(samples), 'retained_mb': retained / 2 ** 20, 'traced_peak_mb': peak / 2 ** 20}
+
+
+def check_payloads(args, known: list, size: int, count: int) -> list:
+    # 80% known names, 20% the index has never seen.
+    rng = random.Random(size)
+    hits = min(size - size // 5, len(known))
+    payloads = []
+    for _ in range(count):
+        flags = rng.sample(known, hits)
+        flags += [f"FFlagMissing{rng.randint(0, 10 ** 9)}" for _ in range(size - hits)]
+        payloads.append(flags)
+    return payloads
+
+
+async def measure_check(args, service: FlagService, known: list) -> dict:
+    results = {}
+    for size in args.payloads:
+        samples = []
+        for flags in check_payloads(args, known, size, args.check_runs):
+            start = time.perf_counter()
+            await service.check_flags(flags, VALID_APPLICATIONS)
+            samples.append(time.perf_counter() - start)
+        results[str(size)] = summarize(samples)
+    return results
+
+
+async def load(url: str, route: str, concurrency: int, duration: float, payloads: list) -> dict:
+    samples = []
+    errors = 0
+    received = 0
+    deadline = time.perf_counter() + duration
+
+    async def client(session, n):
+        nonlocal errors, received
+        i = n
+        while time.perf_counter() < deadline:
+            i += concurrency
+            start = time.perf_counter()
+            if route == 'check':
+                request = session.post(f"{url}/api/check", json=payloads[i % len(payloads)])
+            else:
+                request = session.get(f"{url}/api/application/{CLIENTS[i % len(CLIENTS)]}",
+                                      headers={'Accept-Encoding': 'gzip'})
+            try:
+                async with request as response:
+                    body = await response.read()
+                    if response.status != 200:
+                        errors += 1
+                        continue
+            except aiohttp.ClientError:
+                errors += 1
+                continue
+            received += len(body)
+            samples.append(time.perf_counter() - start)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, auto_decompress=False) as session:
+        started = time.perf_counter()
+        await asyncio.gather(*(client(session, n) for n in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return {
+        'requests_per_s': len(samples) / elapsed,
+        'response_mb_per_s': received / elapsed / 2 ** 20,
+        'errors': errors,
+        'latency': summarize(samples) if samples else None,
+    }
+
+
+def measure_routes(args, known: list) -> dict:
+    # The server forks from this process, so it serves the snapshot built above.
+    server = _fork.Process(target=serve_api, args=(args.port,))
+    server.start()
+    url = f"http://127.0.0.1:{args.port}"
+    payloads = [
+        {'flags': flags, 'applications': VALID_APPLICATIONS}
+        for flags in check_payloads(args, known, args.route_payload, 64)
+    ]
+    try:
+        asyncio.run(wait_ready(url))
+        results = {}
+        for route in ('check', 'application'):
+            results[route] = {
+                str(concurrency): asyncio.run(load(url, route, concurrency, args.duration, payloads))
+                for concurrency in args.concurrency
+            }
+        return results
+    finally:
+        server.terminate()
+        server.join(10)
+        if server.is_alive():
+            server.kill()
+
+
+async def wait_ready(url: str) -> None:
+    async with aiohttp.ClientSession() as session:
+        for _ in range(300):
+            try:
+                async with session.get(f"{url}/") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"API server at {url} did not start")
+
+
+def run_size(args, size: int, results) -> None:
+    urls = _fork.Queue()
+    upstream = _fork.Process(target=serve_upstream, args=(args, size, urls))
+    upstream.start()
+    try:
+        url, input_bytes = urls.get(timeout=300)
+        FlagFetcher.BASE_URL = f"{url}/v2/settings/application"
+        FlagFetcher.GITHUB_URL = f"{url}/FVariables.txt"
+        service = FlagService.instance()
+
+        async def fetch_stages():
+            parse = await measure_parse(args, input_bytes)
+            update = await measure_update(service)
+            flag_data = await service._fetcher.fetch_all_flags()
+            await service._fetcher.close()
+            return parse, update, flag_data
+
+        parse, update, flag_data = asyncio.run(fetch_stages())
+    finally:
+        upstream.terminate()
+        upstream.join()
+
+    build = measure_build(args, service, flag_data)
+    known = list(flag_data["ALL"]["applicationSettings"])
+    del flag_data
+    check = asyncio.run(measure_check(args, service, known))
+    routes = measure_routes(args, known) if args.duration > 0 else None
+    results.put({
+        'fetch_flags_from_github': parse,
+        'update_cache': update,
+        'build_snapshot': build,
+        'check_flags': check,
+        'routes': routes,
+    })
+
+
+def commit() -> dict:
+    def git(*argv):
+        try:
+            return subprocess.run(('git', *argv), cwd=ROOT, capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    status = git('status', '--porcelain', '--untracked-files=no')
+    return {'commit': git('rev-parse', 'HEAD'), 'dirty': bool(status) if status is not None else None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark suite over synthetic upstream sizes")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000, 100000, 200000],
+                        help="FVariables.txt flag counts")
+    parser.add_argument('--client-flags', type=int, default=2000, help="overrides per clientsettings payload")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--payloads', type=int, nargs='+', default=[10, 100, 1000, 5000],
+                        help="check_flags payload sizes")
+    parser.add_argument('--check-runs', type=int, default=200)
+    parser.add_argument('--route-payload', type=int, default=100, help="flags per /api/check request")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16, 64])
+    parser.add_argument('--duration', type=float, default=5.0, help="seconds per route and concurrency, 0 skips")
+    parser.add_argument('--port', type=int, default=18430)
+    parser.add_argument('--output', help="also write the JSON result to this file")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    results = {}
+    try:
+        for size in args.sizes:
+            queue = _fork.Queue()
+            process = _fork.Process(target=run_size, args=(args, size, queue))
+            process.start()
+            while True:
+                try:
+                    results[str(size)] = queue.get(timeout=1)
+                    break
+                except Empty:
+                    if not process.is_alive():
+                        raise RuntimeError(f"Run for {size} flags exited with code {process.exitcode}")
+            process.join()
+    finally:
+        shutil.rmtree(_tmp, ignore_errors=True)
+
+    document = {
+        'benchmark': 'suite',
+        **commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpus': multiprocessing.cpu_count(),
+        'params': {key: value for key, value in vars(args).items() if key not in ('output', 'port')},
+        'results': results,
+    }
+    text = json.dumps(document, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
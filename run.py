@@ -1,3 +1,4 @@
+import argparse
 import sys
 from pathlib import Path
 
@@ -6,6 +7,21 @@ if src_path not in sys.path:
     sys.path.append(src_path)
 
 from app import main
+import config
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="FLAGSMAN API")
+    parser.add_argument(
+        "--mode",
+        choices=("wsgi", "asgi"),
+        default="wsgi",
+        help="wsgi: Flask threaded server (default); asgi: native ASGI app under uvicorn"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=config.WORKERS,
+        help="serving processes; above 1, a supervisor runs one refresher process and N workers sharing its snapshot"
+    )
+    args = parser.parse_args()
+    main(args.mode, args.workers)
\ No newline at end of file
@@ -0,0 +1,295 @@
+import asyncio
+import json
+import logging
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+from . import handlers
+from utils.access_log import AccessLog
+from utils.metrics import REGISTRY, observe_request
+import config
+
+logger = logging.getLogger(__name__)
+access_log = AccessLog.instance()
+
+Handler = Callable[..., Awaitable[Any]]
+# Called with the Request before routing; a non-None result is sent instead.
+BeforeRequest = Callable[['Request'], Any]
+
+class PayloadTooLarge(Exception):
+    pass
+
+class Request:
+    __slots__ = ('method', 'path', 'route', 'query', 'headers', 'client', '_receive', '_body')
+
+    def __init__(self, scope: dict, receive: Callable):
+        self.method: str = scope['method']
+        self.path: str = scope['path']
+        # Template of the matched route, e.g. /api/application/<app_id>
+        self.route: Optional[str] = None
+        self.query: Dict[str, List[str]] = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        self.headers: Dict[str, str] = {
+            k.decode('latin-1'): v.decode('latin-1') for k, v in scope.get('headers', [])
+        }
+        client = scope.get('client')
+        self.client: Optional[str] = client[0] if client else None
+        self._receive = receive
+        self._body: Optional[bytes] = None
+
+    def arg(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        values = self.query.get(name)
+        return values[0] if values else default
+
+    async def body(self, limit: int) -> bytes:
+        if self._body is None:
+            declared = self.headers.get('content-length')
+            if declared is not None and declared.isdigit() and int(declared) > limit:
+                raise PayloadTooLarge()
+
+            chunks = []
+            size = 0
+            while True:
+                message = await self._receive()
+                chunk = message.get('body', b'')
+                size += len(chunk)
+                if size > limit:
+                    raise PayloadTooLarge()
+                chunks.append(chunk)
+                if not message.get('more_body', False):
+                    break
+            self._body = b''.join(chunks)
+        return self._body
+
+    async def json(self, limit: int) -> Any:
+        try:
+            return json.loads(await self.body(limit))
+        except ValueError:
+            return None
+
+class ASGIApp:
+    def __init__(self, max_content_length: int):
+        self.max_content_length = max_content_length
+        self._routes: List[Tuple[re.Pattern, Tuple[str, ...], Handler, str]] = []
+        self._before: List[BeforeRequest] = []
+        self._startup: List[Callable[[], Awaitable[None]]] = []
+        self._shutdown: List[Callable[[], Awaitable[None]]] = []
+
+    def route(self, path: str, methods: Tuple[str, ...] = ('GET',)):
+        pattern = re.compile('^' + re.sub(r'<(\w+)>', r'(?P<\1>[^/]+)', path) + '$')
+
+        def decorator(f: Handler) -> Handler:
+            self._routes.append((pattern, methods, f, path))
+            return f
+        return decorator
+
+    def before_request(self, f):
+        self._before.append(f)
+        return f
+
+    def on_startup(self, f):
+        self._startup.append(f)
+        return f
+
+    def on_shutdown(self, f):
+        self._shutdown.append(f)
+        return f
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope['type'] == 'http':
+            await self._handle_http(scope, receive, send)
+        elif scope['type'] == 'lifespan':
+            await self._handle_lifespan(receive, send)
+
+    async def _handle_lifespan(self, receive: Callable, send: Callable) -> None:
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    for f in self._startup:
+                        await f()
+                except Exception as e:
+                    logger.error(f"ASGI startup failed: {e}")
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for f in self._shutdown:
+                    try:
+                        await f()
+                    except Exception as e:
+                        logger.error(f"ASGI shutdown hook failed: {e}")
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _handle_http(self, scope: dict, receive: Callable, send: Callable) -> None:
+        request = Request(scope, receive)
+        started = time.perf_counter()
+        access_log.begin()
+        try:
+            result = None
+            for f in self._before:
+                result = f(request)
+                if result is not None:
+                    break
+            if result is None:
+                result = await self._dispatch(request)
+        except PayloadTooLarge:
+            result = {'error': 'Payload too large'}, 413
+        except Exception:
+            logger.exception("Server error")
+            result = {'error': 'Internal server error'}, 500
+        # Streamed bodies are timed to the first byte, as in Flask.
+        seconds = time.perf_counter() - started
+        if REGISTRY.enabled:
+            observe_request(request.route, request.method, result[1], seconds)
+        access_log.record(request.route, request.method, result[1], seconds, handlers.flag_service.generation)
+        await send_result(send, result, receive)
+
+    async def _dispatch(self, request: Request) -> Any:
+        method_mismatch = False
+        for pattern, methods, handler, path in self._routes:
+            match = pattern.match(request.path)
+            if not match:
+                continue
+            if request.method not in methods:
+                method_mismatch = True
+                continue
+            request.route = path
+            return await handler(request, **match.groupdict())
+
+        if method_mismatch:
+            return {'error': 'Method not allowed'}, 405
+        return {'error': 'Not found'}, 404
+
+async def send_result(send: Callable, result: Any, receive: Optional[Callable] = None) -> None:
+    headers: Dict[str, str] = {}
+    if len(result) == 3:
+        payload, status, headers = result
+    else:
+        payload, status = result
+
+    if hasattr(payload, '__aiter__'):
+        raw_headers = [(k.lower().encode('latin-1'), str(v).encode('latin-1')) for k, v in headers.items()]
+        await send({'type': 'http.response.start', 'status': status, 'headers': raw_headers})
+        await send_stream(send, receive, payload)
+        return
+
+    if not isinstance(payload, (bytes, dict)):
+        # Streamed body: chunked transfer, no content-length.
+        raw_headers = [(k.lower().encode('latin-1'), str(v).encode('latin-1')) for k, v in headers.items()]
+        await send({'type': 'http.response.start', 'status': status, 'headers': raw_headers})
+        for chunk in payload:
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    if isinstance(payload, bytes):
+        body = payload
+    else:
+        body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        headers.setdefault('Content-Type', 'application/json')
+
+    raw_headers = [(k.lower().encode('latin-1'), str(v).encode('latin-1')) for k, v in headers.items()]
+    raw_headers.append((b'content-length', str(len(body)).encode('latin-1')))
+
+    await send({'type': 'http.response.start', 'status': status, 'headers': raw_headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+async def _wait_disconnect(receive: Callable) -> None:
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+async def send_stream(send: Callable, receive: Optional[Callable], chunks) -> None:
+    # Long-lived body (e.g. /api/stream). Ends as soon as the client goes
+    # away rather than at the next chunk, and drops a client that stops
+    # reading for STREAM_SEND_TIMEOUT instead of holding its subscription.
+    disconnected = asyncio.ensure_future(_wait_disconnect(receive) if receive else asyncio.Event().wait())
+    iterator = chunks.__aiter__()
+    try:
+        while True:
+            next_chunk = asyncio.ensure_future(iterator.__anext__())
+            await asyncio.wait({next_chunk, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if not next_chunk.done():
+                # Let the generator unwind before it is closed below.
+                next_chunk.cancel()
+                await asyncio.wait({next_chunk})
+                return
+            try:
+                chunk = next_chunk.result()
+            except StopAsyncIteration:
+                break
+            await asyncio.wait_for(
+                send({'type': 'http.response.body', 'body': chunk, 'more_body': True}),
+                config.STREAM_SEND_TIMEOUT
+            )
+        await send({'type': 'http.response.body', 'body': b''})
+    except asyncio.TimeoutError:
+        logger.info("Dropping stream client that stopped reading")
+    finally:
+        disconnected.cancel()
+        await iterator.aclose()
+
+def _live_arg(request: Request) -> bool:
+    return (request.arg('live') or '').lower() in ('1', 'true')
+
+def register_routes(app: ASGIApp) -> None:
+    @app.before_request
+    def rate_limit(request: Request):
+        return handlers.rate_limit(request.path, request.client, request.headers.get('x-forwarded-for'))
+
+    @app.route('/api/application/<app_id>')
+    async def get_application_flags(request: Request, app_id: str):
+        return await handlers.get_application_flags(
+            app_id,
+            request.headers.get('accept-encoding'),
+            request.headers.get('if-none-match')
+        )
+
+    @app.route('/api/check', methods=('POST',))
+    async def check_flags(request: Request):
+        return await handlers.check_flags(await request.json(app.max_content_length))
+
+    @app.route('/api/check/batch', methods=('POST',))
+    async def check_flags_batch(request: Request):
+        return await handlers.check_flags_batch(await request.json(config.BATCH_MAX_CONTENT_LENGTH))
+
+    @app.route('/api/validate', methods=('POST',))
+    async def validate_profile(request: Request):
+        return await handlers.validate_profile(await request.json(app.max_content_length))
+
+    @app.route('/api/search')
+    async def search_flags(request: Request):
+        return await handlers.search_flags(request.arg('q'), request.arg('offset'), request.arg('limit'))
+
+    @app.route('/api/changes')
+    async def get_changes(request: Request):
+        return await handlers.get_changes(request.arg('since'), request.arg('app'))
+
+    @app.route('/api/stream')
+    async def stream_updates(request: Request):
+        return await handlers.stream_updates(
+            request.arg('app'),
+            (request.arg('diff') or '').lower() in ('1', 'true'),
+            request.headers.get('last-event-id')
+        )
+
+    @app.route('/')
+    async def get_stats(request: Request):
+        return await handlers.get_stats()
+
+    @app.route('/metrics')
+    async def get_metrics(request: Request):
+        return await handlers.get_metrics()
+
+    @app.route('/api/admin/refresh', methods=('POST',))
+    async def admin_refresh(request: Request):
+        return await handlers.admin_refresh(request.headers.get('authorization'))
+
+    @app.route('/api/debug/flag-analysis')
+    async def debug_flag_analysis(request: Request):
+        return await handlers.debug_flag_analysis(_live_arg(request))
+
+    @app.route('/api/debug/find-flag/<flag_name>')
+    async def debug_find_flag(request: Request, flag_name: str):
+        return await handlers.debug_find_flag(flag_name, _live_arg(request))
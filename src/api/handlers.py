@@ -0,0 +1,412 @@
+from core.flag_service import FlagService
+from core.flag_fetcher import FlagFetcher
+from core.response_cache import negotiate_encoding, etag_matches
+from core.update_broadcaster import UpdateBroadcaster
+from utils.access_log import note
+from utils.rate_limiter import RateLimiter
+from utils.metrics import REGISTRY
+from typing import Any, Iterable, Iterator, Optional
+import config
+import hmac
+import json
+import logging
+import os
+import signal
+
+# Framework-neutral route bodies shared by the Flask blueprint (routes.py)
+# and the ASGI app (asgi.py). Each returns (payload, status[, headers]);
+# payload is a dict (sent as JSON), bytes, or an iterator of bytes chunks
+# (streamed); long-lived streams are async iterators and ASGI only.
+
+logger = logging.getLogger(__name__)
+flag_service = FlagService.instance()
+
+NDJSON_CHUNK_SIZE = 16 * 1024
+
+def route_class(path: str) -> str:
+    if path.startswith(('/api/check', '/api/validate')):
+        return 'check'
+    if path.startswith(('/api/debug/', '/api/admin/')):
+        return 'debug'
+    return 'default'
+
+def client_ip(remote_addr: Optional[str], forwarded_for: Optional[str] = None) -> Optional[str]:
+    if forwarded_for and config.TRUST_PROXY_HEADERS:
+        return forwarded_for.split(',')[0].strip() or remote_addr
+    return remote_addr
+
+def rate_limit(path: str, remote_addr: Optional[str], forwarded_for: Optional[str] = None):
+    # Runs before every route; None lets the request through.
+    retry_after = RateLimiter.instance().check(route_class(path), client_ip(remote_addr, forwarded_for))
+    if not retry_after:
+        return None
+    return {
+        'error': 'Rate limit exceeded',
+        'retry_after': retry_after
+    }, 429, {'Retry-After': str(retry_after)}
+
+def _check_job_error(data: Any) -> Optional[str]:
+    if not data or not isinstance(data, dict):
+        return 'Invalid JSON payload'
+
+    flags = data.get('flags', [])
+    applications = data.get('applications', [])
+
+    if not isinstance(flags, list) or not isinstance(applications, list):
+        return 'flags and applications must be arrays'
+
+    if not flags or not applications:
+        return 'flags and applications arrays cannot be empty'
+
+    if not all(isinstance(name, str) for name in flags):
+        return 'flags must be strings'
+    if not all(isinstance(app_id, str) for app_id in applications):
+        return 'applications must be strings'
+    return None
+
+def _ndjson(records: Iterable[dict]) -> Iterator[bytes]:
+    # One JSON document per line, flushed in chunks rather than per line.
+    dumps = json.JSONEncoder(separators=(',', ':')).encode
+    buffer = []
+    size = 0
+    for record in records:
+        line = dumps(record).encode('utf-8') + b'\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= NDJSON_CHUNK_SIZE:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+async def get_application_flags(app_id: str, accept_encoding: Optional[str] = None,
+                                if_none_match: Optional[str] = None):
+    note(app_ids=(app_id,))
+    try:
+        snapshot = flag_service.snapshot
+        rendered = flag_service.get_application_response(app_id, snapshot)
+        encoding = negotiate_encoding(accept_encoding, rendered.bodies)
+        etag = rendered.etags[encoding]
+        headers = {
+            'ETag': etag,
+            'Vary': 'Accept-Encoding',
+            'Cache-Control': 'no-cache',
+            # Baseline for /api/changes?since=
+            'X-Flag-Generation': str(snapshot.generation)
+        }
+        status = snapshot.sources.get(app_id)
+        if status is not None:
+            # Seconds since upstream last vouched for this data, and whether
+            # it is being served after a failed fetch.
+            age = status.age()
+            if age is not None:
+                headers['X-Flag-Age'] = str(int(age))
+            headers['X-Flag-Stale'] = 'true' if status.stale else 'false'
+
+        if etag_matches(if_none_match, etag):
+            return b'', 304, headers
+
+        headers['Content-Type'] = 'application/json'
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        return rendered.bodies[encoding], 200, headers
+    except ValueError as e:
+        return {
+            'error': str(e),
+            'valid_applications': list(FlagFetcher.VALID_CLIENTS)
+        }, 400
+    except Exception as e:
+        logger.error(f"Error getting flags for {app_id}: {e}")
+        return {
+            'error': 'Internal server error'
+        }, 500
+
+async def check_flags(data):
+    try:
+        error = _check_job_error(data)
+        if error:
+            return {'error': error}, 400
+
+        note(app_ids=data['applications'], flags=len(data['flags']))
+        result = await flag_service.check_flags(data['flags'], data['applications'])
+        return {
+            'success': True,
+            'valid': result.valid,
+            'invalid': result.invalid,
+            'risk': result.risk
+        }, 200
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    except Exception as e:
+        logger.error(f"Error checking flags: {e}")
+        return {'error': 'Internal server error'}, 500
+
+async def check_flags_batch(data):
+    try:
+        if not isinstance(data, list) or not data:
+            return {'error': 'Expected a non-empty array of {flags, applications} jobs'}, 400
+        if len(data) > config.BATCH_MAX_JOBS:
+            return {'error': f'At most {config.BATCH_MAX_JOBS} jobs per batch'}, 400
+
+        errors = [_check_job_error(job) for job in data]
+        jobs = [(job['flags'], job['applications']) for job, error in zip(data, errors) if not error]
+        note(app_ids=list(dict.fromkeys(app for _, applications in jobs for app in applications)),
+             flags=sum(len(flags) for flags, _ in jobs))
+        results = await flag_service.check_flags_batch(jobs)
+
+        def records():
+            # Malformed jobs get their error line in place; the rest are
+            # consumed from results in order.
+            for i, error in enumerate(errors):
+                if error:
+                    yield {'job': i, 'error': error}
+                    continue
+                result = next(results)
+                if isinstance(result, ValueError):
+                    yield {'job': i, 'error': str(result)}
+                else:
+                    yield {
+                        'job': i,
+                        'success': True,
+                        'valid': result.valid,
+                        'invalid': result.invalid,
+                        'risk': result.risk
+                    }
+
+        return _ndjson(records()), 200, {'Content-Type': 'application/x-ndjson'}
+    except Exception as e:
+        logger.error(f"Error checking flag batch: {e}")
+        return {'error': 'Internal server error'}, 500
+
+async def validate_profile(data):
+    # Either a bare fastflag profile, {name: value, ...}, or
+    # {"flags": {name: value, ...}, "applications": [...]} to check names
+    # against specific applications instead of all of them. Only an object
+    # with no other keys is the wrapped form.
+    try:
+        if not isinstance(data, dict) or not data:
+            return {'error': 'Expected a non-empty {name: value} profile'}, 400
+
+        applications = config.VALID_APPLICATIONS
+        profile = data
+        if isinstance(data.get('flags'), dict) and data.keys() <= {'flags', 'applications'}:
+            profile = data['flags']
+            applications = data.get('applications') or applications
+            if not isinstance(applications, list) or not all(isinstance(a, str) for a in applications):
+                return {'error': 'applications must be an array of strings'}, 400
+        if not profile:
+            return {'error': 'Expected a non-empty {name: value} profile'}, 400
+
+        note(app_ids=applications, flags=len(profile))
+        result = flag_service.validate_profile(profile, applications)
+        counts = result.counts()
+        return {
+            'success': True,
+            # true when the profile holds nothing but valid or whitelisted flags
+            'valid': counts.get('valid', 0) + counts.get('whitelisted', 0) == len(profile),
+            'counts': counts,
+            'verdicts': result.verdicts,
+            'errors': result.errors
+        }, 200
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    except Exception as e:
+        logger.error(f"Error validating profile: {e}")
+        return {'error': 'Internal server error'}, 500
+
+def _int_arg(value: Optional[str], default: int, name: str) -> int:
+    if value is None or value == '':
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an integer')
+    if number < 0:
+        raise ValueError(f'{name} must not be negative')
+    return number
+
+async def search_flags(query: Optional[str], offset: Optional[str] = None, limit: Optional[str] = None):
+    try:
+        if not query or not query.strip():
+            return {'error': 'Missing search query q'}, 400
+        if len(query) > config.SEARCH_MAX_QUERY_LENGTH:
+            return {'error': f'q must be at most {config.SEARCH_MAX_QUERY_LENGTH} characters'}, 400
+
+        offset = _int_arg(offset, 0, 'offset')
+        limit = min(_int_arg(limit, config.SEARCH_DEFAULT_LIMIT, 'limit'), config.SEARCH_MAX_LIMIT)
+
+        results, has_more = flag_service.search_flags(query, offset, limit)
+        return {
+            'success': True,
+            'query': query,
+            'offset': offset,
+            'limit': limit,
+            'has_more': has_more,
+            'results': [result.to_dict() for result in results]
+        }, 200
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    except Exception as e:
+        logger.error(f"Error searching flags for {query!r}: {e}")
+        return {'error': 'Internal server error'}, 500
+
+async def get_changes(since: Optional[str], app_id: Optional[str] = None):
+    try:
+        if since is None or since == '':
+            return {'error': 'Missing since generation'}, 400
+        since = _int_arg(since, 0, 'since')
+        if app_id is not None and app_id not in FlagFetcher.VALID_CLIENTS:
+            return {'error': f'Invalid application ID: {app_id}'}, 400
+
+        generation, changes = flag_service.changes_since(since)
+        if changes is None:
+            # Too far behind, or ahead of this server after a restart: start
+            # over from the full lists at the current generation.
+            return {
+                'error': 'Changes since this generation are no longer available',
+                'generation': generation
+            }, 410
+
+        return {
+            'success': True,
+            'since': since,
+            'generation': generation,
+            'changes': [diff.to_dict(app_id) for diff in changes]
+        }, 200
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    except Exception as e:
+        logger.error(f"Error getting changes since {since}: {e}")
+        return {'error': 'Internal server error'}, 500
+
+async def stream_updates(app_id: Optional[str] = None, diff: bool = False, last_event_id: Optional[str] = None):
+    try:
+        if app_id is not None and app_id not in FlagFetcher.VALID_CLIENTS:
+            return {'error': f'Invalid application ID: {app_id}'}, 400
+        if app_id is not None:
+            note(app_ids=(app_id,))
+        broadcaster = UpdateBroadcaster.instance()
+        if broadcaster.subscribers >= config.STREAM_MAX_SUBSCRIBERS:
+            return {'error': 'Too many open streams'}, 503, {'Retry-After': str(config.STREAM_RETRY_MS // 1000)}
+
+        # A malformed Last-Event-ID is treated like a fresh connection.
+        last_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+        return broadcaster.stream(app_id, diff, last_id), 200, {
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    except Exception as e:
+        logger.error(f"Error opening update stream: {e}")
+        return {'error': 'Internal server error'}, 500
+
+async def get_stats():
+    try:
+        stats = flag_service.stats
+        return {
+            'success': True,
+            'uptime': stats.uptime,
+            'last_fetch': stats.last_fetch.isoformat() if stats.last_fetch else None,
+            'cache_size': stats.cache_size,
+            'generation': stats.generation,
+            'refresh': stats.refresh.to_dict() if stats.refresh else None,
+            'sources': {app_id: status.to_dict() for app_id, status in (stats.sources or {}).items()}
+        }, 200
+    except Exception as e:
+        logger.error(f"Error getting stats: {e}")
+        return {'error': 'Internal server error'}, 500
+
+async def get_metrics():
+    if not REGISTRY.enabled:
+        return {'error': 'Metrics are disabled'}, 404
+    try:
+        return REGISTRY.render().encode('utf-8'), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+    except Exception as e:
+        logger.error(f"Error rendering metrics: {e}")
+        return {'error': 'Internal server error'}, 500
+
+def _admin_error(authorization: Optional[str]):
+    if not config.ADMIN_TOKEN:
+        return {'error': 'Admin endpoints are disabled'}, 404
+    scheme, _, token = (authorization or '').partition(' ')
+    if scheme.lower() != 'bearer' or not hmac.compare_digest(token.strip().encode(), config.ADMIN_TOKEN.encode()):
+        return {'error': 'Unauthorized'}, 401, {'WWW-Authenticate': 'Bearer'}
+    return None
+
+async def admin_refresh(authorization: Optional[str]):
+    # Forces an upstream refresh. A refresh already in flight (scheduled,
+    # startup or another admin call) is joined rather than duplicated.
+    error = _admin_error(authorization)
+    if error:
+        return error
+
+    if flag_service.follower:
+        # Supervisor worker: the refresher process does the fetching; the
+        # supervisor forwards SIGUSR1 to it and this worker picks up the
+        # result like any other generation.
+        os.kill(os.getppid(), signal.SIGUSR1)
+        return {'success': True, 'queued': True, 'generation': flag_service.generation}, 202
+
+    try:
+        generation, joined = await flag_service.trigger_refresh()
+        return {'success': True, 'generation': generation, 'joined': joined}, 200
+    except Exception as e:
+        logger.error(f"Admin refresh failed: {e}")
+        return {'error': f'Refresh failed: {e}', 'generation': flag_service.generation}, 502
+
+DEBUG_TARGET_FLAG = "DFIntTaskSchedulerTargetFps"
+
+async def _live_refresh(live: bool) -> Optional[str]:
+    # Live data goes through the service's coalesced refresh, so concurrent
+    # debug calls share one upstream fetch (at most one per
+    # DEBUG_LIVE_MIN_INTERVAL) instead of each downloading FVariables.txt.
+    if not live:
+        return None
+    try:
+        await flag_service.refresh(config.DEBUG_LIVE_MIN_INTERVAL)
+        return None
+    except Exception as e:
+        return str(e)
+
+async def debug_flag_analysis(live: bool = False):
+    try:
+        refresh_error = await _live_refresh(live)
+        snapshot = flag_service.snapshot
+        summary = snapshot.github
+        has_target = flag_service.flag_presence(DEBUG_TARGET_FLAG)["ALL"]
+
+        result = {
+            'success': True,
+            'generation': snapshot.generation,
+            'snapshot_created_at': snapshot.created_at.isoformat(),
+            'github_raw_count': summary.flag_count,
+            'prefix_analysis': summary.prefix_counts,
+            'has_target_flag': has_target,
+            'dfint_sample': summary.dfint_sample,
+            'cache_check': has_target
+        }
+        if refresh_error:
+            result['refresh_error'] = refresh_error
+        return result, 200
+    except Exception as e:
+        logger.error(f"Error in flag analysis: {e}")
+        return {'error': f'Error in analysis: {str(e)}'}, 500
+
+async def debug_find_flag(flag_name: str, live: bool = False):
+    try:
+        refresh_error = await _live_refresh(live)
+        presence = flag_service.flag_presence(flag_name)
+
+        result = {
+            'success': True,
+            'flag_name': flag_name,
+            'generation': flag_service.generation,
+            'in_applications': presence,
+            'in_github': presence["ALL"]
+        }
+        if refresh_error:
+            result['refresh_error'] = refresh_error
+        return result, 200
+    except Exception as e:
+        logger.error(f"Error finding flag {flag_name}: {e}")
+        return {'error': f'Error finding flag: {str(e)}'}, 500
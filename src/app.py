@@ -1,6 +1,13 @@
 from flask import Flask
 from api.routes import api
+from api.asgi import ASGIApp, register_routes
 from core.flag_service import FlagService
+from core.refresher import CacheRefresher
+from core.snapshot_follower import SnapshotFollower
+from core.list_reloader import ListReloader
+from utils.access_log import AccessLog
+from utils.event_loop import EventLoopThread
+import config
 import asyncio
 import os
 import json
@@ -26,7 +33,7 @@ def create_app():
     
 
     app.config['JSON_SORT_KEYS'] = False
-    app.config['MAX_CONTENT_LENGTH'] = 1 * 1024 * 1024  
+    app.config['MAX_CONTENT_LENGTH'] = config.MAX_CONTENT_LENGTH
     
 
     app.register_blueprint(api)
@@ -40,6 +47,10 @@ def create_app():
     def method_not_allowed(e):
         return {'error': 'Method not allowed'}, 405
 
+    @app.errorhandler(413)
+    def payload_too_large(e):
+        return {'error': 'Payload too large'}, 413
+
     @app.errorhandler(500)
     def server_error(e):
         logging.error(f"Server error: {str(e)}")
@@ -47,6 +58,21 @@ def create_app():
 
     return app
 
+def create_asgi_app(worker: bool = False):
+
+    app = ASGIApp(max_content_length=config.MAX_CONTENT_LENGTH)
+    register_routes(app)
+
+    # FlagService is initialised and awaited directly on the server's loop.
+    app.on_startup(init_worker_services if worker else init_services)
+
+    @app.on_shutdown
+    async def close_services():
+        logging.info("Shutting down FLAGSMAN API")
+        await shutdown_services()
+
+    return app
+
 def ensure_data_files():
     os.makedirs('data', exist_ok=True)
     
@@ -62,46 +88,146 @@ def ensure_data_files():
                 f.write(content)
             logging.info(f"Created default {filename}")
 
-async def init_services():
+def _log_warm_failure(future: asyncio.Future) -> None:
+    # The warm-up runs unawaited next to the first refresh; a failure only
+    # means the first requests render their responses themselves.
+    if not future.cancelled() and future.exception() is not None:
+        logging.error("Warming the loaded snapshot failed", exc_info=future.exception())
+
+async def init_services(background_refresh: bool = True):
+    service = FlagService.instance()
+    if config.ACCESS_LOG:
+        AccessLog.instance().start()
+    if background_refresh and config.LIST_WATCH:
+        ListReloader.instance().start()
+
+    if background_refresh and service.load_snapshot():
+        # Serve the snapshot from disk right away and refresh from upstream
+        # in the background.
+        warm = asyncio.get_running_loop().run_in_executor(None, service.warm_snapshot)
+        warm.add_done_callback(_log_warm_failure)
+        CacheRefresher.instance().start(initial_delay=0)
+        logging.info(f"Services initialized from disk snapshot (generation {service.generation})")
+        return
+
     try:
-        service = FlagService.instance()
         await service.update_cache()
         logging.info("Services initialized successfully")
     except Exception as e:
+        # Keep serving the empty snapshot; the refresher retries with backoff.
         logging.error(f"Service initialization failed: {e}")
-        raise
+
+    if background_refresh:
+        CacheRefresher.instance().start()
+
+async def init_refresher_services():
+    # Supervisor refresher: it serves no requests, so it runs neither the
+    # access log nor the list reloader (workers apply their own lists when
+    # they load a snapshot); it only refreshes and saves snapshots.
+    service = FlagService.instance()
+    if service.load_snapshot():
+        # Carry on from the generation the workers already serve.
+        CacheRefresher.instance().start(initial_delay=0)
+        logging.info(f"Refresher resuming from disk snapshot (generation {service.generation})")
+        return
+
+    try:
+        await service.update_cache()
+    except Exception as e:
+        logging.error(f"Initial refresh failed: {e}")
+    CacheRefresher.instance().start()
+
+async def init_worker_services():
+    # Supervisor worker: serve what the refresher process last published and
+    # follow it from then on, never fetching upstream itself.
+    service = FlagService.instance()
+    service.follower = True
+    if config.ACCESS_LOG:
+        AccessLog.instance().start()
+    if service.follow_snapshot():
+        await asyncio.get_running_loop().run_in_executor(None, service.warm_snapshot)
+        logging.info(f"Worker serving snapshot generation {service.generation}")
+    else:
+        logging.warning("No snapshot published yet, serving an empty cache until the refresher writes one")
+    SnapshotFollower.instance().start()
+    if config.LIST_WATCH:
+        ListReloader.instance().start()
+
+async def shutdown_services():
+    await ListReloader.instance().stop()
+    await SnapshotFollower.instance().stop()
+    await CacheRefresher.instance().stop()
+    await FlagService.instance().close()
+    AccessLog.instance().stop()
 
 def cleanup():
 
     logging.info("Shutting down FLAGSMAN API")
 
-def main():
+    loop_thread = EventLoopThread.instance()
+    if loop_thread.running:
+        try:
+            loop_thread.run(shutdown_services(), timeout=5)
+        except Exception as e:
+            logging.error(f"Error closing services: {e}")
+        loop_thread.stop()
+
+def run_wsgi():
+
+    if config.SHARED_EVENT_LOOP:
+        # Services are initialised on the shared loop so the aiohttp
+        # session they create stays usable for every later request.
+        EventLoopThread.instance().start()
+        EventLoopThread.instance().run(init_services())
+    else:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        # Nothing keeps this loop running, so there is no background refresh.
+        loop.run_until_complete(init_services(background_refresh=False))
+    
+
+    atexit.register(cleanup)
+    
+
+    app = create_app()
+    app.run(
+        host=config.HOST,
+        port=config.PORT,
+        threaded=True,
+        use_reloader=False 
+    )
+
+def run_asgi():
+
+    try:
+        import uvicorn
+    except ImportError:
+        raise RuntimeError("ASGI mode requires uvicorn (pip install uvicorn)")
+
+    uvicorn.run(
+        create_asgi_app(),
+        host=config.HOST,
+        port=config.PORT,
+        lifespan='on',
+        log_config=None
+    )
+
+def main(mode: str = 'wsgi', workers: int = 1):
 
     setup_logging()
-    logging.info("Starting FLAGSMAN API")
+    logging.info(f"Starting FLAGSMAN API ({mode}, {workers} worker{'s' if workers != 1 else ''})")
     
     try:
 
         ensure_data_files()
-        
-
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-
-        loop.run_until_complete(init_services())
-        
-
-        atexit.register(cleanup)
-        
 
-        app = create_app()
-        app.run(
-            host='0.0.0.0',
-            port=8000,
-            threaded=True,
-            use_reloader=False 
-        )
+        if workers > 1:
+            from supervisor import Supervisor
+            Supervisor(mode, workers).run()
+        elif mode == 'asgi':
+            run_asgi()
+        else:
+            run_wsgi()
         
     except Exception as e:
         logging.error(f"Application startup failed: {e}")
@@ -6,16 +6,103 @@ HOST = os.getenv('APPLEBLOX_HOST', '0.0.0.0')
 PORT = int(os.getenv('APPLEBLOX_PORT', '8000'))
 DEBUG = os.getenv('APPLEBLOX_DEBUG', '0').lower() in ('1', 'true')
 
+MAX_CONTENT_LENGTH = 1 * 1024 * 1024
+# /api/check/batch takes many jobs per request, so it has its own limits.
+BATCH_MAX_CONTENT_LENGTH = int(os.getenv('APPLEBLOX_BATCH_MAX_CONTENT_LENGTH', str(16 * 1024 * 1024)))
+BATCH_MAX_JOBS = int(os.getenv('APPLEBLOX_BATCH_MAX_JOBS', '10000'))
+
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+SEARCH_MAX_QUERY_LENGTH = 200
+
 RATE_LIMIT_WINDOW = 60
 RATE_LIMIT_MAX_REQUESTS = 100  
+RATE_LIMIT_ENABLED = os.getenv('APPLEBLOX_RATE_LIMIT', '1').lower() in ('1', 'true')
+# Token bucket per client IP and route class: (burst / max requests, window
+# in seconds to refill it). Unlisted classes use "default".
+RATE_LIMITS = {
+    'default': (RATE_LIMIT_MAX_REQUESTS, RATE_LIMIT_WINDOW),
+    'check': (RATE_LIMIT_MAX_REQUESTS, RATE_LIMIT_WINDOW),
+    'debug': (10, RATE_LIMIT_WINDOW),
+}
+# "memory" (per process) or "shared" (one mmap'd table for every worker on the host)
+RATE_LIMIT_BACKEND = os.getenv('APPLEBLOX_RATE_LIMIT_BACKEND', 'memory')
+RATE_LIMIT_SHARED_SLOTS = 65536
+# Take the client IP from X-Forwarded-For; only behind a trusted proxy.
+TRUST_PROXY_HEADERS = os.getenv('APPLEBLOX_TRUST_PROXY', '0').lower() in ('1', 'true')
+
+
+CACHE_UPDATE_INTERVAL = int(os.getenv('APPLEBLOX_CACHE_UPDATE_INTERVAL', '3600'))
+CACHE_UPDATE_JITTER = 0.1  # +/- fraction of the interval
+CACHE_RETRY_MIN = 30  # first retry after a failed refresh, doubled per failure
+CACHE_RETRY_MAX = 900
+# Debug routes asking for live data trigger at most one refresh per interval.
+DEBUG_LIVE_MIN_INTERVAL = 30
+# Bearer token for /api/admin/*; the admin routes answer 404 while unset.
+ADMIN_TOKEN = os.getenv('APPLEBLOX_ADMIN_TOKEN', '')
+# /api/stream (server-sent events, ASGI only)
+STREAM_HEARTBEAT = 15  # seconds between keep-alive comments on an idle stream
+STREAM_BUFFER = 16  # published events kept for subscribers that fall behind
+STREAM_SEND_TIMEOUT = 30  # a client not reading for this long is dropped
+STREAM_MAX_SUBSCRIBERS = 10000
+STREAM_RETRY_MS = 5000  # reconnect delay suggested to clients
+
+# Diffs kept for /api/changes; older generations have to re-download.
+CHANGES_HISTORY = 64
+REQUEST_TIMEOUT = 30  # total per attempt, connect + response + body
 
+# Upstream HTTP client
+HTTP_CONNECT_TIMEOUT = float(os.getenv('APPLEBLOX_HTTP_CONNECT_TIMEOUT', '5'))
+HTTP_READ_TIMEOUT = float(os.getenv('APPLEBLOX_HTTP_READ_TIMEOUT', '10'))  # max gap between reads
+HTTP_RETRIES = int(os.getenv('APPLEBLOX_HTTP_RETRIES', '3'))  # extra attempts after the first
+HTTP_RETRY_BACKOFF = 0.5  # first retry waits up to this, doubled per attempt (full jitter)
+HTTP_RETRY_BACKOFF_MAX = 8
+HTTP_RETRY_STATUSES = (429, 500, 502, 503, 504)
+HTTP_POOL_LIMIT = 100
+HTTP_POOL_LIMIT_PER_HOST = 8
+HTTP_DNS_CACHE_TTL = 300
+HTTP_KEEPALIVE_TIMEOUT = 30
 
-CACHE_UPDATE_INTERVAL = 3600  
-REQUEST_TIMEOUT = 30 
+# Supervisor mode (run.py --workers N): one refresher process fetches
+# upstream and publishes SNAPSHOT_PATH, N serving workers map it read-only
+# and pick up each new generation.
+WORKERS = int(os.getenv('APPLEBLOX_WORKERS', '1'))
+SNAPSHOT_POLL_INTERVAL = float(os.getenv('APPLEBLOX_SNAPSHOT_POLL_INTERVAL', '1'))
+WORKER_STARTUP_TIMEOUT = 60  # wait this long for a first snapshot before starting workers anyway
+WORKER_RESTART_DELAY = 1
+
+# Prometheus-style /metrics; when off, instrumentation compiles down to no-ops.
+METRICS_ENABLED = os.getenv('APPLEBLOX_METRICS', '1').lower() in ('1', 'true')
+
+# Run route coroutines on one long-lived event loop thread instead of a new
+# loop per request. Set to 0 to fall back to the per-request loop.
+SHARED_EVENT_LOOP = os.getenv('APPLEBLOX_SHARED_LOOP', '1').lower() in ('1', 'true')
 
 DATA_DIR = 'data'
 WHITELIST_PATH = os.path.join(DATA_DIR, 'whitelist.json')
 RISK_LIST_PATH = os.path.join(DATA_DIR, 'risklist.json')
+SNAPSHOT_PATH = os.getenv('APPLEBLOX_SNAPSHOT_PATH', os.path.join(DATA_DIR, 'cache', 'flags.snap'))
+RATE_LIMIT_SHARED_PATH = os.path.join(DATA_DIR, 'cache', 'ratelimit.shm')
+
+# Reload the whitelist and risk list when their files change: inotify on
+# Linux, a stat() poll every LIST_POLL_INTERVAL seconds otherwise (and as a
+# backstop to inotify).
+LIST_WATCH = os.getenv('APPLEBLOX_LIST_WATCH', '1').lower() in ('1', 'true')
+LIST_POLL_INTERVAL = float(os.getenv('APPLEBLOX_LIST_POLL_INTERVAL', '2'))
+LIST_RELOAD_DEBOUNCE = 0.05
+
+# Structured access log, one JSON line per request, written in batches by a
+# background thread. Records are dropped (and counted) rather than queued
+# past ACCESS_LOG_QUEUE. Supervisor workers each write their own file,
+# e.g. logs/requests.worker-0.jsonl.
+ACCESS_LOG = os.getenv('APPLEBLOX_ACCESS_LOG', '1').lower() in ('1', 'true')
+ACCESS_LOG_PATH = os.getenv('APPLEBLOX_ACCESS_LOG_PATH', os.path.join('logs', 'requests.jsonl'))
+ACCESS_LOG_QUEUE = 65536
+ACCESS_LOG_BATCH = 1024  # records per write
+ACCESS_LOG_FLUSH_INTERVAL = 1.0  # seconds a record may wait for a batch to fill
+ACCESS_LOG_MAX_BYTES = int(os.getenv('APPLEBLOX_ACCESS_LOG_MAX_BYTES', str(64 * 1024 * 1024)))  # rotate past this
+ACCESS_LOG_BACKUPS = 5
+ACCESS_LOG_COMPRESS = os.getenv('APPLEBLOX_ACCESS_LOG_COMPRESS', '1').lower() in ('1', 'true')
 
 
 VALID_APPLICATIONS: List[str] = [
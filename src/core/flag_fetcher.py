@@ -1,10 +1,14 @@
 import aiohttp
+import hashlib
 import logging
-import json
-import os
-from typing import Dict, Optional
+import time
+from typing import Any, AsyncIterator, Dict, Optional, Set, Tuple
 from datetime import datetime
+from models import SourceStatus
 from utils.http_client import HTTPClient
+from utils.metrics import FETCH_ALL_SECONDS, FETCH_BYTES, FETCH_RESPONSES, FETCH_SECONDS, timed
+from utils.single_flight import SingleFlight
+from .fvariables import default_value, iter_fvariables_batches
 
 logger = logging.getLogger(__name__)
 
@@ -27,62 +31,192 @@ class FlagFetcher:
     def __init__(self):
         self._http = HTTPClient()
         self._last_fetch: Optional[datetime] = None
+        # url -> last successfully parsed payload, reused on 304 Not Modified
+        self._parsed: Dict[str, Any] = {}
+        self._digests: Dict[str, bytes] = {}
+        self._flag_types: Dict[str, str] = {}
+        # app -> merged result handed out by the last fetch_all_flags()
+        self._results: Dict[str, dict] = {}
+        # source ("github" or a client) -> when upstream last answered for it
+        self._verified: Dict[str, datetime] = {}
+        # sources whose latest fetch failed and fell back to earlier data
+        self._failed: Set[str] = set()
+        self._fetch_flight: SingleFlight[Dict[str, dict]] = SingleFlight()
 
     @property
     def last_fetch(self) -> Optional[datetime]:
         return self._last_fetch
 
-    async def fetch_application_flags(self, app_name: str) -> Optional[dict]:
-        if app_name not in self.VALID_CLIENTS:
-            logger.warning(f"Skipping fetch for invalid client: {app_name}")
-            return None
-
-        url = f"{self.BASE_URL}/{app_name}"
-
+    async def close(self) -> None:
+        await self._http.close()
+
+    async def _fetch_source(self, url: str, stream=None) -> Tuple[Optional[Any], bool]:
+        # Returns (parsed payload, changed). An unchanged source hands back
+        # the object parsed last time, so callers can compare by identity.
+        # A failed fetch does too: the last good payload is kept (and the
+        # source marked failed) rather than dropped, None only when there
+        # never was one.
+        previous = self._parsed.get(url)
+        source = self._source_name(url)
+        started = time.perf_counter()
+        result = await self._http.fetch(url, conditional=previous is not None, stream=stream)
+        FETCH_SECONDS.observe(time.perf_counter() - started, source=source)
+        FETCH_RESPONSES.inc(source=source, status=str(result.status or 'error'))
+        if result.size:
+            FETCH_BYTES.inc(result.size, source=source)
+
+        if not result.not_modified and not result.data:
+            self._failed.add(source)
+            return previous, False
+        self._failed.discard(source)
+        self._verified[source] = datetime.now()
+        if result.not_modified:
+            return previous, False
+
+        # Upstreams without validators answer 200 every time; only a real
+        # content change counts as changed.
+        if stream:
+            digest, data = result.data
+            if previous is not None and self._digests.get(url) == digest:
+                return previous, False
+            self._digests[url] = digest
+        else:
+            data = result.data
+            if previous is not None and data == previous:
+                return previous, False
+
+        self._parsed[url] = data
+        return data, True
+
+    def _source_name(self, url: str) -> str:
+        return "github" if url == self.GITHUB_URL else url.rsplit("/", 1)[-1]
+
+    def _source_status(self, source: str) -> SourceStatus:
+        return SourceStatus(self._verified.get(source), source in self._failed)
+
+    def app_status(self) -> Dict[str, SourceStatus]:
+        # app -> freshness of the last fetch_all_flags() result for it. A
+        # client's payload is merged with GitHub's, so it is as old as the
+        # older of the two and stale if either fetch failed.
+        github = self._source_status("github")
+        status = {}
+        for app in self._results:
+            if app == "ALL":
+                status[app] = github
+                continue
+            own = self._source_status(app)
+            status[app] = SourceStatus(
+                None if github.verified_at is None or own.verified_at is None
+                else min(github.verified_at, own.verified_at),
+                github.stale or own.stale
+            )
+        return status
+
+    @staticmethod
+    async def _read_fvariables(chunks: AsyncIterator[bytes]) -> Tuple[bytes, Tuple[Dict[str, str], Dict[str, str]]]:
+        digest = hashlib.sha1()
+
+        async def hashed():
+            async for chunk in chunks:
+                digest.update(chunk)
+                yield chunk
+
+        flags: Dict[str, str] = {}
+        types: Dict[str, str] = {}
+        async for batch in iter_fvariables_batches(hashed()):
+            for flag_type, name in batch:
+                flags[name] = default_value(name)
+                types[name] = flag_type
+
+        return digest.digest(), (flags, types)
+
+    async def _fetch_client(self, app_name: str) -> Tuple[Optional[dict], bool]:
         try:
-            response = await self._http.get(url)
-            if response:
+            response, changed = await self._fetch_source(f"{self.BASE_URL}/{app_name}")
+            if response and changed:
                 logger.info(f"Successfully fetched flags for {app_name}")
-            return response
+            return response, changed
 
         except Exception as e:
             logger.error(f"Failed to fetch flags for {app_name}: {str(e)}")
+            self._failed.add(app_name)
+            return self._parsed.get(f"{self.BASE_URL}/{app_name}"), False
+
+    async def fetch_application_flags(self, app_name: str) -> Optional[dict]:
+        if app_name not in self.VALID_CLIENTS:
+            logger.warning(f"Skipping fetch for invalid client: {app_name}")
             return None
 
+        response, _ = await self._fetch_client(app_name)
+        return response
+
     async def fetch_all_flags(self) -> Dict[str, dict]:
+        # Overlapping calls share one round of upstream requests.
+        results, _ = await self._fetch_flight.run(self._fetch_all_flags)
+        return results
+
+    @timed(FETCH_ALL_SECONDS)
+    async def _fetch_all_flags(self) -> Dict[str, dict]:
+        # Apps whose inputs did not change get the exact dict returned last
+        # time, so FlagService can skip rebuilding them.
         results = {}
+        changed_sources = []
+        skipped_sources = []
 
         try:
             # First, fetch GitHub flags
-            github_flags = await self.fetch_flags_from_github()
-            logger.info(f"Fetched {len(github_flags)} flags from GitHub")
+            github, github_changed = await self._fetch_source(self.GITHUB_URL, stream=self._read_fvariables)
+            if github is None:
+                # Nothing to fall back on yet: leave ALL out rather than
+                # publish it empty, and merge the clients with no defaults.
+                logger.error("Failed to fetch flags from GitHub")
+                github_flags = {}
+            else:
+                github_flags, self._flag_types = github
+                (changed_sources if github_changed else skipped_sources).append("GitHub")
+                logger.info(f"Fetched {len(github_flags)} flags from GitHub")
 
-            # Create the ALL application specifically from GitHub flags
-            all_app = {"applicationSettings": {}}
-            all_app["applicationSettings"] = github_flags.copy()  # Direct assignment
-            results["ALL"] = all_app
+                # Create the ALL application specifically from GitHub flags
+                if github_changed or "ALL" not in self._results:
+                    results["ALL"] = {"applicationSettings": github_flags.copy()}
+                else:
+                    results["ALL"] = self._results["ALL"]
 
             # Now fetch regular applications
             regular_clients = [c for c in self.VALID_CLIENTS if c != "ALL"]
-            tasks = [self.fetch_application_flags(client) for client in regular_clients]
+            tasks = [self._fetch_client(client) for client in regular_clients]
             responses = await self._http.gather(*tasks)
 
             # Process regular applications
-            for client, response in zip(regular_clients, responses):
-                if response:
-                    # Ensure applicationSettings exists
-                    if 'applicationSettings' not in response:
-                        response['applicationSettings'] = {}
-                    
-                    # Merge GitHub flags into this application's flags
-                    for flag_name, flag_value in github_flags.items():
-                        if flag_name not in response['applicationSettings']:
-                            response['applicationSettings'][flag_name] = flag_value
-                    
-                    results[client] = response
+            for client, fetched in zip(regular_clients, responses):
+                response, changed = fetched or (None, False)
+                if not response:
+                    continue
+
+                if not changed and not github_changed and client in self._results:
+                    results[client] = self._results[client]
+                    skipped_sources.append(client)
+                    continue
+                (changed_sources if changed else skipped_sources).append(client)
+
+                # Merge GitHub flags into this application's flags without
+                # touching the parsed response, which is kept for reuse.
+                settings = dict(response.get('applicationSettings') or {})
+                for flag_name, flag_value in github_flags.items():
+                    if flag_name not in settings:
+                        settings[flag_name] = flag_value
+
+                results[client] = {**response, 'applicationSettings': settings}
 
             self._last_fetch = datetime.now()
-            self.save_flags(results)
+            logger.info(
+                f"Fetch complete. Changed: {', '.join(changed_sources) or 'none'}; "
+                f"unchanged (skipped): {', '.join(skipped_sources) or 'none'}"
+            )
+            if self._failed:
+                logger.warning(f"Kept the last good data, if any, for failed sources: {', '.join(sorted(self._failed))}")
+
+            self._results = results
             return results
 
         except Exception as e:
@@ -91,62 +225,19 @@ class FlagFetcher:
 
     async def fetch_flags_from_github(self) -> Dict[str, str]:
         try:
-            response = await self._http.get(self.GITHUB_URL, raw=True)
-            if not response:
+            result = await self._http.fetch(self.GITHUB_URL, stream=self._read_fvariables)
+            if not result.data:
                 logger.error("Failed to fetch flags from GitHub")
                 return {}
 
-            flags = {}
-            for line in response.split('\n'):
-                line = line.strip()
-                if not line or line.startswith('#'):
-                    continue
-
-                # Check for pattern [Type] FlagName
-                if '] ' in line and line.startswith('['):
-                    type_end = line.find('] ')
-                    if type_end > 0:
-                        flag_name = line[type_end + 2:].strip()
-                        
-                        # Only add the flag if it has a recognized prefix
-                        if any(flag_name.startswith(prefix) for prefix in [
-                            'DFFlag', 'FFlag', 'BFFlag', 'FInt', 'DFInt', 'FString', 'DFString'
-                        ]):
-                            # Set appropriate default value based on prefix
-                            if flag_name.startswith(('DFInt', 'FInt')):
-                                flags[flag_name] = "0"
-                            elif flag_name.startswith(('DFString', 'FString')):
-                                flags[flag_name] = ""
-                            else:  # DFFlag, FFlag, etc.
-                                flags[flag_name] = "false"
-                
+            _, (flags, _) = result.data
             return flags
 
         except Exception as e:
             logger.error(f"Failed to fetch flags from GitHub: {str(e)}")
             return {}
-        
-    def save_flags(self, flags_data: Dict[str, dict]) -> bool:
-        try:
-            os.makedirs('data/cache', exist_ok=True)
-            with open('data/cache/flags.json', 'w') as f:
-                json.dump(flags_data, f)
-            logger.info("Successfully saved flags to disk")
-            return True
-        except Exception as e:
-            logger.error(f"Failed to save flags: {str(e)}")
-            return False
 
-    def load_saved_flags(self) -> Optional[Dict[str, dict]]:
-        try:
-            if os.path.exists('data/cache/flags.json'):
-                with open('data/cache/flags.json', 'r') as f:
-                    flags_data = json.load(f)
-                logger.info("Successfully loaded flags from disk")
-                return flags_data
-            else:
-                logger.info("No saved flags found")
-                return None
-        except Exception as e:
-            logger.error(f"Failed to load saved flags: {str(e)}")
-            return None
\ No newline at end of file
+    @property
+    def flag_types(self) -> Dict[str, str]:
+        # flag name -> source [Type] tag from FVariables.txt, e.g. "C++"
+        return self._flag_types
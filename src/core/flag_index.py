@@ -0,0 +1,126 @@
+from array import array
+from itertools import chain
+from typing import Collection, Dict, Iterable, Iterator, List, Mapping
+from types import MappingProxyType
+from config import VALID_APPLICATIONS
+from .flag_table import NAMES, AppFlags
+
+APP_BITS: Mapping[str, int] = MappingProxyType(
+    {app_id: 1 << i for i, app_id in enumerate(VALID_APPLICATIONS)}
+)
+RISK_BIT = 1 << len(VALID_APPLICATIONS)
+WHITELIST_BIT = RISK_BIT << 1
+ALL_APPS_MASK = RISK_BIT - 1
+
+
+
+class FlagIndex:
+    # name id -> bitmask of the applications containing it, with RISK_BIT
+    # set for names on the risk list and WHITELIST_BIT for names on the
+    # whitelist. Built once per cache swap, never mutated; lists holds the
+    # (risk list, whitelist) the list bits came from.
+    __slots__ = ('_masks', '_unnamed', '_size', 'lists')
+
+    def __init__(self, app_flags: Mapping[str, AppFlags], risk_list: Collection[str],
+                 whitelist: Collection[str] = ()):
+        masks = array('H', bytes(2 * len(NAMES)))
+        for app_id, flags in app_flags.items():
+            bit = APP_BITS[app_id]
+            for i in flags.ids:
+                masks[i] |= bit
+
+        self._set_lists(masks, risk_list, whitelist)
+
+    @classmethod
+    def from_app_masks(cls, app_masks: array, risk_list: Collection[str],
+                       whitelist: Collection[str] = ()) -> 'FlagIndex':
+        # Rebuild from app_masks() output, e.g. a snapshot loaded from disk.
+        index = cls.__new__(cls)
+        masks = array('H', app_masks)
+        if len(masks) < len(NAMES):
+            masks.extend([0] * (len(NAMES) - len(masks)))
+        index._set_lists(masks, risk_list, whitelist)
+        return index
+
+    def with_lists(self, risk_list: Collection[str], whitelist: Collection[str] = ()) -> 'FlagIndex':
+        # Same app bits, list bits from new lists. Only the names on the old
+        # and new lists are touched.
+        index = FlagIndex.__new__(FlagIndex)
+        masks = array('H', self._masks)
+        if len(masks) < len(NAMES):
+            masks.extend([0] * (len(NAMES) - len(masks)))
+        size = len(masks)
+        for i in NAMES.ids_of(chain.from_iterable(self.lists)):
+            if i is not None and i < size:
+                masks[i] &= ALL_APPS_MASK
+        index._set_lists(masks, risk_list, whitelist)
+        return index
+
+    def _set_lists(self, masks: array, risk_list: Collection[str], whitelist: Collection[str]) -> None:
+        # Listed names without an id (on no application) keep their bits in
+        # _unnamed rather than being interned: ids taken here, before a warm
+        # start, would stop the snapshot file's names from mapping onto the
+        # table as-is and force a copy of every id array.
+        size = len(masks)
+        unnamed: Dict[str, int] = {}
+        for names, bit in ((risk_list, RISK_BIT), (whitelist, WHITELIST_BIT)):
+            for name, i in zip(names, NAMES.ids_of(names)):
+                if i is not None and i < size:
+                    masks[i] |= bit
+                else:
+                    unnamed[name] = unnamed.get(name, 0) | bit
+        self._masks = masks
+        self._unnamed = unnamed
+        self._size = size - masks.count(0) + len(unnamed)
+        self.lists = (risk_list, whitelist)
+
+    def app_masks(self) -> array:
+        # The masks without the list bits, which come from the lists at load time.
+        return array('H', (mask & ALL_APPS_MASK for mask in self._masks))
+
+    @staticmethod
+    def app_mask(applications: Iterable[str]) -> int:
+        mask = 0
+        for app_id in applications:
+            bit = APP_BITS.get(app_id)
+            if bit is None:
+                raise ValueError(f"Invalid application ID: {app_id}")
+            mask |= bit
+        return mask
+
+    @staticmethod
+    def applications(mask: int) -> List[str]:
+        return [app_id for app_id, bit in APP_BITS.items() if mask & bit]
+
+    def name_ids(self) -> array:
+        # Ids of every name present in at least one application, ascending.
+        return array('I', (i for i, mask in enumerate(self._masks) if mask & ALL_APPS_MASK))
+
+    def used_ids(self) -> Iterator[int]:
+        # Ids this index holds any bits for, listed names included.
+        return (i for i, mask in enumerate(self._masks) if mask)
+
+    def lookup(self, name: str) -> int:
+        # _unnamed goes first: a name interned after this index was built may
+        # have been given an id this index has no bits for.
+        if self._unnamed:
+            bits = self._unnamed.get(name)
+            if bits is not None:
+                return bits
+        i = NAMES.id_of(name)
+        if i is None or i >= len(self._masks):
+            return 0
+        return self._masks[i]
+
+    def lookup_many(self, names: Iterable[str]) -> List[int]:
+        masks = self._masks
+        size = len(masks)
+        if self._unnamed:
+            names = list(names)
+            unnamed = self._unnamed.get
+            return [unnamed(name) or (masks[i] if i is not None and i < size else 0)
+                    for name, i in zip(names, NAMES.ids_of(names))]
+        return [masks[i] if i is not None and i < size else 0 for i in NAMES.ids_of(names)]
+
+    def __len__(self) -> int:
+        return self._size
@@ -1,31 +1,83 @@
+import asyncio
+import config
 import json
 import logging
-from typing import List, Set, Dict
+import re
+import time
+from collections import Counter, deque
+from dataclasses import replace
+from itertools import chain, islice
+from typing import Any, Callable, Deque, List, Set, Dict, Iterator, Optional, Sequence, Tuple, Union
 from threading import Lock
 from datetime import datetime
-from models import Flag, FlagCheckResult, CacheStats
+from models import (
+    Flag, FlagCheckResult, FlagSearchResult, FlagValidationResult, CacheStats, GitHubSummary, RefreshStats, RenderedResponse, AppDiff, SnapshotDiff,
+    SourceStatus
+)
 from .flag_fetcher import FlagFetcher
+from .flag_index import APP_BITS, FlagIndex, RISK_BIT, WHITELIST_BIT
+from .flag_table import NAMES, AppFlags
+from .flag_values import VALUES, value_error, value_kind
+from .fvariables import FLAG_PREFIXES
+from .response_cache import ApplicationRenderer, LazyResponses
+from .search_index import SearchIndex
+from .snapshot import FlagSnapshot
+from .snapshot_diff import diff_apps
+from .snapshot_store import (load_snapshot, load_sources, save_snapshot, save_sources, snapshot_generation,
+                             sources_path)
+from utils.metrics import (
+    CHECK_APPLICATIONS, CHECK_FLAGS, CHECK_SECONDS, REFRESH_SECONDS, REGISTRY,
+    SEARCH_SECONDS, SNAPSHOT_BUILD_SECONDS, VALIDATE_FLAGS, VALIDATE_SECONDS, timed
+)
+from utils.file_watcher import file_signature
+from utils.single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
+_GITHUB_PREFIX = re.compile('^(' + '|'.join(sorted(FLAG_PREFIXES, key=len, reverse=True)) + ')', re.MULTILINE)
+DFINT_SAMPLE_SIZE = 10
+# Unused NAMES / VALUES ids are released once a table holds twice the
+# entries the published snapshot used at its last pass, and at least this
+# many.
+TABLE_RECLAIM_MIN = 4096
+
+_CHECK_FLAGS = {kind: CHECK_FLAGS.labels(kind=kind) for kind in ('single', 'batch')}
+_CHECK_APPLICATIONS = {kind: CHECK_APPLICATIONS.labels(kind=kind) for kind in ('single', 'batch')}
+
 class FlagService:
     _instance = None
     _lock = Lock()
     
     # In FlagService class
     VALID_FLAG_PREFIXES = ['DFFlag', 'FFlag', 'BFFlag', 'FInt', 'DFInt', 'FString', 'DFString', "SFFlag"]
+    _VALID_PREFIX_TUPLE = tuple(VALID_FLAG_PREFIXES)
 
     def __init__(self):
         if FlagService._instance is not None:
             raise RuntimeError("Use FlagService.instance() to get singleton")
             
         self._fetcher = FlagFetcher()
-        self._cache: Dict[str, List[Flag]] = {}
         self._whitelist: Set[str] = set()
         self._risk_list: Set[str] = set()
         self._start_time = datetime.now()
+        self._refresh_stats = RefreshStats()
+        # Supervisor workers never fetch upstream; they follow the snapshot
+        # file published by the refresher process.
+        self.follower = False
+        # Diffs between consecutive published generations, oldest first
+        self._changes: Deque[SnapshotDiff] = deque(maxlen=config.CHANGES_HISTORY)
+        self._listeners: List[Callable[[FlagSnapshot, Optional[SnapshotDiff]], None]] = []
+        self._refresh_flight: SingleFlight[int] = SingleFlight()
+        # (inode, size, mtime) of the source status sidecar as last followed
+        self._followed = None
+        # Names and values the published snapshot used at the last reclaim
+        # pass of each table
+        self._names_live = 0
+        self._values_live = 0
         
         self._load_lists()
+        self._snapshot = self._build_snapshot({}, None)
+        REGISTRY.register_collector(self._collect_metrics)
 
     @classmethod
     def instance(cls) -> 'FlagService':
@@ -37,98 +89,604 @@ class FlagService:
 
     def _load_lists(self) -> None:
         try:
-            with open('data/whitelist.json', 'r') as f:
-                self._whitelist = set(json.load(f))
-            with open('data/risklist.json', 'r') as f:
-                self._risk_list = set(json.load(f))
+            self._whitelist = self._read_list(config.WHITELIST_PATH)
+            self._risk_list = self._read_list(config.RISK_LIST_PATH)
             logger.info("Loaded special flag lists successfully")
         except Exception as e:
             logger.error(f"Error loading special lists: {str(e)}")
             self._whitelist = set()
             self._risk_list = set()
 
-    def _parse_flag(self, name: str, value: str, timestamp: datetime) -> Flag:
-        enabled = True
-        
-        if name.startswith(('DFFlag', 'FFlag', 'BFFlag')):
-            enabled = str(value).lower() == "true"
-        elif name.startswith('FInt'):
-            try:
-                # i didn't know some flags had were semicolon separated
-                if ";" in value:
-                    first_value = value.split(";")[0].strip()
-                    enabled = int(first_value) != 0
-                else:
-                    enabled = int(value) != 0
-            except ValueError:
-                # log 
-                logger.error(f"Invalid value for FInt flag {name}: {value}")
-                enabled = False
-        elif name.startswith('FString'):
-            enabled = value != ""
-            
-        return Flag(
-            name=name,
-            enabled=enabled,
-            last_updated=timestamp
-        )
+    @staticmethod
+    def _read_list(path: str) -> Set[str]:
+        with open(path, 'r') as f:
+            names = json.load(f)
+        if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+            raise ValueError(f"{path} must be a JSON array of flag names")
+        return set(names)
+
+    def reload_lists(self) -> bool:
+        # Rereads the whitelist and risk list and swaps their bits into the
+        # live index, keeping the snapshot and its generation. Raises (and
+        # keeps the lists in use) when either file is unreadable or invalid.
+        # Returns whether anything changed.
+        whitelist = self._read_list(config.WHITELIST_PATH)
+        risk_list = self._read_list(config.RISK_LIST_PATH)
+        with self._lock:
+            if whitelist == self._whitelist and risk_list == self._risk_list:
+                return False
+            self._whitelist, self._risk_list = whitelist, risk_list
+            snapshot = self._snapshot
+            self._snapshot = replace(snapshot, index=snapshot.index.with_lists(risk_list, whitelist))
+
+        logger.info(f"Reloaded special flag lists: {len(risk_list)} risk, {len(whitelist)} whitelisted")
+        return True
+
+    async def update_cache(self) -> int:
+        # Single-flight: startup, the scheduled refresh and on-demand callers
+        # that overlap all await one run. Returns the generation served after it.
+        generation, _ = await self._refresh_flight.run(self._update_cache)
+        return generation
+
+    async def trigger_refresh(self) -> Tuple[int, bool]:
+        # update_cache() for callers that want to know whether they started
+        # the run or joined one already in flight: (generation, joined).
+        return await self._refresh_flight.run(self._update_cache)
 
-    async def update_cache(self) -> None:
+    @timed(REFRESH_SECONDS)
+    async def _update_cache(self) -> int:
+        started = time.perf_counter()
         try:
             flag_data = await self._fetcher.fetch_all_flags()
-            timestamp = datetime.now()
-
-            with self._lock:
-                self._cache.clear()
-                for app_name, app_data in flag_data.items():
-                    if not app_data:
-                        continue
-                        
-                    flags = []
-                    for key, value in app_data.get("applicationSettings", {}).items():
-                        if any(key.startswith(prefix) for prefix in self.VALID_FLAG_PREFIXES):
-                            flags.append(self._parse_flag(key, value, timestamp))
-                    
-                    if flags:
-                        self._cache[app_name] = flags
-                        logger.info(f"Updated {len(flags)} flags for {app_name}")
-
-            logger.info(f"Cache update completed. Total apps: {len(self._cache)}")
+            if not flag_data:
+                raise RuntimeError("No flag data fetched from upstream")
 
+            previous = self._snapshot
+            sources = self._app_sources(previous)
+            loop = asyncio.get_running_loop()
+            if self._changed_apps(flag_data, previous):
+                # Build in a worker thread so the serving loop keeps answering
+                # from the current snapshot meanwhile.
+                snapshot = await loop.run_in_executor(None, self._build_snapshot, flag_data, previous, sources)
+                changes = await loop.run_in_executor(None, self._diff, previous, snapshot)
+                snapshot = self._publish(snapshot, base=previous, changes=changes)
+                await loop.run_in_executor(None, snapshot.search.warm)
+                await loop.run_in_executor(None, self.save_snapshot, snapshot)
+            else:
+                logger.info(f"No upstream changes, keeping generation {previous.generation}")
+                if sources != previous.sources:
+                    # Only the source statuses moved: the snapshot file stays
+                    # as it is and followers get them from the sidecar.
+                    snapshot = self._publish_sources(sources)
+                    await loop.run_in_executor(None, self.save_sources, snapshot)
         except Exception as e:
+            self._record_refresh(started, str(e))
             logger.error(f"Cache update failed: {str(e)}")
             raise
 
-    async def get_application_flags(self, app_id: str) -> List[Flag]:
+        # Whatever was fetched is published. The refresh only counts as
+        # failed, putting the refresher on its failure backoff, when no
+        # source could be verified at all; apps left on earlier data show up
+        # as stale in their source status instead.
+        stale = sorted(app_id for app_id, status in sources.items() if status.stale)
+        progress = len(stale) < len(sources)
+        self._record_refresh(started, None if progress else f"Serving stale data for {', '.join(stale)}")
+        if stale:
+            logger.warning(f"Refresh incomplete, serving stale data for {', '.join(stale)}")
+        return self._snapshot.generation
+
+    def _app_sources(self, previous: FlagSnapshot) -> Dict[str, SourceStatus]:
+        # Apps the fetcher has nothing for (e.g. upstream has been down since
+        # a warm start) keep the data previous holds, which is stale now.
+        sources = self._fetcher.app_status()
+        for app_id in previous.apps.keys() - sources.keys():
+            status = previous.sources.get(app_id)
+            sources[app_id] = SourceStatus(status.verified_at if status else None, True)
+        return sources
+
+    def _publish_sources(self, sources: Dict[str, SourceStatus]) -> FlagSnapshot:
+        # Same data and generation, only fresher source statuses.
+        with self._lock:
+            snapshot = self._snapshot = replace(self._snapshot, sources=sources)
+        return snapshot
+
+    async def refresh(self, max_age: float = 0) -> bool:
+        # On-demand refresh that fetches nothing when the last success is
+        # younger than max_age seconds. Returns whether a refresh ran (or was
+        # joined).
+        if self.follower:
+            return await asyncio.get_running_loop().run_in_executor(None, self.follow_snapshot)
+
+        last_success = self._refresh_stats.last_success
+        if max_age and last_success and (datetime.now() - last_success).total_seconds() < max_age:
+            return False
+
+        await self.update_cache()
+        return True
+
+    def build_cache(self, flag_data: Dict[str, dict]) -> FlagSnapshot:
+        previous = self._snapshot
+        snapshot = self._build_snapshot(flag_data, previous)
+        return self._publish(snapshot, base=previous, changes=self._diff(previous, snapshot))
+
+    @staticmethod
+    def _diff(previous: FlagSnapshot, snapshot: FlagSnapshot) -> Optional[Dict[str, AppDiff]]:
+        # Nothing to diff against before the first real snapshot; listing
+        # every flag as added would only bloat the history.
+        if not previous.apps:
+            return None
+        return diff_apps(previous.apps, snapshot.apps)
+
+    @staticmethod
+    def _changed_apps(flag_data: Dict[str, dict], previous: Optional[FlagSnapshot]) -> List[str]:
+        if previous is None:
+            return list(FlagFetcher.VALID_CLIENTS)
+        # An app missing from flag_data has no payload this round and keeps
+        # what previous serves, so it does not count as changed.
+        return [
+            app_id for app_id in FlagFetcher.VALID_CLIENTS
+            if app_id in flag_data and flag_data[app_id] is not previous.inputs.get(app_id)
+        ]
+
+    def _build_app_flags(self, app_data: dict, timestamp: datetime) -> AppFlags:
+        # Values are parsed once per distinct (kind, raw) pair in VALUES, so
+        # the GitHub defaults repeated in every app cost a dict lookup each.
+        flags = AppFlags.empty(timestamp)
+        intern = NAMES.intern
+        intern_value = VALUES.intern_flag
+        for key, value in app_data.get("applicationSettings", {}).items():
+            if key.startswith(self._VALID_PREFIX_TUPLE):
+                flags.ids.append(intern(key))
+                flags.values.append(intern_value(key, value))
+        return flags
+
+    @timed(SNAPSHOT_BUILD_SECONDS)
+    def _build_snapshot(self, flag_data: Dict[str, dict], previous: Optional[FlagSnapshot] = None,
+                        sources: Optional[Dict[str, SourceStatus]] = None) -> FlagSnapshot:
+        timestamp = datetime.now()
+        changed = set(self._changed_apps(flag_data, previous))
+        cache: Dict[str, AppFlags] = {}
+        inputs = dict(flag_data)
+
+        if previous is not None:
+            for app_name in previous.apps.keys() - flag_data.keys():
+                cache[app_name] = previous.apps[app_name]
+                if app_name in previous.inputs:
+                    inputs[app_name] = previous.inputs[app_name]
+
+        for app_name, app_data in flag_data.items():
+            if not app_data:
+                continue
+
+            if app_name not in changed:
+                if app_name in previous.apps:
+                    cache[app_name] = previous.apps[app_name]
+                continue
+
+            flags = self._build_app_flags(app_data, timestamp)
+            if flags:
+                cache[app_name] = flags
+                logger.info(f"Updated {len(flags)} flags for {app_name}")
+
+        index = FlagIndex(cache, self._risk_list, self._whitelist)
+        # Response bodies only change when the cache does, so render each
+        # application's JSON (and its compressed forms) once per generation.
+        renderer = ApplicationRenderer()
+        responses = {
+            app_id: previous.responses[app_id] if app_id not in changed
+            else renderer.render(cache.get(app_id) or AppFlags.empty(timestamp))
+            for app_id in FlagFetcher.VALID_CLIENTS
+        }
+
+        return FlagSnapshot(
+            generation=0,
+            created_at=timestamp,
+            apps=cache,
+            index=index,
+            responses=responses,
+            flag_count=sum(len(flags) for flags in cache.values()),
+            search=SearchIndex(index, previous.search if previous else None),
+            github=self._summarize_github(cache.get("ALL"), previous),
+            inputs=inputs,
+            sources=sources if sources is not None else {app_id: SourceStatus(timestamp) for app_id in cache}
+        )
+
+    @staticmethod
+    def _summarize_github(flags: Optional[AppFlags], previous: Optional[FlagSnapshot] = None) -> GitHubSummary:
+        # The ALL app is built from FVariables.txt alone, so it is the GitHub
+        # flag set as far as the debug routes are concerned.
+        if previous is not None and flags is not None and flags is previous.apps.get("ALL"):
+            return previous.github
+
+        names = list(flags.names()) if flags else []
+        counts = Counter(_GITHUB_PREFIX.findall('\n'.join(names)))
+        prefix_counts = {prefix: counts[prefix] for prefix in FLAG_PREFIXES if counts[prefix]}
+        unknown = len(names) - sum(prefix_counts.values())
+        if unknown:
+            prefix_counts["Unknown"] = unknown
+
+        return GitHubSummary(
+            flag_count=len(names),
+            prefix_counts=prefix_counts,
+            dfint_sample=list(islice((name for name in names if name.startswith("DFInt")), DFINT_SAMPLE_SIZE))
+        )
+
+    def save_snapshot(self, snapshot: FlagSnapshot) -> bool:
+        return save_snapshot(
+            config.SNAPSHOT_PATH,
+            snapshot.generation,
+            snapshot.created_at,
+            snapshot.apps,
+            snapshot.index.app_masks(),
+            snapshot.sources
+        )
+
+    def save_sources(self, snapshot: FlagSnapshot) -> bool:
+        return save_sources(sources_path(config.SNAPSHOT_PATH), snapshot.generation, snapshot.sources)
+
+    def load_snapshot(self) -> bool:
+        # Warm start: publish the last snapshot written to disk so traffic can
+        # be served before the first upstream refresh completes.
+        started = time.perf_counter()
+        stored = load_snapshot(config.SNAPSHOT_PATH)
+        if stored is None:
+            return False
+        # The sidecar is newer than the statuses saved with the snapshot
+        # when it was written for this same generation.
+        sources = stored.sources
+        signature = file_signature(sources_path(config.SNAPSHOT_PATH))
+        sidecar = load_sources(sources_path(config.SNAPSHOT_PATH))
+        if sidecar is not None and sidecar[0] == stored.generation:
+            sources = sidecar[1]
+        self._followed = signature
+
+        apps = {app_id: flags for app_id, flags in stored.apps.items() if app_id in FlagFetcher.VALID_CLIENTS}
+        index = FlagIndex.from_app_masks(stored.app_masks, self._risk_list, self._whitelist)
+        snapshot = FlagSnapshot(
+            generation=stored.generation,
+            created_at=stored.created_at,
+            apps=apps,
+            index=index,
+            responses=LazyResponses(apps, FlagFetcher.VALID_CLIENTS, stored.created_at),
+            flag_count=sum(len(flags) for flags in apps.values()),
+            search=SearchIndex(index, self._snapshot.search),
+            github=self._summarize_github(apps.get("ALL")),
+            inputs={},
+            sources={app_id: status for app_id, status in sources.items() if app_id in apps}
+        )
+        previous = self._snapshot
+        self._publish(snapshot, generation=stored.generation, base=previous, changes=self._diff(previous, snapshot))
+        logger.info(f"Loaded snapshot from disk in {(time.perf_counter() - started) * 1000:.1f}ms")
+        return True
+
+    def follow_snapshot(self) -> bool:
+        # Loads the snapshot file if it holds a generation other than the one
+        # being served. Any change counts, so a refresher that restarted from
+        # scratch is still followed. Within a generation only the source
+        # statuses move, and those come from the sidecar.
+        generation = snapshot_generation(config.SNAPSHOT_PATH)
+        if generation is None:
+            return False
+        if generation != self._snapshot.generation:
+            return self.load_snapshot()
+
+        path = sources_path(config.SNAPSHOT_PATH)
+        signature = file_signature(path)
+        if signature == self._followed:
+            return False
+        stored = load_sources(path)
+        self._followed = signature
+        if stored is None or stored[0] != generation:
+            return False
+        self._publish_sources(stored[1])
+        return False
+
+    def warm_snapshot(self) -> None:
+        snapshot = self._snapshot
+        for app_id in FlagFetcher.VALID_CLIENTS:
+            snapshot.responses[app_id]
+        snapshot.search.warm()
+
+    def _publish(self, snapshot: FlagSnapshot, generation: Optional[int] = None,
+                 base: Optional[FlagSnapshot] = None, changes: Optional[Dict[str, AppDiff]] = None) -> FlagSnapshot:
+        # changes is the diff from base; it is only recorded if base is still
+        # the published snapshot, otherwise the history would have a gap and
+        # is dropped instead.
+        with self._lock:
+            previous = self._snapshot
+            if generation is None:
+                generation = previous.generation + 1
+            index = snapshot.index
+            if index.lists[0] is not self._risk_list or index.lists[1] is not self._whitelist:
+                # Built while reload_lists() swapped in new lists
+                index = index.with_lists(self._risk_list, self._whitelist)
+            snapshot = replace(snapshot, generation=generation, index=index)
+            self._snapshot = snapshot
+            self._reclaim(snapshot, previous)
+
+            diff = None
+            if changes is not None and base is previous:
+                diff = SnapshotDiff(
+                    generation=generation,
+                    previous_generation=previous.generation,
+                    created_at=snapshot.created_at,
+                    apps=changes
+                )
+                self._changes.append(diff)
+            else:
+                self._changes.clear()
+
+        logger.info(
+            f"Cache update completed. Generation: {snapshot.generation}, "
+            f"total apps: {len(snapshot.apps)}, indexed flags: {len(snapshot.index)}"
+        )
+        for listener in self._listeners:
+            try:
+                listener(snapshot, diff)
+            except Exception as e:
+                logger.error(f"Snapshot listener failed: {e}")
+        return snapshot
+
+    def _reclaim(self, snapshot: FlagSnapshot, previous: FlagSnapshot) -> None:
+        # NAMES and VALUES are process-wide, so names and values that left
+        # upstream would otherwise stay forever, and every index build would
+        # size its masks for all of history. Ids neither the new nor the
+        # previous snapshot uses are released: requests still on previous
+        # keep resolving theirs, and nothing older is served. A pass only
+        # runs once a table holds twice what the snapshot used at its last
+        # one, so its cost is amortized over the interning that grew the
+        # table. Publishes hold self._lock and refreshes are single-flight,
+        # so nothing interns meanwhile.
+        if NAMES.in_use() >= max(TABLE_RECLAIM_MIN, 2 * self._names_live):
+            self._reclaim_names(snapshot, previous)
+        if VALUES.in_use() >= max(TABLE_RECLAIM_MIN, 2 * self._values_live):
+            self._reclaim_values(snapshot, previous)
+
+    def _reclaim_names(self, snapshot: FlagSnapshot, previous: FlagSnapshot) -> None:
+        started = time.perf_counter()
+        used = bytearray(len(NAMES))
+        size = len(used)
+        for index in (snapshot.index, previous.index):
+            for i in index.used_ids():
+                if i < size:
+                    used[i] = 1
+            if index is snapshot.index:
+                self._names_live = used.count(1)
+        released = NAMES.release(i for i, in_use in enumerate(used) if not in_use)
+        VALUES.forget_names(released)
+        logger.info(
+            f"Released {len(released)} unused flag names, {NAMES.in_use()} in use "
+            f"({(time.perf_counter() - started) * 1000:.1f}ms)"
+        )
+
+    def _reclaim_values(self, snapshot: FlagSnapshot, previous: FlagSnapshot) -> None:
+        started = time.perf_counter()
+        used: Set[int] = set()
+        for flags in snapshot.apps.values():
+            used.update(flags.values)
+        self._values_live = len(used)
+        for app_id, flags in previous.apps.items():
+            if flags is not snapshot.apps.get(app_id):
+                used.update(flags.values)
+        released = VALUES.release(i for i in range(len(VALUES)) if i not in used)
+        logger.info(
+            f"Released {released} unused flag values, {VALUES.in_use()} in use "
+            f"({(time.perf_counter() - started) * 1000:.1f}ms)"
+        )
+
+    def add_listener(self, listener: Callable[[FlagSnapshot, Optional[SnapshotDiff]], None]) -> None:
+        # Called after every publish with the new snapshot and its diff (None
+        # when there is none), on whichever thread published it.
+        self._listeners.append(listener)
+
+    def _record_refresh(self, started: float, error: Optional[str] = None) -> None:
+        stats = self._refresh_stats
+        stats.attempts += 1
+        stats.last_duration = time.perf_counter() - started
+        if error is None:
+            stats.successes += 1
+            stats.consecutive_failures = 0
+            stats.last_success = datetime.now()
+            stats.last_error = None
+            logger.info(f"Refresh succeeded in {stats.last_duration:.2f}s")
+        else:
+            stats.failures += 1
+            stats.consecutive_failures += 1
+            stats.last_error = error
+
+    def set_next_refresh(self, when: datetime) -> None:
+        self._refresh_stats.next_refresh = when
+
+    @property
+    def refresh_stats(self) -> RefreshStats:
+        return replace(self._refresh_stats)
+
+    @property
+    def snapshot(self) -> FlagSnapshot:
+        return self._snapshot
+
+    async def close(self) -> None:
+        await self._fetcher.close()
+
+    async def get_application_flags(self, app_id: str) -> Sequence[Flag]:
+        if app_id not in FlagFetcher.VALID_CLIENTS:
+            raise ValueError(f"Invalid application ID: {app_id}")
+        return self._snapshot.apps.get(app_id, [])
+
+    def get_application_response(self, app_id: str, snapshot: Optional[FlagSnapshot] = None) -> RenderedResponse:
         if app_id not in FlagFetcher.VALID_CLIENTS:
             raise ValueError(f"Invalid application ID: {app_id}")
-        return self._cache.get(app_id, [])
+        return (snapshot or self._snapshot).responses[app_id]
 
+    def flag_presence(self, name: str) -> Dict[str, bool]:
+        # app -> whether it has the flag; "ALL" doubles as GitHub membership.
+        mask = self._snapshot.index.lookup(name)
+        return {app_id: bool(mask & APP_BITS[app_id]) for app_id in FlagFetcher.VALID_CLIENTS}
+
+    @property
+    def generation(self) -> int:
+        return self._snapshot.generation
+
+    @timed(CHECK_SECONDS, kind='single')
     async def check_flags(self, flags: List[str], applications: List[str]) -> FlagCheckResult:
-        valid_flags: Set[str] = set()
-        risk_flags = self._risk_list.intersection(flags)
-        
-        remaining = set(flags) - risk_flags
-        
-        for app_id in applications:
-            if app_id not in FlagFetcher.VALID_CLIENTS:
-                raise ValueError(f"Invalid application ID: {app_id}")
-                
-            app_flags = await self.get_application_flags(app_id)
-            flag_names = {f.name for f in app_flags}
-            valid_flags.update(flag_names.intersection(remaining))
-            remaining -= flag_names
+        _CHECK_FLAGS['single'].observe(len(flags))
+        _CHECK_APPLICATIONS['single'].observe(len(applications))
+        index = self._snapshot.index
+        app_mask = index.app_mask(applications)
+
+        valid_flags: List[str] = []
+        invalid_flags: List[str] = []
+        risk_flags: List[str] = []
+
+        for name in dict.fromkeys(flags):
+            bits = index.lookup(name)
+            if bits & RISK_BIT:
+                risk_flags.append(name)
+            elif bits & app_mask:
+                valid_flags.append(name)
+            else:
+                invalid_flags.append(name)
 
         return FlagCheckResult(
-            valid=list(valid_flags),
-            invalid=list(remaining),
-            risk=list(risk_flags)
+            valid=valid_flags,
+            invalid=invalid_flags,
+            risk=risk_flags
         )
 
+    async def check_flags_batch(self, jobs: Sequence[Tuple[List[str], List[str]]]) -> Iterator[Union[FlagCheckResult, ValueError]]:
+        # Every job is checked against the same snapshot and each distinct
+        # name is looked up once. Yields one result per job, in order; a job
+        # with an invalid application yields its ValueError instead.
+        index = self._snapshot.index
+        lookup = index.lookup
+        bits = {name: lookup(name) for name in dict.fromkeys(chain.from_iterable(flags for flags, _ in jobs))}
+        return self._iter_batch_results(jobs, index, bits)
+
+    @staticmethod
+    def _iter_batch_results(jobs, index: FlagIndex, bits: Dict[str, int]) -> Iterator[Union[FlagCheckResult, ValueError]]:
+        for flags, applications in jobs:
+            _CHECK_FLAGS['batch'].observe(len(flags))
+            _CHECK_APPLICATIONS['batch'].observe(len(applications))
+            try:
+                app_mask = index.app_mask(applications)
+            except ValueError as e:
+                yield e
+                continue
+
+            result = FlagCheckResult(valid=[], invalid=[], risk=[])
+            for name in dict.fromkeys(flags):
+                mask = bits[name]
+                if mask & RISK_BIT:
+                    result.risk.append(name)
+                elif mask & app_mask:
+                    result.valid.append(name)
+                else:
+                    result.invalid.append(name)
+            yield result
+
+    @timed(VALIDATE_SECONDS)
+    def validate_profile(self, profile: Dict[str, Any], applications: Sequence[str]) -> FlagValidationResult:
+        # Masks and kinds come from the snapshot tables in one pass each;
+        # value checks are memoized per distinct string, so the "True"s and
+        # "0"s that make up most of a profile are checked once.
+        VALIDATE_FLAGS.observe(len(profile))
+        index = self._snapshot.index
+        app_mask = index.app_mask(applications)
+        names = list(profile)
+        prefixes = self._VALID_PREFIX_TUPLE
+        verdicts: Dict[str, str] = {}
+        errors: Dict[str, str] = {}
+        checked: Tuple[Dict[str, Optional[str]], ...] = ({}, {}, {})
+
+        for name, value, bits, kind in zip(names, profile.values(), index.lookup_many(names), VALUES.kinds_of(names)):
+            if kind is None:
+                if not name.startswith(prefixes):
+                    verdicts[name] = 'invalid_name'
+                    continue
+                kind = value_kind(name)
+            if bits & RISK_BIT:
+                verdicts[name] = 'risk'
+                continue
+
+            if type(value) is str:
+                memo = checked[kind]
+                error = memo.get(value, False)
+                if error is False:
+                    error = memo[value] = value_error(kind, value)
+            else:
+                error = value_error(kind, value)
+
+            if error:
+                verdicts[name] = 'invalid_value'
+                errors[name] = error
+            elif bits & app_mask:
+                verdicts[name] = 'valid'
+            elif bits & WHITELIST_BIT:
+                verdicts[name] = 'whitelisted'
+            else:
+                verdicts[name] = 'unknown'
+
+        return FlagValidationResult(verdicts=verdicts, errors=errors)
+
+    @timed(SEARCH_SECONDS)
+    def search_flags(self, query: str, offset: int = 0, limit: int = 20) -> Tuple[List[FlagSearchResult], bool]:
+        snapshot = self._snapshot
+        hits, has_more = snapshot.search.search(query, offset, limit)
+        lookup = snapshot.index.lookup
+        results = [
+            FlagSearchResult(name=name, match=match, applications=FlagIndex.applications(lookup(name)))
+            for name, match in hits
+        ]
+        return results, has_more
+
+    def _collect_metrics(self):
+        snapshot = self._snapshot
+        stats = self._refresh_stats
+        yield ('appleblox_snapshot_flags', 'gauge', 'Flags per application in the current snapshot',
+               [({'app': app_id}, len(flags)) for app_id, flags in snapshot.apps.items()])
+        yield ('appleblox_snapshot_indexed_flags', 'gauge', 'Distinct flag names in the check index',
+               [({}, len(snapshot.index))])
+        yield ('appleblox_snapshot_generation', 'gauge', 'Generation of the current snapshot',
+               [({}, snapshot.generation)])
+        yield ('appleblox_snapshot_age_seconds', 'gauge', 'Seconds since the current snapshot was built',
+               [({}, (datetime.now() - snapshot.created_at).total_seconds())])
+        now = datetime.now()
+        yield ('appleblox_source_age_seconds', 'gauge', 'Seconds since upstream last answered for the data served per application',
+               [({'app': app_id}, status.age(now)) for app_id, status in snapshot.sources.items() if status.verified_at])
+        yield ('appleblox_source_stale', 'gauge', 'Whether an application is served from earlier data after a failed fetch',
+               [({'app': app_id}, int(status.stale)) for app_id, status in snapshot.sources.items()])
+        yield ('appleblox_special_list_flags', 'gauge', 'Names on the risk list and whitelist',
+               [({'list': 'risk'}, len(self._risk_list)), ({'list': 'whitelist'}, len(self._whitelist))])
+        yield ('appleblox_refresh_attempts_total', 'counter', 'Cache refresh attempts', [({}, stats.attempts)])
+        yield ('appleblox_refresh_failures_total', 'counter', 'Failed cache refreshes', [({}, stats.failures)])
+        yield ('appleblox_uptime_seconds', 'gauge', 'Service uptime',
+               [({}, (datetime.now() - self._start_time).total_seconds())])
+
+    def changes_since(self, generation: int) -> Tuple[int, Optional[List[SnapshotDiff]]]:
+        # Returns (current generation, diffs after generation oldest first),
+        # with None for the diffs once the history no longer reaches back, or
+        # when generation is ahead of this one (it came from before the
+        # refresher restarted and counted generations from scratch).
+        with self._lock:
+            current = self._snapshot.generation
+            history = list(self._changes)
+
+        if generation > current:
+            return current, None
+        if generation == current:
+            return current, []
+        if not history or history[0].previous_generation > generation:
+            return current, None
+        return current, [diff for diff in history if diff.generation > generation]
+
     @property
     def stats(self) -> CacheStats:
+        snapshot = self._snapshot
         return CacheStats(
             uptime=(datetime.now() - self._start_time).total_seconds(),
             last_fetch=self._fetcher.last_fetch,
-            cache_size=sum(len(flags) for flags in self._cache.values())
+            cache_size=snapshot.flag_count,
+            generation=snapshot.generation,
+            refresh=self.refresh_stats,
+            sources=dict(snapshot.sources)
         )
\ No newline at end of file
@@ -0,0 +1,124 @@
+import sys
+from array import array
+from datetime import datetime
+from heapq import heapify, heappop
+from threading import Lock
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+from models import Flag
+from .flag_values import VALUES
+
+class NameTable:
+    # Process-wide: every flag name is stored once, and ids stay valid across
+    # snapshots so unchanged apps can be carried over. Ids no snapshot uses
+    # any more are handed back with release() and reused, lowest first, so
+    # the id range tracks the live names rather than every name ever seen.
+    def __init__(self):
+        self._names: List[Optional[str]] = []
+        self._ids: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._lock = Lock()
+
+    def intern(self, name: str) -> int:
+        i = self._ids.get(name)
+        if i is None:
+            with self._lock:
+                i = self._ids.get(name)
+                if i is None:
+                    name = sys.intern(name)
+                    if self._free:
+                        i = heappop(self._free)
+                        self._names[i] = name
+                    else:
+                        i = len(self._names)
+                        self._names.append(name)
+                    self._ids[name] = i
+        return i
+
+    def intern_many(self, names: List[str]) -> List[int]:
+        with self._lock:
+            if not self._names:
+                # Fresh table (e.g. a warm start): ids are the list positions.
+                self._names = [sys.intern(name) for name in names]
+                self._ids = dict(zip(self._names, range(len(self._names))))
+                if len(self._ids) == len(self._names):
+                    return list(range(len(self._names)))
+                self._names, self._ids = [], {}
+        return [self.intern(name) for name in names]
+
+    def release(self, ids: Iterable[int]) -> List[str]:
+        # Frees the given ids for reuse and returns the names they held. The
+        # caller guarantees nothing still being served resolves them.
+        released = []
+        with self._lock:
+            names = self._names
+            for i in ids:
+                name = names[i]
+                if name is not None:
+                    del self._ids[name]
+                    names[i] = None
+                    released.append(name)
+                    self._free.append(i)
+            while names and names[-1] is None:
+                names.pop()
+            self._free = [i for i in self._free if i < len(names)]
+            heapify(self._free)
+        return released
+
+    def id_of(self, name: str) -> Optional[int]:
+        return self._ids.get(name)
+
+    def ids_of(self, names: Iterable[str]) -> List[Optional[int]]:
+        return list(map(self._ids.get, names))
+
+    def name(self, i: int) -> str:
+        return self._names[i]
+
+    def in_use(self) -> int:
+        # Names currently held, which is len() less the free ids.
+        return len(self._ids)
+
+    def __len__(self) -> int:
+        # Upper bound of the ids handed out, for sizing id-indexed arrays.
+        return len(self._names)
+
+NAMES = NameTable()
+
+class AppFlags(Sequence):
+    # One application's flags as parallel typed arrays: name ids into NAMES
+    # and value ids into VALUES, sharing a single timestamp. Flag objects
+    # are only materialised as views when iterated or indexed.
+    __slots__ = ('ids', 'values', 'last_updated')
+
+    def __init__(self, ids: array, values: array, last_updated: datetime):
+        self.ids = ids
+        self.values = values
+        self.last_updated = last_updated
+
+    @classmethod
+    def empty(cls, last_updated: datetime) -> 'AppFlags':
+        return cls(array('I'), array('I'), last_updated)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        value = self.values[i]
+        return Flag(
+            name=NAMES.name(self.ids[i]),
+            enabled=VALUES.enabled(value),
+            last_updated=self.last_updated,
+            value=VALUES.value(value)
+        )
+
+    def __iter__(self) -> Iterator[Flag]:
+        name = NAMES.name
+        enabled = VALUES.enabled
+        typed = VALUES.value
+        last_updated = self.last_updated
+        for i, value in zip(self.ids, self.values):
+            yield Flag(name=name(i), enabled=enabled(value), last_updated=last_updated, value=typed(value))
+
+    def names(self) -> Iterator[str]:
+        return map(NAMES.name, self.ids)
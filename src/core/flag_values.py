@@ -0,0 +1,205 @@
+import json
+import logging
+import re
+import sys
+from heapq import heapify, heappop
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+FlagValue = Union[bool, int, Tuple[int, ...], str]
+
+# Value kinds by flag name prefix. FInt values may also be a semicolon
+# separated int list, which parses to a tuple under the INT kind.
+BOOL = 0
+INT = 1
+STRING = 2
+
+_KIND_PREFIXES = (
+    (('DFFlag', 'FFlag', 'BFFlag', 'SFFlag'), BOOL),
+    (('DFInt', 'FInt'), INT),
+    (('DFString', 'FString'), STRING),
+)
+
+def value_kind(name: str) -> int:
+    for prefixes, kind in _KIND_PREFIXES:
+        if name.startswith(prefixes):
+            return kind
+    return STRING
+
+def parse_value(kind: int, raw: str, name: str = '') -> Tuple[FlagValue, bool]:
+    # Returns (typed value, enabled)
+    if kind == BOOL:
+        value = raw.lower() == "true"
+        return value, value
+
+    if kind == INT:
+        try:
+            if ";" in raw:
+                values = tuple(int(part.strip()) for part in raw.split(";") if part.strip())
+                return values, bool(values) and values[0] != 0
+            value = int(raw)
+            return value, value != 0
+        except ValueError:
+            logger.error(f"Invalid value for int flag {name}: {raw}")
+            return raw, False
+
+    return raw, raw != ""
+
+INT32_MIN = -2 ** 31
+INT32_MAX = 2 ** 31 - 1
+_INT_PART = re.compile(r'-?[0-9]+', re.ASCII)
+
+def _int_error(value: int) -> Optional[str]:
+    if INT32_MIN <= value <= INT32_MAX:
+        return None
+    return 'integer out of 32-bit range'
+
+def value_error(kind: int, value: Any) -> Optional[str]:
+    # Why a submitted profile value does not fit its flag's kind, None if it
+    # does. Profiles are JSON and clients write most values as strings, so
+    # "True" and "250" are as good as true and 250.
+    if kind == BOOL:
+        if isinstance(value, bool) or (isinstance(value, str) and value.lower() in ('true', 'false')):
+            return None
+        return 'expected true or false'
+
+    if kind == INT:
+        if isinstance(value, bool):
+            return 'expected an integer'
+        if isinstance(value, int):
+            return _int_error(value)
+        if isinstance(value, str):
+            # Only what the client parses: ASCII digits with an optional
+            # minus, no spaces, underscores, "+" or empty list entries,
+            # all of which int() would let through.
+            parts = value.split(';')
+            if not all(map(_INT_PART.fullmatch, parts)):
+                return 'expected an integer'
+            for part in parts:
+                error = _int_error(int(part))
+                if error:
+                    return error
+            return None
+        return 'expected an integer'
+
+    if isinstance(value, str):
+        return None
+    return 'expected a string'
+
+class ValueTable:
+    # Process-wide like NAMES: every distinct (kind, raw) pair is parsed once
+    # and shared by every app and snapshot. A GitHub default such as "false"
+    # is one entry, not one per flag per app. Entries no snapshot uses any
+    # more are handed back with release() and their ids reused.
+    def __init__(self):
+        self._ids: Tuple[Dict[str, int], ...] = ({}, {}, {})
+        self._kinds = bytearray()
+        self._raw: List[Optional[str]] = []
+        self._values: List[FlagValue] = []
+        self._enabled = bytearray()
+        self._json: List[Optional[str]] = []
+        self._free: List[int] = []
+        # name -> value kind, for every name seen by intern_flag() and not
+        # forgotten since
+        self._name_kinds: Dict[str, int] = {}
+        self._lock = Lock()
+
+    def intern(self, kind: int, raw: str, name: str = '') -> int:
+        i = self._ids[kind].get(raw)
+        if i is None:
+            with self._lock:
+                i = self._ids[kind].get(raw)
+                if i is None:
+                    value, enabled = parse_value(kind, raw, name)
+                    raw = sys.intern(raw)
+                    if self._free:
+                        i = heappop(self._free)
+                        self._kinds[i] = kind
+                        self._raw[i] = raw
+                        self._values[i] = value
+                        self._enabled[i] = enabled
+                        self._json[i] = json.dumps(value)
+                    else:
+                        i = len(self._raw)
+                        self._kinds.append(kind)
+                        self._raw.append(raw)
+                        self._values.append(value)
+                        self._enabled.append(enabled)
+                        self._json.append(json.dumps(value))
+                    self._ids[kind][raw] = i
+        return i
+
+    def release(self, ids: Iterable[int]) -> int:
+        # Frees the given ids for reuse; returns how many were freed. The
+        # caller guarantees nothing still being served resolves them.
+        released = 0
+        with self._lock:
+            raws = self._raw
+            for i in ids:
+                raw = raws[i]
+                if raw is not None:
+                    del self._ids[self._kinds[i]][raw]
+                    raws[i] = self._values[i] = self._json[i] = None
+                    self._free.append(i)
+                    released += 1
+            size = len(raws)
+            while size and raws[size - 1] is None:
+                size -= 1
+            for column in (self._kinds, raws, self._values, self._enabled, self._json):
+                del column[size:]
+            self._free = [i for i in self._free if i < size]
+            heapify(self._free)
+        return released
+
+    def forget_names(self, names: Iterable[str]) -> None:
+        # Drops the remembered kinds of names no longer in NAMES.
+        pop = self._name_kinds.pop
+        for name in names:
+            pop(name, None)
+
+    def intern_flag(self, name: str, raw) -> int:
+        kind = self._name_kinds.get(name)
+        if kind is None:
+            kind = self._name_kinds[name] = value_kind(name)
+        ids = self._ids[kind]
+        if not isinstance(raw, str):
+            raw = str(raw)
+        i = ids.get(raw)
+        if i is None:
+            i = self.intern(kind, raw, name)
+        return i
+
+    def kinds_of(self, names: Iterable[str]) -> List[Optional[int]]:
+        # Kind of every name already seen through intern_flag(), None for the
+        # rest; saves the prefix tests on names that came from upstream.
+        return list(map(self._name_kinds.get, names))
+
+    def intern_many(self, kinds: Sequence[int], raws: Sequence[str]) -> List[int]:
+        # On a fresh table (warm start) the ids come out as the positions.
+        return [self.intern(kind, raw) for kind, raw in zip(kinds, raws)]
+
+    def kind(self, i: int) -> int:
+        return self._kinds[i]
+
+    def raw(self, i: int) -> str:
+        return self._raw[i]
+
+    def value(self, i: int) -> FlagValue:
+        return self._values[i]
+
+    def enabled(self, i: int) -> bool:
+        return bool(self._enabled[i])
+
+    def json(self, i: int) -> str:
+        return self._json[i]
+
+    def in_use(self) -> int:
+        return sum(map(len, self._ids))
+
+    def __len__(self) -> int:
+        # Upper bound of the ids handed out
+        return len(self._raw)
+
+VALUES = ValueTable()
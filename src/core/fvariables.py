@@ -0,0 +1,60 @@
+import re
+import sys
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, List, Tuple
+
+# Streaming parser for Roblox-Client-Tracker's FVariables.txt, where each
+# flag is one "[Type] FlagName" line. Complete lines are matched a whole
+# block at a time with one compiled regex, so the file is never held in
+# memory as a single string.
+
+FLAG_PREFIXES = ('DFFlag', 'FFlag', 'BFFlag', 'FInt', 'DFInt', 'FString', 'DFString')
+
+_LINE = re.compile(
+    r'^[ \t]*\[([^\]\r\n]+)\] [ \t]*((?:'
+    + '|'.join(sorted(FLAG_PREFIXES, key=len, reverse=True))
+    + r')\S*)',
+    re.MULTILINE
+)
+
+def default_value(name: str) -> str:
+    # Set appropriate default value based on prefix
+    if name.startswith(('DFInt', 'FInt')):
+        return "0"
+    if name.startswith(('DFString', 'FString')):
+        return ""
+    return "false"
+
+def parse_block(block: bytes) -> List[Tuple[str, str]]:
+    # block must end on a line boundary so no UTF-8 sequence is split
+    pairs = _LINE.findall(block.decode('utf-8', 'replace'))
+    types = {}
+    return [(types.setdefault(t, sys.intern(t)), name) for t, name in pairs]
+
+def _split_lines(buffer: bytes) -> Tuple[bytes, bytes]:
+    cut = buffer.rfind(b'\n') + 1
+    return buffer[:cut], buffer[cut:]
+
+def parse_chunks(chunks: Iterable[bytes]) -> Iterator[Tuple[str, str]]:
+    tail = b''
+    for chunk in chunks:
+        block, tail = _split_lines(tail + chunk)
+        if block:
+            yield from parse_block(block)
+    if tail:
+        yield from parse_block(tail)
+
+async def iter_fvariables_batches(chunks: AsyncIterable[bytes]) -> AsyncIterator[List[Tuple[str, str]]]:
+    # One list of (type, name) pairs per received chunk's complete lines.
+    tail = b''
+    async for chunk in chunks:
+        block, tail = _split_lines(tail + chunk)
+        if block:
+            yield parse_block(block)
+    if tail:
+        yield parse_block(tail)
+
+async def iter_fvariables(chunks: AsyncIterable[bytes]) -> AsyncIterator[Tuple[str, str]]:
+    # Yields (type, name) pairs, e.g. ("C++", "FFlagDebugGraphicsDisableMetal").
+    async for batch in iter_fvariables_batches(chunks):
+        for pair in batch:
+            yield pair
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+import time
+from threading import Lock
+from typing import Optional
+import config
+from utils.file_watcher import FileWatcher
+from utils.metrics import LIST_RELOAD_SECONDS, LIST_RELOADS
+from .flag_service import FlagService
+
+logger = logging.getLogger(__name__)
+
+class ListReloader:
+    # Watches the whitelist and risk list files and swaps each valid new
+    # version into the live check index. A file that fails to parse is
+    # logged and skipped; the lists in use stay until the next good edit.
+    _instance = None
+    _lock = Lock()
+
+    def __init__(self):
+        if ListReloader._instance is not None:
+            raise RuntimeError("Use ListReloader.instance() to get singleton")
+
+        self._service = FlagService.instance()
+        self._task: Optional[asyncio.Task] = None
+        self._watcher: Optional[FileWatcher] = None
+
+    @classmethod
+    def instance(cls) -> 'ListReloader':
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        # Must be called from the loop the watcher should live on.
+        if self.running:
+            return
+        self._watcher = FileWatcher(
+            [config.WHITELIST_PATH, config.RISK_LIST_PATH], config.LIST_POLL_INTERVAL, config.LIST_RELOAD_DEBOUNCE
+        )
+        self._watcher.start()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        logger.info(f"Watching {config.WHITELIST_PATH} and {config.RISK_LIST_PATH} ({self._watcher.backend})")
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._watcher.close()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            changed = await self._watcher.wait()
+            try:
+                reloaded = await loop.run_in_executor(None, self._service.reload_lists)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                LIST_RELOADS.inc(result='rejected')
+                logger.error(f"Rejected update to {', '.join(changed)}, keeping the current lists: {e}")
+                continue
+
+            if reloaded:
+                LIST_RELOAD_SECONDS.observe(time.perf_counter() - self._watcher.detected_at)
+            LIST_RELOADS.inc(result='reloaded' if reloaded else 'unchanged')
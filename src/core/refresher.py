@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Optional
+import config
+from .flag_service import FlagService
+
+logger = logging.getLogger(__name__)
+
+class CacheRefresher:
+    _instance = None
+    _lock = Lock()
+
+    def __init__(self):
+        if CacheRefresher._instance is not None:
+            raise RuntimeError("Use CacheRefresher.instance() to get singleton")
+
+        self._service = FlagService.instance()
+        self._task: Optional[asyncio.Task] = None
+        self.interval = config.CACHE_UPDATE_INTERVAL
+        self.jitter = config.CACHE_UPDATE_JITTER
+        self.retry_min = config.CACHE_RETRY_MIN
+        self.retry_max = config.CACHE_RETRY_MAX
+
+    @classmethod
+    def instance(cls) -> 'CacheRefresher':
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, initial_delay: Optional[float] = None) -> None:
+        # Must be called from the loop the refresher should live on.
+        # initial_delay=0 refreshes right away, e.g. after a warm start.
+        if self.running:
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run(initial_delay))
+        logger.info(f"Background refresh scheduled every {self.interval}s")
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def next_delay(self, consecutive_failures: int) -> float:
+        if consecutive_failures:
+            delay = min(self.retry_max, self.retry_min * 2 ** (consecutive_failures - 1))
+        else:
+            delay = self.interval
+        # Spread refreshes so several processes never hit upstream in lockstep.
+        return max(1.0, delay * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    async def _run(self, initial_delay: Optional[float] = None) -> None:
+        delay = initial_delay
+        while True:
+            if delay is None:
+                delay = self.next_delay(self._service.refresh_stats.consecutive_failures)
+            self._service.set_next_refresh(datetime.now() + timedelta(seconds=delay))
+            await asyncio.sleep(delay)
+
+            try:
+                await self._service.update_cache()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # update_cache already recorded and logged the failure
+                logger.debug(f"Scheduled refresh failed: {e}")
+            delay = None
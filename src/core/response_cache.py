@@ -0,0 +1,160 @@
+import gzip
+import hashlib
+import json
+import logging
+from datetime import datetime
+from threading import Lock
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+from models import RenderedResponse
+from .flag_table import NAMES, AppFlags
+from .flag_values import VALUES
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 10
+
+def _compressors() -> List[Tuple[str, Callable[[bytes], bytes]]]:
+    compressors = []
+    if brotli is not None:
+        compressors.append(('br', lambda body: brotli.compress(body, quality=BROTLI_QUALITY)))
+    if zstandard is not None:
+        compressors.append(('zstd', zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress))
+    compressors.append(('gzip', lambda body: gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)))
+    return compressors
+
+COMPRESSORS = _compressors()
+
+# Server preference when the client accepts several encodings equally.
+ENCODING_PREFERENCE = [name for name, _ in COMPRESSORS] + ['identity']
+
+def render_body(body: bytes) -> RenderedResponse:
+    digest = hashlib.sha256(body).hexdigest()[:32]
+
+    bodies: Dict[str, bytes] = {'identity': body}
+    etags: Dict[str, str] = {'identity': f'"{digest}"'}
+    for encoding, compress in COMPRESSORS:
+        bodies[encoding] = compress(body)
+        etags[encoding] = f'"{digest}-{encoding}"'
+
+    return RenderedResponse(bodies=bodies, etags=etags)
+
+def render_json(payload: dict) -> RenderedResponse:
+    return render_body(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+
+class ApplicationRenderer:
+    # Most flags appear with identical contents in every application, so the
+    # JSON fragment for each distinct (name, value) pair is encoded once per
+    # build and reused. Output matches Flag.to_dict() for every flag.
+    def __init__(self):
+        self._fragments: Dict[int, str] = {}
+        self._timestamp: Optional[datetime] = None
+        self._timestamp_json = ''
+
+    def render(self, flags: AppFlags) -> RenderedResponse:
+        if flags.last_updated is not self._timestamp:
+            self._fragments.clear()
+            self._timestamp = flags.last_updated
+            self._timestamp_json = json.dumps(flags.last_updated.isoformat())
+
+        fragments = self._fragments
+        parts = []
+        for i, value in zip(flags.ids, flags.values):
+            key = i << 32 | value
+            fragment = fragments.get(key)
+            if fragment is None:
+                fragment = (
+                    '{"name":' + json.dumps(NAMES.name(i)) +
+                    ',"enabled":' + ('true' if VALUES.enabled(value) else 'false') +
+                    ',"value":' + VALUES.json(value) +
+                    ',"last_updated":' + self._timestamp_json +
+                    ',"places":[]}'
+                )
+                fragments[key] = fragment
+            parts.append(fragment)
+
+        body = '{"success":true,"flags":[' + ','.join(parts) + ']}'
+        return render_body(body.encode('utf-8'))
+
+class LazyResponses(Mapping):
+    # Renders each application on first access instead of up front; used for
+    # snapshots loaded from disk so startup does not wait on rendering.
+    def __init__(self, apps: Mapping[str, AppFlags], app_ids: Iterable[str], timestamp: datetime):
+        self._apps = apps
+        self._app_ids = frozenset(app_ids)
+        self._timestamp = timestamp
+        self._rendered: Dict[str, RenderedResponse] = {}
+        self._renderer = ApplicationRenderer()
+        self._lock = Lock()
+
+    def __getitem__(self, app_id: str) -> RenderedResponse:
+        rendered = self._rendered.get(app_id)
+        if rendered is None:
+            if app_id not in self._app_ids:
+                raise KeyError(app_id)
+            with self._lock:
+                rendered = self._rendered.get(app_id)
+                if rendered is None:
+                    flags = self._apps.get(app_id) or AppFlags.empty(self._timestamp)
+                    rendered = self._renderer.render(flags)
+                    self._rendered[app_id] = rendered
+        return rendered
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._app_ids)
+
+    def __len__(self) -> int:
+        return len(self._app_ids)
+
+def negotiate_encoding(accept_encoding: Optional[str], available: Iterable[str]) -> str:
+    if not accept_encoding:
+        return 'identity'
+
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(','):
+        token, _, params = part.strip().partition(';')
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[token] = q
+
+    wildcard = weights.get('*', 0.0)
+    best, best_q = 'identity', 0.0
+    for encoding in ENCODING_PREFERENCE:
+        if encoding not in available:
+            continue
+        q = weights.get(encoding, wildcard if encoding != 'identity' else 1.0)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
@@ -0,0 +1,186 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from threading import Lock
+from typing import Dict, Iterator, List, Optional, Tuple
+from .flag_index import FlagIndex
+from .flag_table import NAMES
+
+# Case-insensitive name search over one snapshot's flags. Names are kept
+# sorted (lowercased) so a prefix is a bisect range, and every name is
+# posted under each of its trigrams for substring and typo-tolerant matches.
+# Results are ranked exact, prefix, substring, then fuzzy; alphabetical
+# within the first three tiers and by trigram similarity in the last.
+
+# A substring query whose rarest trigram is posted more often than this (or
+# that is shorter than a trigram) is answered by scanning the joined name
+# blob with str.find instead of verifying its postings one by one.
+SUBSTRING_MAX_POSTING = 8192
+
+# Fuzzy matching seeds candidates from the query's rarest trigrams only (at
+# most FUZZY_SEED_GRAMS of them, within FUZZY_SEED_BUDGET postings in total),
+# then scores the best candidates against every query trigram.
+FUZZY_SEED_GRAMS = 4
+FUZZY_SEED_BUDGET = 4096
+FUZZY_CANDIDATES = 32
+FUZZY_MIN_SIMILARITY = 0.4
+
+_LAST_CHAR = '\U0010ffff'
+
+def _trigrams(key: str) -> List[str]:
+    return list(dict.fromkeys(key[i:i + 3] for i in range(len(key) - 2)))
+
+class SearchIndex:
+    # Built lazily on first use (or by warm()) since most snapshots are
+    # never searched; an unchanged name set reuses the previous snapshot's
+    # structures instead of rebuilding them.
+    __slots__ = ('_index', '_previous', '_lock', '_built', '_ids', '_names', '_lower', '_postings',
+                 '_blob', '_starts')
+
+    def __init__(self, index: FlagIndex, previous: Optional['SearchIndex'] = None):
+        self._index = index
+        # Only a built index is worth keeping, and it holds no previous of
+        # its own, so snapshots never chain.
+        self._previous = previous if previous is not None and previous._built else None
+        self._lock = Lock()
+        self._built = False
+        self._ids = array('I')
+        self._names: List[str] = []
+        self._lower: List[str] = []
+        self._postings: Dict[str, array] = {}
+        # All lowercased names joined by "\n", and where each one starts
+        self._blob = ''
+        self._starts = array('I')
+
+    def warm(self) -> None:
+        self._ensure()
+
+    def _ensure(self) -> None:
+        if self._built:
+            return
+        with self._lock:
+            if self._built:
+                return
+
+            ids = self._index.name_ids()
+            previous = self._previous
+            if previous is not None and previous._ids == ids:
+                self._names, self._lower, self._postings = previous._names, previous._lower, previous._postings
+                self._blob, self._starts = previous._blob, previous._starts
+            else:
+                self._build(ids)
+            self._ids = ids
+            self._previous = None
+            self._built = True
+
+    def _build(self, ids: array) -> None:
+        pairs = sorted((name.lower(), name) for name in map(NAMES.name, ids))
+        self._lower = [key for key, _ in pairs]
+        self._names = [name for _, name in pairs]
+
+        postings: Dict[str, list] = {}
+        for pos, key in enumerate(self._lower):
+            for gram in _trigrams(key):
+                posting = postings.get(gram)
+                if posting is None:
+                    postings[gram] = [pos]
+                else:
+                    posting.append(pos)
+        self._postings = {gram: array('I', posting) for gram, posting in postings.items()}
+
+        self._blob = '\n'.join(self._lower)
+        starts = array('I', [0])
+        for key in self._lower[:-1]:
+            starts.append(starts[-1] + len(key) + 1)
+        self._starts = starts
+
+    def search(self, query: str, offset: int = 0, limit: int = 20) -> Tuple[List[Tuple[str, str]], bool]:
+        # Returns ([(name, match), ...], has_more). Tiers stop collecting as
+        # soon as offset + limit + 1 hits are known, so common queries never
+        # scan their whole range.
+        self._ensure()
+        key = query.strip().lower()
+        if not key:
+            return [], False
+
+        lower = self._lower
+        want = offset + limit + 1
+        hits: List[Tuple[int, str]] = []
+
+        lo = bisect_left(lower, key)
+        hi = bisect_left(lower, key + _LAST_CHAR, lo)
+        for pos in range(lo, min(hi, lo + want)):
+            hits.append((pos, 'exact' if lower[pos] == key else 'prefix'))
+
+        grams = _trigrams(key)
+        if len(hits) < want:
+            for pos in self._substring(key, grams):
+                if pos < lo or pos >= hi:
+                    hits.append((pos, 'substring'))
+                    if len(hits) >= want:
+                        break
+
+        if len(hits) < want and len(grams) >= 2:
+            hits.extend((pos, 'fuzzy') for pos in self._fuzzy(key, grams, want - len(hits)))
+
+        page = [(self._names[pos], match) for pos, match in hits[offset:offset + limit]]
+        return page, len(hits) > offset + limit
+
+    def _substring(self, key: str, grams: List[str]) -> Iterator[int]:
+        # Positions of names containing key, ascending.
+        if grams:
+            postings = [self._postings.get(gram) for gram in grams]
+            if not all(postings):
+                return
+            smallest = min(postings, key=len)
+            if len(smallest) <= SUBSTRING_MAX_POSTING:
+                lower = self._lower
+                for pos in smallest:
+                    if key in lower[pos]:
+                        yield pos
+                return
+
+        blob, starts = self._blob, self._starts
+        find = blob.find
+        i = find(key)
+        while i >= 0:
+            pos = bisect_right(starts, i) - 1
+            yield pos
+            # Skip the rest of this name so it is reported once.
+            i = find(key, starts[pos + 1] if pos + 1 < len(starts) else len(blob))
+
+    def _fuzzy(self, key: str, grams: List[str], count: int) -> List[int]:
+        postings = sorted(
+            (posting for posting in map(self._postings.get, grams) if posting is not None),
+            key=len
+        )[:FUZZY_SEED_GRAMS]
+        counts: Counter = Counter()
+        budget = FUZZY_SEED_BUDGET
+        for n, posting in enumerate(postings):
+            if n >= 2 and len(posting) > budget:
+                postings = postings[:n]
+                break
+            counts.update(posting)
+            budget -= len(posting)
+
+        lower = self._lower
+        minimum = min(2, len(postings))
+        scored = []
+        for pos, seeded in counts.most_common(FUZZY_CANDIDATES):
+            if seeded < minimum:
+                break
+            name = lower[pos]
+            if key in name:
+                continue
+            # Dice coefficient over trigrams, taking len - 2 as the name's
+            # trigram count rather than building its set.
+            shared = sum(gram in name for gram in grams)
+            similarity = 2 * shared / (len(grams) + max(1, len(name) - 2))
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                scored.append((-similarity, pos))
+        scored.sort()
+        return [pos for _, pos in scored[:count]]
+
+    def __len__(self) -> int:
+        self._ensure()
+        return len(self._names)
@@ -0,0 +1,27 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Mapping
+from models import GitHubSummary, RenderedResponse, SourceStatus
+from .flag_index import FlagIndex
+from .flag_table import AppFlags
+from .search_index import SearchIndex
+
+@dataclass(frozen=True)
+class FlagSnapshot:
+    # Everything a request needs, built off to the side during a refresh and
+    # published with a single reference swap. Never mutated once published.
+    generation: int
+    created_at: datetime
+    apps: Mapping[str, AppFlags]
+    index: FlagIndex
+    responses: Mapping[str, RenderedResponse]
+    flag_count: int
+    search: SearchIndex
+    github: GitHubSummary
+    # The fetcher payload per app this snapshot was built from; an identical
+    # object on the next refresh means that app can be carried over as is.
+    inputs: Mapping[str, dict]
+    # app -> freshness of the upstream sources it was built from. A refresh
+    # that only re-verified (or failed to reach) upstream swaps in new
+    # statuses under the same generation.
+    sources: Mapping[str, SourceStatus]
@@ -0,0 +1,108 @@
+from typing import Dict, List, Mapping, Optional, Tuple
+from models import AppDiff
+from .flag_table import NAMES, AppFlags
+from .flag_values import VALUES
+
+# Diffs between consecutive snapshots. Apps carried over unchanged are the
+# same AppFlags object and cost nothing. For the rest the columns are
+# compared as slices, which runs in C: bisection finds the common prefix and
+# suffix of the name ids and then homes in on the value ids that differ in
+# them, so Python only looks at the changed positions (O(k log n) slice
+# compares for k changes). Only the run of names between prefix and suffix,
+# where flags were added or removed, is diffed pair by pair.
+
+def _common_prefix(old, new, old_end: int, new_end: int) -> int:
+    # Longest n with old[:n] == new[:n], looking no further than the ends.
+    lo, hi = 0, min(old_end, new_end)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if old[lo:mid] == new[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+def _common_suffix(old, new, old_start: int, new_start: int) -> int:
+    # Longest n with old[-n:] == new[-n:], looking no further back than the starts.
+    old_end, new_end = len(old), len(new)
+    lo, hi = 0, min(old_end - old_start, new_end - new_start)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if old[old_end - mid:old_end - lo] == new[new_end - mid:new_end - lo]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+def _mismatches(old, new, old_start: int, new_start: int, count: int, out: List[Tuple[int, int]]) -> None:
+    # (old position, new position) of every differing item in two aligned
+    # runs of count items, halving only the runs that still differ.
+    if old[old_start:old_start + count] == new[new_start:new_start + count]:
+        return
+    if count <= 16:
+        out.extend((old_start + i, new_start + i) for i in range(count)
+                   if old[old_start + i] != new[new_start + i])
+        return
+    half = count // 2
+    _mismatches(old, new, old_start, new_start, half, out)
+    _mismatches(old, new, old_start + half, new_start + half, count - half, out)
+
+def _pair_diff(old: Optional[AppFlags], new: Optional[AppFlags]) -> Tuple[Dict[int, int], Dict[int, int]]:
+    # (name id -> old value id, name id -> new value id) for the pairs that
+    # differ between old and new.
+    if old is None or new is None:
+        flags = old if old is not None else new
+        pairs = dict(zip(flags.ids, flags.values))
+        return (pairs, {}) if old is not None else ({}, pairs)
+
+    old_ids, new_ids = memoryview(old.ids), memoryview(new.ids)
+    old_values, new_values = memoryview(old.values), memoryview(new.values)
+    old_len, new_len = len(old_ids), len(new_ids)
+    prefix = _common_prefix(old_ids, new_ids, old_len, new_len)
+    suffix = _common_suffix(old_ids, new_ids, prefix, prefix)
+
+    positions: List[Tuple[int, int]] = []
+    _mismatches(old_values, new_values, 0, 0, prefix, positions)
+    _mismatches(old_values, new_values, old_len - suffix, new_len - suffix, suffix, positions)
+    before = {old_ids[i]: old_values[i] for i, _ in positions}
+    after = {new_ids[j]: new_values[j] for _, j in positions}
+
+    # Names added, removed or reordered sit between prefix and suffix.
+    old_mid = dict(zip(old_ids[prefix:old_len - suffix], old_values[prefix:old_len - suffix]))
+    new_mid = dict(zip(new_ids[prefix:new_len - suffix], new_values[prefix:new_len - suffix]))
+    for i, v in old_mid.items():
+        if new_mid.get(i) != v:
+            before[i] = v
+    for i, v in new_mid.items():
+        if old_mid.get(i) != v:
+            after[i] = v
+    return before, after
+
+def diff_app(old: Optional[AppFlags], new: Optional[AppFlags]) -> Optional[AppDiff]:
+    if old is new:
+        return None
+    if old is not None and new is not None and old.ids == new.ids and old.values == new.values:
+        return None
+
+    before, after = _pair_diff(old, new)
+    name = NAMES.name
+    value = VALUES.value
+    # Raw strings that parse to the same value (a BOOL going from "False" to
+    # "no") are no change as far as the served flags go.
+    diff = AppDiff(
+        added={name(i): value(v) for i, v in after.items() if i not in before},
+        removed=[name(i) for i in before if i not in after],
+        changed={name(i): (value(v), value(after[i])) for i, v in before.items()
+                 if i in after and value(v) != value(after[i])}
+    )
+    if not diff.added and not diff.removed and not diff.changed:
+        return None
+    return diff
+
+def diff_apps(old: Mapping[str, AppFlags], new: Mapping[str, AppFlags]) -> Dict[str, AppDiff]:
+    diffs = {}
+    for app_id in dict.fromkeys(list(old) + list(new)):
+        diff = diff_app(old.get(app_id), new.get(app_id))
+        if diff is not None:
+            diffs[app_id] = diff
+    return diffs
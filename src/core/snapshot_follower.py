@@ -0,0 +1,65 @@
+import asyncio
+import logging
+from threading import Lock
+from typing import Optional
+import config
+from .flag_service import FlagService
+
+logger = logging.getLogger(__name__)
+
+class SnapshotFollower:
+    # Worker side of supervisor mode: polls the header of the snapshot file
+    # the refresher process publishes and maps in each new generation. The
+    # file is replaced by rename, so an open mapping is never rewritten and
+    # workers share its pages through the page cache.
+    _instance = None
+    _lock = Lock()
+
+    def __init__(self):
+        if SnapshotFollower._instance is not None:
+            raise RuntimeError("Use SnapshotFollower.instance() to get singleton")
+
+        self._service = FlagService.instance()
+        self._task: Optional[asyncio.Task] = None
+        self.interval = config.SNAPSHOT_POLL_INTERVAL
+
+    @classmethod
+    def instance(cls) -> 'SnapshotFollower':
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        # Must be called from the loop the follower should live on.
+        if self.running:
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        logger.info(f"Following {config.SNAPSHOT_PATH} every {self.interval}s")
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                if await loop.run_in_executor(None, self._service.follow_snapshot):
+                    await loop.run_in_executor(None, self._service.warm_snapshot)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Failed to follow snapshot: {e}")
@@ -0,0 +1,282 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+from array import array
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import chain
+from typing import Dict, List, Mapping, Optional, Tuple
+from models import SourceStatus
+from .flag_table import NAMES, AppFlags
+from .flag_values import VALUES
+
+logger = logging.getLogger(__name__)
+
+# On-disk snapshot, little-endian, laid out so every array can be used
+# straight out of an mmap:
+#
+#   header   magic(8) version(u32) app_count(u32) name_count(u32) blob_len(u32)
+#            value_count(u32) value_blob_len(u32) generation(u64) created_at(f64)
+#   names    UTF-8 names joined by "\n" (blob_len bytes), padded to 4
+#   masks    u16[name_count] FlagIndex app bitmasks (no risk bit), padded to 4
+#   values   kinds u8[value_count] padded to 4, offsets u32[value_count + 1],
+#            then the UTF-8 raw values (value_blob_len bytes) padded to 4
+#   per app  app_id_len(u32) app_id(bytes, padded to 4) flag_count(u32)
+#            stale(u32) last_updated(f64) verified_at(f64, 0 if unknown)
+#            ids u32[flag_count] values u32[flag_count]
+#
+# Only the names and values the snapshot uses are stored, under dense ids:
+# the writer's NAMES / VALUES ids renumbered 0..n-1 in the same order. A
+# fresh process that loads the file before interning anything gets those
+# same ids and can use the mapped arrays without copying. Raw values are
+# stored rather than typed ones and parsed again on load, once per distinct
+# value.
+
+MAGIC = b'FLGSNAP\0'
+VERSION = 3
+_HEADER = struct.Struct('<8sIIIIIIQd')
+_U32 = struct.Struct('<I')
+_APP = struct.Struct('<IIdd')
+
+if array('I').itemsize != 4:
+    raise ImportError("snapshot_store needs a 4-byte array('I')")
+
+@dataclass
+class StoredSnapshot:
+    generation: int
+    created_at: datetime
+    apps: Dict[str, AppFlags]
+    app_masks: array
+    sources: Dict[str, SourceStatus]
+
+def _pad(n: int) -> int:
+    return -n % 4
+
+def _u32_array(values) -> bytes:
+    data = array('I', values)
+    if sys.byteorder != 'little':
+        data.byteswap()
+    return data.tobytes()
+
+def _u32_view(view: memoryview):
+    # Zero-copy on little-endian hosts, a swapped copy elsewhere.
+    if sys.byteorder == 'little':
+        return view.cast('I')
+    data = array('I', view.tobytes())
+    data.byteswap()
+    return data
+
+def _dense_ids(ids: List[int]) -> Optional[array]:
+    # old id -> its position in the ascending ids, None if they already are
+    # 0..n-1.
+    if not ids or ids[-1] == len(ids) - 1:
+        return None
+    dense = array('I', bytes(4 * (ids[-1] + 1)))
+    for new, old in enumerate(ids):
+        dense[old] = new
+    return dense
+
+def save_snapshot(path: str, generation: int, created_at: datetime, apps: Mapping[str, AppFlags],
+                  app_masks: array, sources: Optional[Mapping[str, SourceStatus]] = None) -> bool:
+    # Written to a temp file and renamed over the old one, so readers only
+    # ever see a complete snapshot.
+    tmp_path = f"{path}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        name_ids = [i for i, mask in enumerate(app_masks) if mask]
+        value_ids = sorted(set(chain.from_iterable(flags.values for flags in apps.values())))
+        name_map, value_map = _dense_ids(name_ids), _dense_ids(value_ids)
+
+        name_count = len(name_ids)
+        blob = '\n'.join(map(NAMES.name, name_ids)).encode('utf-8')
+        masks = array('H', (app_masks[i] for i in name_ids))
+        if sys.byteorder != 'little':
+            masks.byteswap()
+
+        value_count = len(value_ids)
+        kinds = bytes(map(VALUES.kind, value_ids))
+        raw_values = [VALUES.raw(i).encode('utf-8') for i in value_ids]
+        offsets = [0]
+        for raw in raw_values:
+            offsets.append(offsets[-1] + len(raw))
+        value_blob = b''.join(raw_values)
+        sources = sources or {}
+
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(
+                MAGIC, VERSION, len(apps), name_count, len(blob),
+                value_count, len(value_blob), generation, created_at.timestamp()
+            ))
+            f.write(blob + b'\0' * _pad(len(blob)))
+            f.write(masks.tobytes() + b'\0' * _pad(2 * name_count))
+            f.write(kinds + b'\0' * _pad(value_count))
+            f.write(_u32_array(offsets))
+            f.write(value_blob + b'\0' * _pad(len(value_blob)))
+
+            for app_id, flags in apps.items():
+                raw_id = app_id.encode('utf-8')
+                f.write(_U32.pack(len(raw_id)) + raw_id + b'\0' * _pad(len(raw_id)))
+                status = sources.get(app_id)
+                f.write(_APP.pack(
+                    len(flags), bool(status and status.stale), flags.last_updated.timestamp(),
+                    status.verified_at.timestamp() if status and status.verified_at else 0.0
+                ))
+                ids, values = flags.ids, flags.values
+                if name_map is not None:
+                    ids = array('I', map(name_map.__getitem__, ids))
+                if value_map is not None:
+                    values = array('I', map(value_map.__getitem__, values))
+                f.write(_u32_array(ids))
+                f.write(_u32_array(values))
+
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmp_path, path)
+        return True
+    except Exception as e:
+        logger.error(f"Failed to save snapshot to {path}: {str(e)}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
+
+def snapshot_generation(path: str) -> Optional[int]:
+    # Header only, cheap enough for workers to poll.
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(_HEADER.size)
+    except OSError:
+        return None
+    if len(header) < _HEADER.size:
+        return None
+    magic, version, *_, generation, _ = _HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION:
+        return None
+    return generation
+
+def _source_status(stale: int, verified_at: float) -> SourceStatus:
+    return SourceStatus(datetime.fromtimestamp(verified_at) if verified_at else None, bool(stale))
+
+def sources_path(path: str) -> str:
+    # Sidecar holding the per-app source statuses of the snapshot at path.
+    # Verification times move on every refresh, the snapshot itself only
+    # changes with the data, so only this small file is rewritten for them.
+    return f"{path}.sources"
+
+def save_sources(path: str, generation: int, sources: Mapping[str, SourceStatus]) -> bool:
+    # Renamed into place like the snapshot; not fsynced, since losing it to
+    # a crash only costs verification times until the next refresh.
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'generation': generation,
+                'sources': {
+                    app_id: [status.verified_at.timestamp() if status.verified_at else 0.0, status.stale]
+                    for app_id, status in sources.items()
+                }
+            }, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+        return True
+    except OSError as e:
+        logger.error(f"Failed to save source statuses to {path}: {str(e)}")
+        return False
+
+def load_sources(path: str) -> Optional[Tuple[int, Dict[str, SourceStatus]]]:
+    # (generation, per-app source status) from a save_sources() sidecar.
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+        return data['generation'], {
+            app_id: _source_status(stale, verified_at) for app_id, (verified_at, stale) in data['sources'].items()
+        }
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+def load_snapshot(path: str) -> Optional[StoredSnapshot]:
+    try:
+        if not os.path.exists(path):
+            logger.info("No saved snapshot found")
+            return None
+
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return read_snapshot(memoryview(mapped))
+    except Exception as e:
+        logger.error(f"Failed to load snapshot from {path}: {str(e)}")
+        return None
+
+def read_snapshot(view: memoryview) -> StoredSnapshot:
+    (magic, version, app_count, name_count, blob_len,
+     value_count, value_blob_len, generation, created_at) = _HEADER.unpack_from(view, 0)
+    if magic != MAGIC:
+        raise ValueError("not a flag snapshot")
+    if version != VERSION:
+        raise ValueError(f"unsupported snapshot version {version}")
+
+    pos = _HEADER.size
+    names = str(view[pos:pos + blob_len], 'utf-8').split('\n') if name_count else []
+    if len(names) != name_count:
+        raise ValueError("corrupt name table")
+    pos += blob_len + _pad(blob_len)
+
+    app_masks = array('H', view[pos:pos + 2 * name_count].tobytes())
+    if sys.byteorder != 'little':
+        app_masks.byteswap()
+    pos += 2 * name_count + _pad(2 * name_count)
+
+    kinds = view[pos:pos + value_count]
+    pos += value_count + _pad(value_count)
+    offsets = _u32_view(view[pos:pos + 4 * (value_count + 1)])
+    pos += 4 * (value_count + 1)
+    value_blob = bytes(view[pos:pos + value_blob_len])
+    pos += value_blob_len + _pad(value_blob_len)
+    raw_values = [value_blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(value_count)]
+
+    remap = NAMES.intern_many(names)
+    identity = remap == list(range(name_count))
+    if not identity:
+        remapped = array('H', bytes(2 * len(NAMES)))
+        for i, mask in zip(remap, app_masks):
+            remapped[i] = mask
+        app_masks = remapped
+
+    value_remap = VALUES.intern_many(kinds, raw_values)
+    value_identity = value_remap == list(range(value_count))
+
+    apps: Dict[str, AppFlags] = {}
+    sources: Dict[str, SourceStatus] = {}
+    for _ in range(app_count):
+        (id_len,) = _U32.unpack_from(view, pos)
+        pos += 4
+        app_id = bytes(view[pos:pos + id_len]).decode('utf-8')
+        pos += id_len + _pad(id_len)
+        count, stale, last_updated, verified_at = _APP.unpack_from(view, pos)
+        pos += _APP.size
+        if stale or verified_at:
+            sources[app_id] = _source_status(stale, verified_at)
+
+        ids = _u32_view(view[pos:pos + 4 * count])
+        pos += 4 * count
+        values = _u32_view(view[pos:pos + 4 * count])
+        pos += 4 * count
+
+        if not identity:
+            ids = array('I', (remap[i] for i in ids))
+        if not value_identity:
+            values = array('I', (value_remap[i] for i in values))
+
+        apps[app_id] = AppFlags(ids, values, datetime.fromtimestamp(last_updated))
+
+    return StoredSnapshot(
+        generation=generation,
+        created_at=datetime.fromtimestamp(created_at),
+        apps=apps,
+        app_masks=app_masks,
+        sources=sources
+    )
@@ -0,0 +1,180 @@
+import asyncio
+import json
+import logging
+from collections import deque
+from threading import Lock
+from typing import AsyncIterator, Deque, Dict, Optional, Tuple
+import config
+from models import SnapshotDiff
+from utils.metrics import REGISTRY
+from .flag_service import FlagService
+from .snapshot import FlagSnapshot
+
+logger = logging.getLogger(__name__)
+
+class StreamEvent:
+    # One published snapshot. The SSE message is encoded at most once per
+    # (app filter, with diff) variant, however many subscribers get it.
+    __slots__ = ('generation', 'notice', 'diff', '_encoded')
+
+    def __init__(self, snapshot: FlagSnapshot, diff: Optional[SnapshotDiff]):
+        self.generation = snapshot.generation
+        self.notice = {
+            'generation': snapshot.generation,
+            'previous_generation': diff.previous_generation if diff else None,
+            'created_at': snapshot.created_at.isoformat(),
+            'etags': {app_id: dict(snapshot.responses[app_id].etags) for app_id in snapshot.responses}
+        }
+        self.diff = diff
+        self._encoded: Dict[Tuple[Optional[str], bool], bytes] = {}
+
+    def encode(self, app_id: Optional[str], with_diff: bool) -> bytes:
+        key = (app_id, with_diff)
+        encoded = self._encoded.get(key)
+        if encoded is None:
+            data = dict(self.notice)
+            if app_id is not None:
+                data['etags'] = {app_id: self.notice['etags'].get(app_id, {})}
+            if with_diff:
+                # null: no diff for this generation, re-download the full lists
+                data['changes'] = self.diff.to_dict(app_id)['apps'] if self.diff else None
+            encoded = self._encoded[key] = sse_message('snapshot', data, self.generation)
+        return encoded
+
+def sse_message(event: str, data: dict, event_id: Optional[int] = None) -> bytes:
+    lines = [f'event: {event}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append('data: ' + json.dumps(data, separators=(',', ':')))
+    return ('\n'.join(lines) + '\n\n').encode('utf-8')
+
+class UpdateBroadcaster:
+    # Fans each published snapshot out to every /api/stream subscriber on
+    # the serving loop. Events go into one shared ring and all subscribers
+    # wait on one future: a publish is encoded once and an idle subscriber
+    # holds no queue of its own. A subscriber that falls further behind than
+    # the ring is told to resync and dropped.
+    _instance = None
+    _lock = Lock()
+
+    def __init__(self):
+        if UpdateBroadcaster._instance is not None:
+            raise RuntimeError("Use UpdateBroadcaster.instance() to get singleton")
+
+        self._service = FlagService.instance()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._events: Deque[Tuple[int, StreamEvent]] = deque(maxlen=config.STREAM_BUFFER)
+        self._seq = 0
+        self._changed: Optional[asyncio.Future] = None
+        # The last event still being built, so the next waits its turn
+        self._pending: Optional[asyncio.Task] = None
+        self.subscribers = 0
+        self.heartbeat = config.STREAM_HEARTBEAT
+        self._service.add_listener(self._on_publish)
+        REGISTRY.register_collector(self._collect_metrics)
+
+    @classmethod
+    def instance(cls) -> 'UpdateBroadcaster':
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def _on_publish(self, snapshot: FlagSnapshot, diff: Optional[SnapshotDiff]) -> None:
+        # Any thread. Nothing to do until someone has subscribed on a loop.
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self._prepare, snapshot, diff)
+
+    def _prepare(self, snapshot: FlagSnapshot, diff: Optional[SnapshotDiff]) -> None:
+        # The etags need every app rendered, which a snapshot loaded from
+        # disk only does on first access, so the event is built in the
+        # executor while the loop keeps serving. Events are still pushed in
+        # publish order.
+        built = self._loop.run_in_executor(None, StreamEvent, snapshot, diff)
+        self._pending = self._loop.create_task(self._push_built(snapshot.generation, built, self._pending))
+
+    async def _push_built(self, generation: int, built: asyncio.Future, previous: Optional[asyncio.Task]) -> None:
+        if previous is not None and not previous.done():
+            await asyncio.wait({previous})
+        try:
+            self._push(await built)
+        except Exception as e:
+            logger.error(f"Failed to build the stream event for generation {generation}: {e}")
+
+    def _push(self, event: StreamEvent) -> None:
+        self._seq += 1
+        self._events.append((self._seq, event))
+        changed, self._changed = self._changed, None
+        if changed is not None and not changed.done():
+            changed.set_result(None)
+
+    def _wait(self) -> asyncio.Future:
+        if self._changed is None:
+            self._changed = self._loop.create_future()
+        return self._changed
+
+    async def stream(self, app_id: Optional[str] = None, with_diff: bool = False,
+                     last_event_id: Optional[int] = None) -> AsyncIterator[bytes]:
+        self._loop = asyncio.get_running_loop()
+        seq = self._seq
+        self.subscribers += 1
+        try:
+            yield f'retry: {config.STREAM_RETRY_MS}\n\n'.encode('ascii')
+            sent = -1
+            for message, generation in self._catch_up(app_id, with_diff, last_event_id):
+                sent = generation
+                yield message
+
+            while True:
+                if seq == self._seq:
+                    done, _ = await asyncio.wait({self._wait()}, timeout=self.heartbeat)
+                    if not done:
+                        yield b': ping\n\n'
+                    continue
+
+                if self._seq - seq > len(self._events):
+                    yield sse_message('resync', {'generation': self._service.generation})
+                    return
+                # A copy: more events can be pushed while this one is sent,
+                # and they are picked up on the next pass.
+                for event_seq, event in list(self._events):
+                    if event_seq <= seq:
+                        continue
+                    if event.generation != sent:
+                        yield event.encode(app_id, with_diff)
+                        sent = event.generation
+                    seq = event_seq
+        finally:
+            self.subscribers -= 1
+
+    def _catch_up(self, app_id: Optional[str], with_diff: bool, last_event_id: Optional[int]):
+        # Yields (message, generation) for what a new subscriber gets first:
+        # the current snapshot notice, or on a reconnect asking for diffs,
+        # each diff it missed. Only the newest of those can carry etags.
+        snapshot = self._service.snapshot
+        if last_event_id is None or not with_diff:
+            if last_event_id != snapshot.generation:
+                yield StreamEvent(snapshot, None).encode(app_id, False), snapshot.generation
+            return
+
+        generation, diffs = self._service.changes_since(last_event_id)
+        if diffs is None:
+            yield sse_message('resync', {'generation': generation}), -1
+            return
+        for diff in diffs:
+            if diff.generation == snapshot.generation:
+                yield StreamEvent(snapshot, diff).encode(app_id, True), diff.generation
+                continue
+            yield sse_message('snapshot', {
+                'generation': diff.generation,
+                'previous_generation': diff.previous_generation,
+                'created_at': diff.created_at.isoformat(),
+                'etags': None,
+                'changes': diff.to_dict(app_id)['apps']
+            }, diff.generation), diff.generation
+
+    def _collect_metrics(self):
+        yield ('appleblox_stream_subscribers', 'gauge', 'Open /api/stream connections', [({}, self.subscribers)])
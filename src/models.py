@@ -1,18 +1,28 @@
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Set, Optional
+from typing import Dict, FrozenSet, List, Optional, Tuple, Union
 
-@dataclass
+FlagValue = Union[bool, int, Tuple[int, ...], str, None]
+
+def _json_value(value: FlagValue):
+    return list(value) if isinstance(value, tuple) else value
+
+# Flags are stored column-wise per snapshot (core/flag_table.py); Flag is the
+# lightweight per-flag view handed out when one is actually needed.
+@dataclass(slots=True)
 class Flag:
     name: str
     enabled: bool
     last_updated: datetime
-    places: Set[str] = field(default_factory=set)
+    places: FrozenSet[str] = frozenset()
+    # Typed value: bool, int, tuple of ints or str depending on the prefix
+    value: FlagValue = None
 
     def to_dict(self) -> dict:
         return {
             "name": self.name,
             "enabled": self.enabled,
+            "value": _json_value(self.value),
             "last_updated": self.last_updated.isoformat(),
             "places": list(self.places) if self.places else []
         }
@@ -23,8 +33,127 @@ class FlagCheckResult:
     invalid: List[str]
     risk: List[str]
 
+@dataclass
+class FlagValidationResult:
+    # name -> valid, whitelisted, unknown, risk, invalid_name or invalid_value
+    verdicts: Dict[str, str]
+    # name -> why its value was rejected, for invalid_value verdicts
+    errors: Dict[str, str]
+
+    def counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for verdict in self.verdicts.values():
+            counts[verdict] = counts.get(verdict, 0) + 1
+        return counts
+
+@dataclass(slots=True)
+class FlagSearchResult:
+    name: str
+    match: str  # exact, prefix, substring or fuzzy
+    applications: List[str]
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "match": self.match,
+            "applications": self.applications
+        }
+
+@dataclass
+class RefreshStats:
+    attempts: int = 0
+    successes: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    last_duration: Optional[float] = None
+    last_success: Optional[datetime] = None
+    last_error: Optional[str] = None
+    next_refresh: Optional[datetime] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "attempts": self.attempts,
+            "successes": self.successes,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "last_duration": self.last_duration,
+            "last_success": self.last_success.isoformat() if self.last_success else None,
+            "last_error": self.last_error,
+            "next_refresh": self.next_refresh.isoformat() if self.next_refresh else None
+        }
+
+@dataclass(frozen=True)
+class SourceStatus:
+    # How fresh the upstream data behind one application is. verified_at is
+    # when upstream last answered for it (200 or 304); stale means a later
+    # fetch failed and that older data is what is being served.
+    verified_at: Optional[datetime]
+    stale: bool = False
+
+    def age(self, now: Optional[datetime] = None) -> Optional[float]:
+        if self.verified_at is None:
+            return None
+        return max(0.0, ((now or datetime.now()) - self.verified_at).total_seconds())
+
+    def to_dict(self) -> dict:
+        return {
+            "verified_at": self.verified_at.isoformat() if self.verified_at else None,
+            "age": self.age(),
+            "stale": self.stale
+        }
+
+@dataclass(frozen=True)
+class GitHubSummary:
+    # What the debug routes report about the GitHub (ALL) flag set of one
+    # snapshot, computed when the snapshot is built.
+    flag_count: int
+    prefix_counts: Dict[str, int]
+    dfint_sample: List[str]
+
+@dataclass(frozen=True)
+class AppDiff:
+    added: Dict[str, FlagValue]
+    removed: List[str]
+    changed: Dict[str, Tuple[FlagValue, FlagValue]]  # name -> (old, new)
+
+    def to_dict(self) -> dict:
+        return {
+            "added": {name: _json_value(value) for name, value in self.added.items()},
+            "removed": self.removed,
+            "changed": {
+                name: {"old": _json_value(old), "new": _json_value(new)}
+                for name, (old, new) in self.changed.items()
+            }
+        }
+
+@dataclass(frozen=True)
+class SnapshotDiff:
+    # What changed from previous_generation to generation; apps without
+    # changes are left out.
+    generation: int
+    previous_generation: int
+    created_at: datetime
+    apps: Dict[str, AppDiff]
+
+    def to_dict(self, app_id: Optional[str] = None) -> dict:
+        apps = self.apps if app_id is None else {app_id: self.apps[app_id]} if app_id in self.apps else {}
+        return {
+            "generation": self.generation,
+            "previous_generation": self.previous_generation,
+            "created_at": self.created_at.isoformat(),
+            "apps": {name: diff.to_dict() for name, diff in apps.items()}
+        }
+
 @dataclass
 class CacheStats:
     uptime: float
     last_fetch: Optional[datetime]
-    cache_size: int
\ No newline at end of file
+    cache_size: int
+    generation: int = 0
+    refresh: Optional[RefreshStats] = None
+    sources: Optional[Dict[str, SourceStatus]] = None
+
+@dataclass(frozen=True)
+class RenderedResponse:
+    bodies: Dict[str, bytes]
+    etags: Dict[str, str]
\ No newline at end of file
@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Callable, Dict, Optional, Tuple
+from core.snapshot_store import snapshot_generation
+import config
+
+logger = logging.getLogger(__name__)
+
+# Multi-process serving (run.py --workers N). One refresher process owns all
+# upstream traffic and publishes each snapshot to config.SNAPSHOT_PATH; N
+# workers accept on one shared listening socket, map that file read-only and
+# switch generations as it is replaced (core.snapshot_follower). Children
+# are forked, so this is POSIX only, and restarted when they die.
+
+_fork = multiprocessing.get_context('fork')
+
+def listen_socket(host: str, port: int) -> socket.socket:
+    sock = socket.create_server((host, port), backlog=2048)
+    sock.set_inheritable(True)
+    return sock
+
+def run_refresher() -> None:
+    from app import init_refresher_services, shutdown_services
+    from core.flag_service import FlagService
+
+    async def serve():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+        # /api/admin/refresh on a worker, forwarded by the supervisor
+        loop.add_signal_handler(signal.SIGUSR1, lambda: loop.create_task(refresh()))
+        await init_refresher_services()
+        await stop.wait()
+        await shutdown_services()
+
+    async def refresh():
+        try:
+            await FlagService.instance().update_cache()
+        except Exception as e:
+            logger.error(f"Requested refresh failed: {e}")
+
+    asyncio.run(serve())
+
+def run_worker(mode: str, sock: socket.socket, name: str) -> None:
+    from app import cleanup, create_app, create_asgi_app, init_worker_services
+    from utils.access_log import AccessLog
+
+    # One access log per worker, so rotation never races another process.
+    root, ext = os.path.splitext(config.ACCESS_LOG_PATH)
+    AccessLog.instance().path = f"{root}.{name}{ext}"
+
+    if mode == 'asgi':
+        import uvicorn
+        server = uvicorn.Server(uvicorn.Config(create_asgi_app(worker=True), lifespan='on', log_config=None))
+        server.run(sockets=[sock])
+        return
+
+    from werkzeug.serving import make_server
+    from utils.event_loop import EventLoopThread
+
+    # The follower needs a running loop, so workers always use the shared one.
+    loop_thread = EventLoopThread.instance()
+    loop_thread.start()
+    loop_thread.run(init_worker_services())
+
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        make_server(config.HOST, config.PORT, create_app(), threaded=True, fd=sock.fileno()).serve_forever()
+    finally:
+        cleanup()
+
+def _child(target: Callable, args: Tuple) -> None:
+    # Ctrl-C reaches the whole process group; only the supervisor acts on it
+    # and stops children with SIGTERM.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+    target(*args)
+
+class Supervisor:
+    def __init__(self, mode: str, workers: int):
+        self.mode = mode
+        self.workers = workers
+        self._sock: Optional[socket.socket] = None
+        self._children: Dict[str, multiprocessing.Process] = {}
+        self._stopping = False
+
+    def run(self) -> None:
+        self._sock = listen_socket(config.HOST, config.PORT)
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGUSR1, self._forward_refresh)
+
+        try:
+            self._spawn('refresher')
+            self._wait_for_snapshot()
+            for i in range(self.workers):
+                self._spawn(f'worker-{i}')
+            logger.info(f"Supervisor serving {self.mode} on {config.HOST}:{config.PORT} with {self.workers} workers")
+
+            while not self._stopping:
+                time.sleep(0.5)
+                for name, process in list(self._children.items()):
+                    if not process.is_alive() and not self._stopping:
+                        logger.error(f"{name} exited with code {process.exitcode}, restarting")
+                        time.sleep(config.WORKER_RESTART_DELAY)
+                        self._spawn(name)
+        finally:
+            self._shutdown()
+
+    def _stop(self, signum, frame) -> None:
+        self._stopping = True
+
+    def _forward_refresh(self, signum, frame) -> None:
+        refresher = self._children.get('refresher')
+        if refresher is not None and refresher.is_alive():
+            os.kill(refresher.pid, signal.SIGUSR1)
+
+    def _spawn(self, name: str) -> None:
+        if name == 'refresher':
+            target, args = run_refresher, ()
+        else:
+            target, args = run_worker, (self.mode, self._sock, name)
+        process = _fork.Process(target=_child, args=(target, args), name=f"flagsman-{name}")
+        process.start()
+        self._children[name] = process
+
+    def _wait_for_snapshot(self) -> None:
+        # Workers started before the first publish would serve an empty cache
+        # until it lands; a snapshot left by a previous run counts right away.
+        deadline = time.monotonic() + config.WORKER_STARTUP_TIMEOUT
+        refresher = self._children['refresher']
+        while snapshot_generation(config.SNAPSHOT_PATH) is None:
+            if self._stopping or not refresher.is_alive() or time.monotonic() > deadline:
+                logger.warning("No snapshot published yet, starting workers anyway")
+                return
+            time.sleep(0.2)
+
+    def _shutdown(self) -> None:
+        for process in self._children.values():
+            if process.is_alive():
+                process.terminate()
+        for name, process in self._children.items():
+            process.join(10)
+            if process.is_alive():
+                logger.error(f"{name} did not stop, killing it")
+                process.kill()
+                process.join()
+        self._children.clear()
+        if self._sock is not None:
+            self._sock.close()
+        logger.info("Supervisor stopped")
@@ -0,0 +1,235 @@
+import gzip
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from threading import Lock
+from typing import Deque, List, Optional, Sequence, Tuple
+import config
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Structured access log: one JSON object per request in ACCESS_LOG_PATH.
+# The request path only appends a tuple to a bounded in-memory queue; a
+# background thread turns queued records into JSON lines, writes them in
+# batches, and rotates (and gzips) the file once it reaches
+# ACCESS_LOG_MAX_BYTES. When the queue is full the record is dropped and
+# counted instead of making the request wait for the disk.
+
+# (timestamp, method, route, status, seconds, generation, app_ids, flags)
+Record = Tuple[float, str, Optional[str], int, float, int, Optional[Sequence[str]], Optional[int]]
+
+class _Fields:
+    # What a handler reports about the request it served, read back by the
+    # route layer once the response is ready.
+    __slots__ = ('app_ids', 'flags')
+
+    def __init__(self):
+        self.app_ids: Optional[Sequence[str]] = None
+        self.flags: Optional[int] = None
+
+_FIELDS: ContextVar[Optional[_Fields]] = ContextVar('access_log_fields', default=None)
+
+def note(app_ids: Optional[Sequence[str]] = None, flags: Optional[int] = None) -> None:
+    # Called from handlers; a no-op outside a logged request. The holder is
+    # shared by reference, so this also reaches a Flask request whose
+    # coroutine runs on the shared loop thread.
+    fields = _FIELDS.get()
+    if fields is None:
+        return
+    if app_ids is not None:
+        fields.app_ids = app_ids
+    if flags is not None:
+        fields.flags = flags
+
+class AccessLog:
+    _instance = None
+    _lock = Lock()
+
+    def __init__(self):
+        if AccessLog._instance is not None:
+            raise RuntimeError("Use AccessLog.instance() to get singleton")
+
+        self.path = config.ACCESS_LOG_PATH
+        self.max_queue = config.ACCESS_LOG_QUEUE
+        self.batch_size = config.ACCESS_LOG_BATCH
+        self.flush_interval = config.ACCESS_LOG_FLUSH_INTERVAL
+        self.max_bytes = config.ACCESS_LOG_MAX_BYTES
+        self.backups = config.ACCESS_LOG_BACKUPS
+        self.compress = config.ACCESS_LOG_COMPRESS
+        self.written = 0
+        self.dropped = 0
+        self._queue: Deque[Record] = deque()
+        self._wake = threading.Event()
+        self._drop_lock = Lock()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._file = None
+        self._size = 0
+        self._reported_drops = 0
+        # Records lost to write errors since the last successful write
+        self._write_lost = 0
+        REGISTRY.register_collector(self._collect_metrics)
+
+    @classmethod
+    def instance(cls) -> 'AccessLog':
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name='access-log', daemon=True)
+        self._thread.start()
+        logger.info(f"Writing access log to {self.path}")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        # Writes out whatever is still queued before returning.
+        if not self.running:
+            return
+        self._stopping = True
+        self._wake.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def begin(self) -> None:
+        # Start of a request: gives handlers a fresh holder for note().
+        if self._thread is not None:
+            _FIELDS.set(_Fields())
+
+    def record(self, route: Optional[str], method: str, status: int, seconds: float, generation: int) -> None:
+        if self._thread is None:
+            return
+        queue = self._queue
+        if len(queue) >= self.max_queue:
+            with self._drop_lock:
+                self.dropped += 1
+            return
+        fields = _FIELDS.get()
+        if fields is None:
+            queue.append((time.time(), method, route, status, seconds, generation, None, None))
+        else:
+            queue.append((time.time(), method, route, status, seconds, generation, fields.app_ids, fields.flags))
+        if len(queue) == self.batch_size:
+            self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._drain()
+        self._drain()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _drain(self) -> None:
+        queue = self._queue
+        while queue:
+            lines: List[str] = []
+            for _ in range(min(len(queue), self.batch_size)):
+                lines.append(self._format(queue.popleft()))
+            try:
+                self._write(''.join(lines).encode('utf-8'))
+                self.written += len(lines)
+            except OSError as e:
+                # The batch is lost: counted with the drops, and logged once
+                # until a write succeeds again rather than once per batch.
+                with self._drop_lock:
+                    self.dropped += len(lines)
+                self._reported_drops += len(lines)
+                if not self._write_lost:
+                    logger.error(f"Failed to write access log to {self.path}, dropping records until it recovers: {e}")
+                self._write_lost += len(lines)
+                continue
+            if self._write_lost:
+                logger.warning(f"Access log writes recovered, dropped {self._write_lost} records meanwhile")
+                self._write_lost = 0
+
+        dropped = self.dropped
+        if dropped != self._reported_drops:
+            logger.warning(f"Access log queue full, dropped {dropped - self._reported_drops} records")
+            self._reported_drops = dropped
+
+    @staticmethod
+    def _format(record: Record) -> str:
+        ts, method, route, status, seconds, generation, app_ids, flags = record
+        return json.dumps({
+            'time': datetime.fromtimestamp(ts).isoformat(timespec='milliseconds'),
+            'method': method,
+            'route': route or 'unmatched',
+            'status': status,
+            'latency_ms': round(seconds * 1000, 3),
+            'generation': generation,
+            'app_ids': list(app_ids) if app_ids is not None else None,
+            'flags': flags
+        }, separators=(',', ':')) + '\n'
+
+    def _write(self, data: bytes) -> None:
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._file = open(self.path, 'ab', buffering=0)
+            self._size = self._file.tell()
+        if self._size and self._size + len(data) > self.max_bytes:
+            self._rotate()
+        self._file.write(data)
+        self._size += len(data)
+
+    def _rotate(self) -> None:
+        # requests.jsonl -> requests.jsonl.1[.gz] -> ... -> .{backups}, the
+        # oldest one falling off the end.
+        suffix = '.gz' if self.compress else ''
+        rotated = f"{self.path}.1"
+        if self.backups and self.compress and os.path.exists(rotated) and not self._gzip(rotated):
+            # An earlier compression failed and left .1 behind, and retrying
+            # failed too: keep appending rather than overwrite it. The next
+            # write tries again.
+            return
+        self._file.close()
+        self._file = None
+        if self.backups:
+            for i in range(self.backups - 1, 0, -1):
+                older = f"{self.path}.{i}{suffix}"
+                if os.path.exists(older):
+                    os.replace(older, f"{self.path}.{i + 1}{suffix}")
+            os.replace(self.path, rotated)
+            if self.compress:
+                self._gzip(rotated)
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, 'ab', buffering=0)
+        self._size = 0
+
+    @staticmethod
+    def _gzip(path: str) -> bool:
+        # Runs on the writer thread; the queue absorbs requests meanwhile.
+        # On failure path is left in place for the next rotation to retry.
+        try:
+            with open(path, 'rb') as src, gzip.open(f"{path}.gz.tmp", 'wb', compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst, 1 << 20)
+            os.replace(f"{path}.gz.tmp", f"{path}.gz")
+            os.remove(path)
+            return True
+        except OSError as e:
+            logger.error(f"Failed to compress {path}: {e}")
+            return False
+
+    def _collect_metrics(self):
+        yield ('appleblox_access_log_records_total', 'counter', 'Access log records by outcome',
+               [({'result': 'written'}, self.written), ({'result': 'dropped'}, self.dropped)])
+        yield ('appleblox_access_log_queue_records', 'gauge', 'Access log records waiting for the writer',
+               [({}, len(self._queue))])
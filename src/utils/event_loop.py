@@ -0,0 +1,81 @@
+import asyncio
+import logging
+from threading import Event, Lock, Thread
+from typing import Any, Coroutine, Optional
+
+logger = logging.getLogger(__name__)
+
+class EventLoopThread:
+    _instance = None
+    _lock = Lock()
+
+    def __init__(self):
+        if EventLoopThread._instance is not None:
+            raise RuntimeError("Use EventLoopThread.instance() to get singleton")
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[Thread] = None
+
+    @classmethod
+    def instance(cls) -> 'EventLoopThread':
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @property
+    def loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        return self._loop
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self.running:
+                return self._loop
+
+            started = Event()
+            self._loop = asyncio.new_event_loop()
+            self._thread = Thread(
+                target=self._run_forever,
+                args=(self._loop, started),
+                name="flagsman-event-loop",
+                daemon=True
+            )
+            self._thread.start()
+            started.wait()
+
+        logger.info("Shared event loop thread started")
+        return self._loop
+
+    @staticmethod
+    def _run_forever(loop: asyncio.AbstractEventLoop, started: Event) -> None:
+        asyncio.set_event_loop(loop)
+        loop.call_soon(started.set)
+        loop.run_forever()
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        # call_soon_threadsafe copies the caller's contextvars, so Flask's
+        # request/app context is visible to the coroutine on the loop thread.
+        if not self.running:
+            raise RuntimeError("Shared event loop is not running")
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._lock:
+            if not self.running:
+                return
+
+            loop, thread = self._loop, self._thread
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+            if not thread.is_alive():
+                loop.close()
+
+            self._loop = None
+            self._thread = None
+
+        logger.info("Shared event loop thread stopped")
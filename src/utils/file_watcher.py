@@ -0,0 +1,126 @@
+import asyncio
+import ctypes
+import ctypes.util
+import logging
+import os
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Change detection for a handful of files. On Linux their directories are
+# watched with inotify through ctypes, which also sees editors and deploy
+# tools that replace a file by rename; elsewhere, or when inotify is not
+# available, the files are stat()ed every poll interval. Either way a wake-up
+# only means "look again": a file counts as changed once its (inode, size,
+# mtime) differs from what was last seen. The poll interval also bounds how
+# long a missed inotify event (e.g. a removed and recreated directory) goes
+# unnoticed.
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o4000
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+Signature = Optional[Tuple[int, int, int]]
+
+def file_signature(path: str) -> Signature:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+def _libc():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+class FileWatcher:
+    def __init__(self, paths: Iterable[str], poll_interval: float, debounce: float = 0.05):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.poll_interval = poll_interval
+        # Lets a multi-step write (truncate, write, close) land before the
+        # files are looked at.
+        self.debounce = debounce
+        self.backend = 'poll'
+        # perf_counter() of the first wake-up behind the last wait() result
+        self.detected_at = 0.0
+        self._signatures: Dict[str, Signature] = {path: file_signature(path) for path in self.paths}
+        self._fd: Optional[int] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._event: Optional[asyncio.Event] = None
+
+    def start(self) -> None:
+        # Must be called from the loop wait() will be awaited on.
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+        self._fd = self._inotify()
+        if self._fd is not None:
+            self._loop.add_reader(self._fd, self._on_readable)
+            self.backend = 'inotify'
+
+    def close(self) -> None:
+        if self._fd is not None:
+            self._loop.remove_reader(self._fd)
+            os.close(self._fd)
+            self._fd = None
+            self.backend = 'poll'
+
+    def _inotify(self) -> Optional[int]:
+        libc = _libc()
+        if libc is None:
+            return None
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            logger.warning(f"inotify unavailable ({os.strerror(ctypes.get_errno())}), polling instead")
+            return None
+        for directory in dict.fromkeys(os.path.dirname(path) for path in self.paths):
+            if libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK) < 0:
+                logger.warning(f"Cannot watch {directory} ({os.strerror(ctypes.get_errno())}), polling instead")
+                os.close(fd)
+                return None
+        return fd
+
+    def _on_readable(self) -> None:
+        # Which names the events carry does not matter; drain and wake up.
+        try:
+            while os.read(self._fd, 64 * 1024):
+                pass
+        except BlockingIOError:
+            pass
+        if not self._event.is_set():
+            self.detected_at = time.perf_counter()
+            self._event.set()
+
+    async def wait(self) -> List[str]:
+        # Returns the paths that changed since the previous call.
+        while True:
+            try:
+                await asyncio.wait_for(self._event.wait(), self.poll_interval)
+                await asyncio.sleep(self.debounce)
+            except asyncio.TimeoutError:
+                self.detected_at = time.perf_counter()
+            self._event.clear()
+
+            changed = []
+            for path, signature in self._signatures.items():
+                current = file_signature(path)
+                if current != signature:
+                    self._signatures[path] = current
+                    changed.append(path)
+            if changed:
+                return changed
@@ -1,47 +1,161 @@
 import aiohttp
 import asyncio
 import logging
-from typing import Optional, Any, List
+import random
+from dataclasses import dataclass
+from typing import Optional, Any, AsyncIterator, Awaitable, Callable, Dict, List, Tuple
+import config
 
 logger = logging.getLogger(__name__)
 
+STREAM_CHUNK_SIZE = 64 * 1024
+
+StreamConsumer = Callable[[AsyncIterator[bytes]], Awaitable[Any]]
+
+@dataclass
+class FetchResult:
+    data: Optional[Any] = None
+    status: Optional[int] = None
+    not_modified: bool = False
+    size: int = 0  # body bytes received
+
 class HTTPClient:
     def __init__(self):
         self._session: Optional[aiohttp.ClientSession] = None
-        self._headers = {
-            "User-Agent": "AppleBlox/1.0",
-            "Accept": "application/json"
-        }
+        self._headers = dict(config.DEFAULT_HEADERS)
+        # url -> validators from the last 200 response (ETag / Last-Modified)
+        self._validators: Dict[str, Dict[str, str]] = {}
+        self.retries = config.HTTP_RETRIES
+        self.backoff = config.HTTP_RETRY_BACKOFF
+        self.backoff_max = config.HTTP_RETRY_BACKOFF_MAX
+        self.retry_statuses = frozenset(config.HTTP_RETRY_STATUSES)
         
     async def _get_session(self) -> aiohttp.ClientSession:
         if not self._session or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=config.HTTP_POOL_LIMIT,
+                limit_per_host=config.HTTP_POOL_LIMIT_PER_HOST,
+                ttl_dns_cache=config.HTTP_DNS_CACHE_TTL,
+                keepalive_timeout=config.HTTP_KEEPALIVE_TIMEOUT
+            )
+            # sock_read bounds each wait for data, so a stalled endpoint fails
+            # (and is retried) long before the total timeout runs out.
             self._session = aiohttp.ClientSession(
                 headers=self._headers,
-                timeout=aiohttp.ClientTimeout(total=30)
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(
+                    total=config.REQUEST_TIMEOUT,
+                    connect=config.HTTP_CONNECT_TIMEOUT,
+                    sock_read=config.HTTP_READ_TIMEOUT
+                )
             )
         return self._session
         
+    async def close(self) -> None:
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
     async def get(self, url: str, raw: bool = False) -> Optional[Any]:
+        return (await self.fetch(url, raw=raw)).data
+
+    async def fetch(self, url: str, raw: bool = False, conditional: bool = False,
+                    stream: Optional[StreamConsumer] = None) -> FetchResult:
+        # With conditional=True the stored validators for url are sent, and an
+        # unchanged resource comes back as not_modified with no data; the
+        # caller is expected to still hold what it parsed last time.
+        # With stream set, a 200 body is handed to it chunk by chunk and its
+        # return value becomes the result data.
         session = await self._get_session()
+        headers = {}
+        validators = self._validators.get(url) if conditional else None
+        if validators:
+            if 'etag' in validators:
+                headers['If-None-Match'] = validators['etag']
+            if 'last_modified' in validators:
+                headers['If-Modified-Since'] = validators['last_modified']
         
+        for attempt in range(self.retries + 1):
+            result, retryable, retry_after = await self._attempt(session, url, headers, validators, raw, stream)
+            if not retryable or attempt == self.retries:
+                if retryable:
+                    logger.error(f"Giving up on {url} after {attempt + 1} attempts")
+                return result
+
+            delay = self.retry_delay(attempt, retry_after)
+            logger.warning(f"Retrying {url} in {delay:.2f}s (attempt {attempt + 2}/{self.retries + 1})")
+            await asyncio.sleep(delay)
+
+    def retry_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        # Exponential backoff with full jitter; a server's Retry-After wins
+        # when it asks for longer, up to backoff_max.
+        delay = random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+    async def _attempt(self, session: aiohttp.ClientSession, url: str, headers: Dict[str, str],
+                       validators: Optional[Dict[str, str]], raw: bool,
+                       stream: Optional[StreamConsumer]) -> Tuple[FetchResult, bool, Optional[float]]:
+        # Returns (result, retryable, retry_after)
         try:
-            async with session.get(url) as response:
+            async with session.get(url, headers=headers) as response:
+                if response.status == 304 and validators:
+                    return FetchResult(status=304, not_modified=True), False, None
+
                 if response.status == 200:
-                    if raw:
-                        return await response.text()
-                    return await response.json()
-                    
+                    if stream:
+                        size = 0
+
+                        async def counted():
+                            nonlocal size
+                            async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                                size += len(chunk)
+                                yield chunk
+
+                        data = await stream(counted())
+                    else:
+                        # read() caches the body, so text()/json() reuse it
+                        size = len(await response.read())
+                        data = await response.text() if raw else await response.json()
+                    self._store_validators(url, response)
+                    return FetchResult(data=data, status=200, size=size), False, None
+
+                if response.status in self.retry_statuses:
+                    logger.warning(f"HTTP {response.status} from {url}")
+                    return FetchResult(status=response.status), True, _retry_after(response)
+
                 if response.status != 404:
                     logger.error(f"HTTP {response.status} from {url}")
-                return None
-                
+                return FetchResult(status=response.status), False, None
+
         except asyncio.TimeoutError:
-            logger.error(f"Request timeout for {url}")
-            return None
-            
+            logger.warning(f"Request timeout for {url}")
+            return FetchResult(), True, None
+
+        except (aiohttp.ContentTypeError, ValueError) as e:
+            logger.error(f"Invalid response from {url}: {str(e)}")
+            return FetchResult(), False, None
+
+        except aiohttp.ClientError as e:
+            logger.warning(f"Request failed for {url}: {str(e)}")
+            return FetchResult(), True, None
+
         except Exception as e:
             logger.error(f"Request failed for {url}: {str(e)}")
-            return None
+            return FetchResult(), False, None
+
+    def _store_validators(self, url: str, response: aiohttp.ClientResponse) -> None:
+        validators = {}
+        if response.headers.get('ETag'):
+            validators['etag'] = response.headers['ETag']
+        if response.headers.get('Last-Modified'):
+            validators['last_modified'] = response.headers['Last-Modified']
+
+        if validators:
+            self._validators[url] = validators
+        else:
+            self._validators.pop(url, None)
 
     async def gather(self, *tasks) -> List[Any]:
         try:
@@ -59,4 +173,11 @@ class HTTPClient:
             
         except Exception as e:
             logger.error(f"Parallel request failed: {str(e)}")
-            return [None] * len(tasks)
\ No newline at end of file
+            return [None] * len(tasks)
+
+def _retry_after(response: aiohttp.ClientResponse) -> Optional[float]:
+    # Only the delta-seconds form; an HTTP date falls back to plain backoff.
+    try:
+        return max(0.0, float(response.headers['Retry-After']))
+    except (KeyError, ValueError):
+        return None
@@ -0,0 +1,264 @@
+import asyncio
+import functools
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import config
+
+# Minimal Prometheus text-format metrics (exposition format 0.0.4), so the
+# service needs no client library. With METRICS_ENABLED off every metric is
+# a no-op and timed() hands back the undecorated function.
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+LabelValues = Tuple[str, ...]
+# (name, type, help, [(labels, value)]) as produced by collectors at scrape time
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric(ABC):
+    kind = ''
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(self._samples())
+        return lines
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        ...
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}' for key, value in items]
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self._values: Dict[LabelValues, list] = {}
+
+    def _state(self, key: LabelValues) -> list:
+        state = self._values.get(key)
+        if state is None:
+            with self._lock:
+                state = self._values.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0])
+        return state
+
+    def observe(self, value: float, **labels) -> None:
+        self._observe(self._state(self._key(labels)), value)
+
+    def labels(self, **labels) -> '_BoundHistogram':
+        # Resolves the label set once, for hot paths with fixed labels.
+        return _BoundHistogram(self, self._state(self._key(labels)))
+
+    def _observe(self, state: list, value: float) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            state[0][i] += 1
+            state[1] += value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+class _BoundHistogram:
+    __slots__ = ('_histogram', '_state')
+
+    def __init__(self, histogram: Histogram, state: list):
+        self._histogram = histogram
+        self._state = state
+
+    def observe(self, value: float) -> None:
+        self._histogram._observe(self._state, value)
+
+class _NullMetric:
+    # Stand-in for every metric type while metrics are disabled.
+    name = ''
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        pass
+
+    def set(self, value: float, **labels) -> None:
+        pass
+
+    def observe(self, value: float, **labels) -> None:
+        pass
+
+    def labels(self, **labels) -> '_NullMetric':
+        return self
+
+    def render(self) -> List[str]:
+        return []
+
+NULL_METRIC = _NullMetric()
+
+class Registry:
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+
+    def _add(self, metric):
+        if not self.enabled:
+            return NULL_METRIC
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        return self._add(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        return self._add(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS):
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], Iterable[Family]]) -> None:
+        # For values read at scrape time (snapshot sizes, uptime) rather than
+        # updated on the hot path.
+        if self.enabled:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for name, kind, help_text, samples in collector():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in samples:
+                    lines.append(f'{name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry(config.METRICS_ENABLED)
+
+def timed(metric, **labels):
+    # Decorator observing the wall time of each call (sync or async) into a
+    # histogram, whether it returns or raises.
+    if metric is NULL_METRIC:
+        return lambda f: f
+
+    observe = metric.labels(**labels).observe
+    clock = time.perf_counter
+
+    def decorator(f):
+        if asyncio.iscoroutinefunction(f):
+            @functools.wraps(f)
+            async def async_wrapper(*args, **kwargs):
+                started = clock()
+                try:
+                    return await f(*args, **kwargs)
+                finally:
+                    observe(clock() - started)
+            return async_wrapper
+
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            started = clock()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                observe(clock() - started)
+        return wrapper
+    return decorator
+
+# Shared metrics, defined once here so every module reports into the same
+# families.
+REQUEST_SECONDS = REGISTRY.histogram(
+    'appleblox_http_request_duration_seconds', 'HTTP request latency by route', ('route', 'method', 'status'))
+CHECK_SECONDS = REGISTRY.histogram(
+    'appleblox_check_flags_duration_seconds', 'check_flags duration', ('kind',))
+CHECK_FLAGS = REGISTRY.histogram(
+    'appleblox_check_flags_input_flags', 'Flags per check_flags call (or per batch job)', ('kind',), SIZE_BUCKETS)
+CHECK_APPLICATIONS = REGISTRY.histogram(
+    'appleblox_check_flags_input_applications', 'Applications per check_flags call', ('kind',), SIZE_BUCKETS)
+FETCH_SECONDS = REGISTRY.histogram(
+    'appleblox_upstream_fetch_duration_seconds', 'Upstream fetch latency per source', ('source',))
+FETCH_BYTES = REGISTRY.counter(
+    'appleblox_upstream_fetch_bytes_total', 'Upstream response bytes per source', ('source',))
+FETCH_RESPONSES = REGISTRY.counter(
+    'appleblox_upstream_fetch_responses_total', 'Upstream responses per source and status', ('source', 'status'))
+FETCH_ALL_SECONDS = REGISTRY.histogram(
+    'appleblox_fetch_all_flags_duration_seconds', 'Duration of a full fetch of every source')
+SNAPSHOT_BUILD_SECONDS = REGISTRY.histogram(
+    'appleblox_snapshot_build_duration_seconds', 'Snapshot build time')
+REFRESH_SECONDS = REGISTRY.histogram(
+    'appleblox_refresh_duration_seconds', 'update_cache duration, fetch included')
+SEARCH_SECONDS = REGISTRY.histogram(
+    'appleblox_search_duration_seconds', 'Flag search duration')
+LIST_RELOAD_SECONDS = REGISTRY.histogram(
+    'appleblox_list_reload_duration_seconds', 'Whitelist/risk list change detected to index swapped')
+LIST_RELOADS = REGISTRY.counter(
+    'appleblox_list_reloads_total', 'Whitelist/risk list reloads by result', ('result',))
+VALIDATE_SECONDS = REGISTRY.histogram(
+    'appleblox_validate_duration_seconds', 'Profile validation duration')
+VALIDATE_FLAGS = REGISTRY.histogram(
+    'appleblox_validate_input_flags', 'Flags per validated profile', buckets=SIZE_BUCKETS)
+
+def observe_request(route: Optional[str], method: str, status: int, seconds: float) -> None:
+    REQUEST_SECONDS.observe(seconds, route=route or 'unmatched', method=method, status=str(status))
@@ -0,0 +1,193 @@
+import hashlib
+import logging
+import math
+import mmap
+import os
+import struct
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Optional, Tuple
+import config
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Token buckets keyed by "<route class>:<client ip>". Each key holds just
+# (tokens, last update), and a bucket idle for longer than it takes to
+# refill completely is indistinguishable from a new one, so backends are
+# free to drop it.
+
+class RateLimitBackend(ABC):
+    @abstractmethod
+    def take(self, key: str, capacity: float, rate: float, now: float) -> float:
+        # Takes one token; returns 0 if allowed, else seconds until one is free.
+        ...
+
+    def close(self) -> None:
+        pass
+
+def _refill(state: Optional[Tuple[float, float]], capacity: float, rate: float, now: float) -> Tuple[float, float]:
+    # Returns (new tokens, retry_after)
+    if state is None:
+        tokens = capacity
+    else:
+        tokens, updated = state
+        tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate
+
+class MemoryBackend(RateLimitBackend):
+    # Per process. Keys are kept in last-use order so idle ones expire from
+    # the front in O(1) per request.
+    def __init__(self, idle_ttl: float):
+        self._buckets: 'OrderedDict[str, Tuple[float, float]]' = OrderedDict()
+        self._idle_ttl = idle_ttl
+        self._lock = Lock()
+
+    def take(self, key: str, capacity: float, rate: float, now: float) -> float:
+        with self._lock:
+            buckets = self._buckets
+            tokens, retry_after = _refill(buckets.get(key), capacity, rate, now)
+            buckets[key] = (tokens, now)
+            buckets.move_to_end(key)
+
+            while buckets:
+                oldest, (_, updated) = next(iter(buckets.items()))
+                if now - updated < self._idle_ttl:
+                    break
+                del buckets[oldest]
+            return retry_after
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+class SharedMemoryBackend(RateLimitBackend):
+    # Shared by every worker process on the host through one mmap'd file:
+    # a fixed open-addressing table of (key hash, tokens, updated) slots,
+    # guarded by an flock. Memory is bounded by the slot count; when a probe
+    # run is full the least recently used slot in it is taken over.
+    MAGIC = b'FLGRATE1'
+    _HEADER = struct.Struct('<8sI4x')
+    _SLOT = struct.Struct('<Qdd')
+    PROBES = 16
+
+    def __init__(self, path: str, slots: int, idle_ttl: float):
+        if fcntl is None:
+            raise RuntimeError("Shared rate limit backend needs fcntl (POSIX only)")
+
+        self._slots = slots
+        self._idle_ttl = idle_ttl
+        self._lock = Lock()
+        size = self._HEADER.size + slots * self._SLOT.size
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size != size:
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, size)
+            self._map = mmap.mmap(self._fd, size)
+            magic, stored_slots = self._HEADER.unpack_from(self._map, 0)
+            if magic != self.MAGIC or stored_slots != slots:
+                self._map[:] = bytes(size)
+                self._HEADER.pack_into(self._map, 0, self.MAGIC, slots)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little') or 1
+
+    def take(self, key: str, capacity: float, rate: float, now: float) -> float:
+        # Wall-clock time here, since monotonic clocks are not comparable
+        # across processes.
+        key_hash = self._hash(key)
+        start = key_hash % self._slots
+        slot_size = self._SLOT.size
+        header = self._HEADER.size
+
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                target = None
+                state = None
+                oldest = None
+                for probe in range(self.PROBES):
+                    offset = header + ((start + probe) % self._slots) * slot_size
+                    stored_hash, tokens, updated = self._SLOT.unpack_from(self._map, offset)
+                    if stored_hash == key_hash:
+                        target, state = offset, (tokens, updated)
+                        break
+                    if target is None and (stored_hash == 0 or now - updated >= self._idle_ttl):
+                        target = offset
+                    if oldest is None or updated < oldest[1]:
+                        oldest = (offset, updated)
+
+                if target is None:
+                    target = oldest[0]
+
+                tokens, retry_after = _refill(state, capacity, rate, now)
+                self._SLOT.pack_into(self._map, target, key_hash, tokens, now)
+                return retry_after
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        self._map.close()
+        os.close(self._fd)
+
+class RateLimiter:
+    _instance = None
+    _lock = Lock()
+
+    def __init__(self):
+        if RateLimiter._instance is not None:
+            raise RuntimeError("Use RateLimiter.instance() to get singleton")
+
+        self.enabled = config.RATE_LIMIT_ENABLED
+        # route class -> (capacity, tokens per second)
+        self.limits: Dict[str, Tuple[float, float]] = {
+            route_class: (max_requests, max_requests / window)
+            for route_class, (max_requests, window) in config.RATE_LIMITS.items()
+        }
+        idle_ttl = max(window for _, window in config.RATE_LIMITS.values())
+        self._backend = self._create_backend(idle_ttl)
+
+    @staticmethod
+    def _create_backend(idle_ttl: float) -> RateLimitBackend:
+        if config.RATE_LIMIT_BACKEND == 'shared':
+            try:
+                return SharedMemoryBackend(config.RATE_LIMIT_SHARED_PATH, config.RATE_LIMIT_SHARED_SLOTS, idle_ttl)
+            except Exception as e:
+                logger.error(f"Shared rate limit store unavailable, using per-process limits: {e}")
+        return MemoryBackend(idle_ttl)
+
+    @classmethod
+    def instance(cls) -> 'RateLimiter':
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @property
+    def backend(self) -> RateLimitBackend:
+        return self._backend
+
+    def check(self, route_class: str, client: Optional[str]) -> int:
+        # Returns 0 if the request may proceed, else the Retry-After seconds.
+        if not self.enabled:
+            return 0
+        limit = self.limits.get(route_class) or self.limits['default']
+        capacity, rate = limit
+        retry_after = self._backend.take(f"{route_class}:{client or '-'}", capacity, rate, time.time())
+        return math.ceil(retry_after) if retry_after > 0 else 0
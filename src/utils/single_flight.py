@@ -0,0 +1,46 @@
+import asyncio
+import concurrent.futures
+from functools import partial
+from threading import Lock
+from typing import Awaitable, Callable, Generic, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
+
+def _settle(future: concurrent.futures.Future, task: asyncio.Task) -> None:
+    if task.cancelled():
+        future.set_exception(RuntimeError("Run was cancelled"))
+    elif task.exception() is not None:
+        future.set_exception(task.exception())
+    else:
+        future.set_result(task.result())
+
+class SingleFlight(Generic[T]):
+    # At most one run of a coroutine at a time: callers arriving while one is
+    # in flight await its outcome instead of starting their own. The shared
+    # result is a concurrent future, so callers on other event loops (WSGI
+    # threads with their own loop) join it too. A caller being cancelled
+    # never cancels the run the others are waiting on.
+    def __init__(self):
+        self._lock = Lock()
+        self._future: Optional[concurrent.futures.Future] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def in_flight(self) -> bool:
+        future = self._future
+        return future is not None and not future.done()
+
+    async def run(self, factory: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        # Returns (result, joined); joined is True when this call awaited a
+        # run someone else started. Exceptions reach every caller.
+        with self._lock:
+            future = self._future
+            joined = future is not None and not future.done()
+            if not joined:
+                future = self._future = concurrent.futures.Future()
+                future.set_running_or_notify_cancel()
+
+        if not joined:
+            self._task = asyncio.get_running_loop().create_task(factory())
+            self._task.add_done_callback(partial(_settle, future))
+        return await asyncio.shield(asyncio.wrap_future(future)), joined
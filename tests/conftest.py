@@ -0,0 +1,43 @@
+import json
+import os
+import sys
+import tempfile
+
+# Read by config at import time.
+os.environ.setdefault('APPLEBLOX_RATE_LIMIT', '0')
+os.environ.setdefault('APPLEBLOX_ACCESS_LOG', '0')
+os.environ['APPLEBLOX_SNAPSHOT_PATH'] = os.path.join(tempfile.mkdtemp(prefix='flagsman-tests-'), 'flags.snap')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+os.chdir(ROOT)
+
+import pytest
+
+import config
+from api import handlers
+from core.flag_service import FlagService
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    # A FlagService of its own, also behind the route handlers, so snapshots
+    # built by other tests don't leak in.
+    monkeypatch.setattr(config, 'SNAPSHOT_PATH', str(tmp_path / 'flags.snap'))
+    monkeypatch.setattr(FlagService, '_instance', None)
+    service = FlagService.instance()
+    monkeypatch.setattr(handlers, 'flag_service', service)
+    return service
+
+
+@pytest.fixture
+def lists(service, tmp_path, monkeypatch):
+    # write(risk_list, whitelist) points config at fresh list files and
+    # reloads them into the service.
+    def write(risk_list, whitelist):
+        for attr, names in (('RISK_LIST_PATH', risk_list), ('WHITELIST_PATH', whitelist)):
+            path = tmp_path / f"{attr.lower()}.json"
+            path.write_text(json.dumps(names))
+            monkeypatch.setattr(config, attr, str(path))
+        service.reload_lists()
+    return write
@@ -0,0 +1,87 @@
+import gzip
+import logging
+
+import pytest
+
+from utils import access_log
+from utils.access_log import AccessLog
+
+
+@pytest.fixture
+def log(tmp_path, monkeypatch):
+    monkeypatch.setattr(AccessLog, '_instance', None)
+    log = AccessLog.instance()
+    log.path = str(tmp_path / 'requests.jsonl')
+    yield log
+    log.stop()
+    if log._file is not None:
+        log._file.close()
+
+
+def read(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as f:
+        return f.read()
+
+
+def test_failed_writes_count_as_dropped_and_log_once(log, tmp_path, caplog):
+    (tmp_path / 'blocked').write_text('')
+    log.path = str(tmp_path / 'blocked' / 'requests.jsonl')
+    log.batch_size = 10
+
+    with caplog.at_level(logging.WARNING, logger=access_log.__name__):
+        log.start()
+        for _ in range(25):
+            log.record('/api/check', 'POST', 200, 0.001, 1)
+        log.stop()
+        assert (log.written, log.dropped) == (0, 25)
+        errors = [r for r in caplog.records if r.levelno == logging.ERROR]
+        assert len(errors) == 1
+        assert not any('queue full' in r.getMessage() for r in caplog.records)
+
+        log.path = str(tmp_path / 'requests.jsonl')
+        log.start()
+        log.record('/api/check', 'POST', 200, 0.001, 1)
+        log.stop()
+
+    assert (log.written, log.dropped) == (1, 25)
+    assert any('dropped 25 records' in r.getMessage() for r in caplog.records if r.levelno == logging.WARNING)
+
+
+def failing_gzip(monkeypatch, failures):
+    real_open = gzip.open
+    calls = {'left': failures}
+
+    def open_or_fail(*args, **kwargs):
+        if calls['left']:
+            calls['left'] -= 1
+            raise OSError('disk full')
+        return real_open(*args, **kwargs)
+
+    monkeypatch.setattr(access_log.gzip, 'open', open_or_fail)
+
+
+def test_rotation_compresses_a_leftover_from_a_failed_gzip(log, monkeypatch):
+    log.max_bytes, log.backups, log.compress = 10, 3, True
+    log._write(b'first\n')
+    failing_gzip(monkeypatch, 1)
+    log._write(b'second\n')
+    assert read(f"{log.path}.1") == b'first\n'
+
+    log._write(b'third\n')
+
+    assert read(log.path) == b'third\n'
+    assert read(f"{log.path}.1.gz") == b'second\n'
+    assert read(f"{log.path}.2.gz") == b'first\n'
+
+
+def test_rotation_waits_while_the_leftover_cannot_be_compressed(log, monkeypatch):
+    log.max_bytes, log.backups, log.compress = 10, 3, True
+    log._write(b'first\n')
+    failing_gzip(monkeypatch, 2)
+    log._write(b'second\n')
+
+    log._write(b'third\n')
+
+    assert read(f"{log.path}.1") == b'first\n'
+    assert read(log.path) == b'second\nthird\n'
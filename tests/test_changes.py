@@ -0,0 +1,78 @@
+import asyncio
+from array import array
+from collections import deque
+from datetime import datetime
+
+from api import handlers
+from core.flag_table import NAMES, AppFlags
+from core.flag_values import VALUES
+from core.snapshot_diff import diff_app
+
+
+def app_data(**settings):
+    return {'applicationSettings': settings}
+
+
+def app_flags(settings: dict) -> AppFlags:
+    return AppFlags(
+        array('I', (NAMES.intern(name) for name in settings)),
+        array('I', (VALUES.intern_flag(name, raw) for name, raw in settings.items())),
+        datetime.now()
+    )
+
+
+def test_diff_app_finds_a_single_change_in_a_large_app():
+    settings = {f"FFlagDiff{i}": 'True' for i in range(5000)}
+    old = app_flags(settings)
+    settings['FFlagDiff2500'] = 'False'
+    settings['DFIntDiffAdded'] = '7'
+    del settings['FFlagDiff10']
+
+    diff = diff_app(old, app_flags(settings))
+
+    assert diff.added == {'DFIntDiffAdded': 7}
+    assert diff.removed == ['FFlagDiff10']
+    assert diff.changed == {'FFlagDiff2500': (True, False)}
+
+
+def test_diff_app_ignores_raw_changes_that_parse_the_same():
+    old = app_flags({'FFlagSameParse': 'False', 'FIntSameParse': '5'})
+    assert diff_app(old, app_flags({'FFlagSameParse': 'changed', 'FIntSameParse': '5'})) is None
+
+    diff = diff_app(old, app_flags({'FFlagSameParse': 'changed', 'FIntSameParse': '6'}))
+    assert diff.changed == {'FIntSameParse': (5, 6)}
+
+
+def test_changes_since_returns_the_diffs(service):
+    service.build_cache({'PCDesktopClient': app_data(FFlagA='True', FFlagB='False', DFIntC='5')})
+    since = service.generation
+    service.build_cache({'PCDesktopClient': app_data(FFlagA='False', FFlagB='changed', DFIntC='5', FFlagD='True')})
+
+    payload, status = asyncio.run(handlers.get_changes(str(since)))
+
+    assert status == 200
+    assert payload['since'] == since and payload['generation'] == service.generation
+    [change] = payload['changes']
+    assert change['apps'] == {'PCDesktopClient': {
+        'added': {'FFlagD': True},
+        'removed': [],
+        'changed': {'FFlagA': {'old': True, 'new': False}}
+    }}
+
+    payload, status = asyncio.run(handlers.get_changes(str(since), 'MacDesktopClient'))
+    assert status == 200 and payload['changes'][0]['apps'] == {}
+
+
+def test_changes_since_is_gone_when_too_old_or_ahead(service):
+    service._changes = deque(maxlen=1)
+    for value in ('1', '2', '3'):
+        service.build_cache({'PCDesktopClient': app_data(DFIntGone=value)})
+    current = service.generation
+
+    for since in (current - 2, current + 5):
+        payload, status = asyncio.run(handlers.get_changes(str(since)))
+        assert status == 410
+        assert payload['generation'] == current
+
+    payload, status = asyncio.run(handlers.get_changes(str(current)))
+    assert status == 200 and payload['changes'] == []
@@ -0,0 +1,56 @@
+import asyncio
+
+from api import handlers
+from core.flag_index import APP_BITS, RISK_BIT, WHITELIST_BIT
+
+
+def test_check_flags_classifies_through_the_index(service, lists):
+    lists(['FFlagRisky', 'FFlagRiskyNowhere'], ['FFlagAllowed', 'FFlagAllowedNowhere'])
+    service.build_cache({
+        'PCDesktopClient': {'applicationSettings': {'FFlagOnPc': 'True', 'FFlagRisky': 'True', 'FFlagAllowed': 'False'}},
+        'MacDesktopClient': {'applicationSettings': {'FFlagOnMac': 'True'}},
+    })
+
+    payload, status = asyncio.run(handlers.check_flags({
+        'flags': ['FFlagOnPc', 'FFlagOnMac', 'FFlagRisky', 'FFlagRiskyNowhere', 'FFlagAllowed', 'FFlagNowhere', 'FFlagOnPc'],
+        'applications': ['PCDesktopClient'],
+    }))
+
+    assert status == 200
+    assert payload == {
+        'success': True,
+        'valid': ['FFlagOnPc', 'FFlagAllowed'],
+        'invalid': ['FFlagOnMac', 'FFlagNowhere'],
+        'risk': ['FFlagRisky', 'FFlagRiskyNowhere'],
+    }
+
+    index = service.snapshot.index
+    assert index.lookup('FFlagRisky') == APP_BITS['PCDesktopClient'] | RISK_BIT
+    assert index.lookup('FFlagAllowed') == APP_BITS['PCDesktopClient'] | WHITELIST_BIT
+    # Listed names on no application still carry their list bit.
+    assert index.lookup('FFlagAllowedNowhere') == WHITELIST_BIT
+    assert index.lookup_many(['FFlagRiskyNowhere', 'FFlagOnMac', 'FFlagNowhere']) == [
+        RISK_BIT, APP_BITS['MacDesktopClient'], 0
+    ]
+
+
+def test_reloaded_lists_move_the_list_bits(service, lists):
+    lists(['FFlagOnPc'], [])
+    service.build_cache({'PCDesktopClient': {'applicationSettings': {'FFlagOnPc': 'True', 'FFlagOther': 'True'}}})
+    lists([], ['FFlagOnPc'])
+
+    payload, status = asyncio.run(handlers.check_flags({
+        'flags': ['FFlagOnPc', 'FFlagOther'], 'applications': ['PCDesktopClient', 'MacDesktopClient']
+    }))
+
+    assert status == 200 and payload['valid'] == ['FFlagOnPc', 'FFlagOther'] and payload['risk'] == []
+    assert service.snapshot.index.lookup('FFlagOnPc') == APP_BITS['PCDesktopClient'] | WHITELIST_BIT
+
+
+def test_check_flags_rejects_unknown_applications(service):
+    service.build_cache({'PCDesktopClient': {'applicationSettings': {'FFlagOnPc': 'True'}}})
+
+    payload, status = asyncio.run(handlers.check_flags({'flags': ['FFlagOnPc'], 'applications': ['Toaster']}))
+
+    assert status == 400
+    assert payload == {'error': 'Invalid application ID: Toaster'}
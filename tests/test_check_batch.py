@@ -0,0 +1,32 @@
+import asyncio
+import json
+
+from api import handlers
+
+
+def run_batch(jobs):
+    body, status, headers = asyncio.run(handlers.check_flags_batch(jobs))
+    return status, headers, [json.loads(line) for line in b''.join(body).splitlines()]
+
+
+def test_unhashable_applications_fail_only_their_own_job():
+    status, headers, lines = run_batch([
+        {'flags': ['FFlagOne'], 'applications': ['PCDesktopClient']},
+        {'flags': ['FFlagOne'], 'applications': [{'app': 'PCDesktopClient'}]},
+        {'flags': ['FFlagOne'], 'applications': [['PCDesktopClient']]},
+        {'flags': ['FFlagTwo'], 'applications': ['MacDesktopClient']},
+    ])
+
+    assert status == 200
+    assert headers['Content-Type'] == 'application/x-ndjson'
+    assert [line['job'] for line in lines] == [0, 1, 2, 3]
+    assert lines[0]['success'] and lines[3]['success']
+    assert lines[1] == {'job': 1, 'error': 'applications must be strings'}
+    assert lines[2] == {'job': 2, 'error': 'applications must be strings'}
+
+
+def test_unhashable_applications_are_a_bad_request_for_a_single_check():
+    payload, status = asyncio.run(handlers.check_flags({'flags': ['FFlagOne'], 'applications': [{}]}))
+
+    assert status == 400
+    assert payload == {'error': 'applications must be strings'}
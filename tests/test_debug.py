@@ -0,0 +1,67 @@
+import asyncio
+
+from upstream_stub import UpstreamStub
+
+import config
+from api import handlers
+from core.flag_fetcher import FlagFetcher
+
+FVARIABLES_PATH = '/FVariables.txt'
+
+
+def test_debug_routes_answer_from_the_snapshot(service, monkeypatch):
+    async def no_github(*args, **kwargs):
+        raise AssertionError('debug routes must not fetch from GitHub')
+
+    monkeypatch.setattr(FlagFetcher, 'fetch_flags_from_github', no_github)
+    service.build_cache({
+        'ALL': {'applicationSettings': {
+            'FFlagA': 'false', 'DFFlagB': 'false', 'DFIntTaskSchedulerTargetFps': '0', 'DFIntOther': '0',
+            'FStringC': ''
+        }},
+        'PCDesktopClient': {'applicationSettings': {'DFIntTaskSchedulerTargetFps': '144'}},
+    })
+
+    payload, status = asyncio.run(handlers.debug_flag_analysis())
+    assert status == 200
+    assert payload['generation'] == service.generation
+    assert payload['github_raw_count'] == 5
+    assert payload['prefix_analysis'] == {'FFlag': 1, 'DFFlag': 1, 'DFInt': 2, 'FString': 1}
+    assert payload['dfint_sample'] == ['DFIntTaskSchedulerTargetFps', 'DFIntOther']
+    assert payload['has_target_flag'] is True and 'refresh_error' not in payload
+
+    payload, status = asyncio.run(handlers.debug_find_flag('DFIntTaskSchedulerTargetFps'))
+    assert status == 200 and payload['in_github'] is True
+    assert {app for app, present in payload['in_applications'].items() if present} == {'ALL', 'PCDesktopClient'}
+
+
+def test_live_debug_calls_share_one_upstream_fetch(service, monkeypatch):
+    monkeypatch.setattr(service._fetcher._http, 'retries', 0)
+    monkeypatch.setattr(config, 'DEBUG_LIVE_MIN_INTERVAL', 60)
+
+    async def scenario():
+        stub = UpstreamStub(github_flags=50, client_flags=5, latency=0.05)
+        url = await stub.start()
+        monkeypatch.setattr(FlagFetcher, 'GITHUB_URL', f"{url}{FVARIABLES_PATH}")
+        monkeypatch.setattr(FlagFetcher, 'BASE_URL', f"{url}/v2/settings/application")
+        try:
+            concurrent = await asyncio.gather(
+                *(handlers.debug_find_flag('FFlagStub1', live=True) for _ in range(5)),
+                handlers.debug_flag_analysis(live=True),
+            )
+            fetched = stub.requests[FVARIABLES_PATH]
+            # A fresh snapshot within the minimum interval is not refetched.
+            again = await handlers.debug_flag_analysis(live=True)
+            return concurrent, fetched, again, stub.requests[FVARIABLES_PATH]
+        finally:
+            await service.close()
+            await stub.stop()
+
+    concurrent, fetched, (again, _), fetched_after = asyncio.run(scenario())
+
+    assert fetched == fetched_after == 1
+    for payload, status in concurrent:
+        assert status == 200 and 'refresh_error' not in payload
+        assert payload['generation'] == service.generation
+    assert all(payload['in_github'] for payload, _ in concurrent[:5])
+    assert again['github_raw_count'] == 50
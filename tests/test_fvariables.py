@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from core.fvariables import default_value, iter_fvariables, parse_block, parse_chunks
+
+TEXT = (
+    "# Roblox-Client-Tracker FVariables\n"
+    "[C++] FFlagDebugGraphicsDisableMetal\n"
+    "  [Lua] DFIntTaskSchedulerTargetFps\r\n"
+    "[C++] UnknownPrefixFlag\n"
+    "[C++] FStringCaféName\n"
+    "[C++] SFFlagNotOneOfOurs\n"
+    "[C++] DFStringLast"
+).encode('utf-8')
+
+EXPECTED = [
+    ('C++', 'FFlagDebugGraphicsDisableMetal'),
+    ('Lua', 'DFIntTaskSchedulerTargetFps'),
+    ('C++', 'FStringCaféName'),
+    ('C++', 'DFStringLast'),
+]
+
+
+def test_parse_block():
+    assert parse_block(TEXT) == EXPECTED
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 16, 64, len(TEXT)])
+def test_parse_chunks_joins_lines_across_chunk_boundaries(size):
+    # Small sizes cut names, brackets and the two-byte "é" in half.
+    chunks = [TEXT[i:i + size] for i in range(0, len(TEXT), size)]
+    assert list(parse_chunks(chunks)) == EXPECTED
+
+
+def test_parse_chunks_with_empty_chunks_and_a_trailing_newline():
+    assert list(parse_chunks([b'', b'[C++] FFla', b'', b'gSplit\n', b''])) == [('C++', 'FFlagSplit')]
+    assert list(parse_chunks([])) == []
+
+
+def test_iter_fvariables_matches_parse_chunks():
+    async def chunks():
+        for i in range(0, len(TEXT), 5):
+            yield TEXT[i:i + 5]
+
+    async def collect():
+        return [pair async for pair in iter_fvariables(chunks())]
+
+    assert asyncio.run(collect()) == EXPECTED
+
+
+def test_default_value():
+    assert [default_value(name) for name in ('FIntA', 'DFIntA', 'FStringA', 'DFStringA', 'FFlagA', 'BFFlagA')] == [
+        '0', '0', '', '', 'false', 'false'
+    ]
@@ -0,0 +1,200 @@
+import asyncio
+import socket
+import time
+
+import pytest
+
+from upstream_stub import UpstreamStub
+
+import config
+from utils.http_client import HTTPClient
+
+CLIENT_PATH = '/v2/settings/application/PCDesktopClient'
+
+
+def run_with_stub(scenario, **stub_args):
+    async def main():
+        stub = UpstreamStub(github_flags=200, client_flags=20, **stub_args)
+        await stub.start()
+        client = HTTPClient()
+        try:
+            return await scenario(stub, client)
+        finally:
+            await client.close()
+            await stub.stop()
+
+    return asyncio.run(main())
+
+
+def record_delays(client: HTTPClient) -> list:
+    # Keeps the backoff the client asks for without sleeping through it.
+    delays = []
+    retry_delay = client.retry_delay
+
+    def recorded(attempt, retry_after=None):
+        delays.append((attempt, retry_after, retry_delay(attempt, retry_after)))
+        return 0.0
+
+    client.retry_delay = recorded
+    return delays
+
+
+def test_retries_5xx_with_backoff():
+    async def scenario(stub, client):
+        client.retries = 2
+        delays = record_delays(client)
+        result = await client.fetch(stub.url + CLIENT_PATH)
+        return stub, result, delays
+
+    stub, result, delays = run_with_stub(scenario, error_rate=1.0)
+    assert result.status == 503 and result.data is None
+    assert stub.requests[CLIENT_PATH] == 3
+    # One backoff per retry, each passing on the stub's Retry-After: 0
+    assert [(attempt, retry_after) for attempt, retry_after, _ in delays] == [(0, 0.0), (1, 0.0)]
+
+
+def test_retry_succeeds_once_upstream_recovers():
+    async def scenario(stub, client):
+        client.retries = 3
+        record_delays(client)
+        stub.fail_next = 2
+        result = await client.fetch(stub.url + CLIENT_PATH)
+        return stub, result
+
+    stub, result = run_with_stub(scenario)
+    assert result.status == 200 and 'applicationSettings' in result.data
+    assert stub.requests[CLIENT_PATH] == 3
+
+
+def test_retries_connection_errors():
+    async def scenario(stub, client):
+        client.retries = 2
+        delays = record_delays(client)
+        result = await client.fetch(stub.url + CLIENT_PATH)
+        return stub, result, delays
+
+    stub, result, delays = run_with_stub(scenario, reset_rate=1.0)
+    assert result.status is None and result.data is None
+    # Three attempts; aiohttp may itself resend a GET once on a dropped
+    # connection, so the stub can see more requests than that.
+    assert len(delays) == 2
+    assert stub.requests[CLIENT_PATH] >= 3
+
+
+def test_no_retry_on_4xx():
+    async def scenario(stub, client):
+        client.retries = 3
+        delays = record_delays(client)
+        result = await client.fetch(stub.url + '/v2/settings/application/NoSuchClient')
+        return stub, result, delays
+
+    stub, result, delays = run_with_stub(scenario)
+    assert result.status == 404
+    assert stub.requests['/v2/settings/application/NoSuchClient'] == 1
+    assert delays == []
+
+
+def test_retry_delay_is_full_jitter_capped_and_honours_retry_after():
+    client = HTTPClient()
+    client.backoff, client.backoff_max = 0.5, 8
+    for attempt in range(8):
+        cap = min(8, 0.5 * 2 ** attempt)
+        assert all(0 <= client.retry_delay(attempt) <= cap for _ in range(200))
+    assert all(client.retry_delay(0, retry_after=3) >= 3 for _ in range(50))
+    # Retry-After is still bounded by backoff_max
+    assert client.retry_delay(0, retry_after=120) == 8
+
+
+@pytest.fixture
+def timeouts():
+    saved = config.HTTP_CONNECT_TIMEOUT, config.HTTP_READ_TIMEOUT
+    yield
+    config.HTTP_CONNECT_TIMEOUT, config.HTTP_READ_TIMEOUT = saved
+
+
+def test_connect_and_read_timeouts_are_separate(timeouts):
+    config.HTTP_CONNECT_TIMEOUT, config.HTTP_READ_TIMEOUT = 0.3, 7.0
+
+    async def session_timeout():
+        client = HTTPClient()
+        try:
+            return (await client._get_session()).timeout
+        finally:
+            await client.close()
+
+    timeout = asyncio.run(session_timeout())
+    assert (timeout.connect, timeout.sock_read, timeout.total) == (0.3, 7.0, config.REQUEST_TIMEOUT)
+
+
+def test_read_timeout_on_stalled_body(timeouts):
+    config.HTTP_CONNECT_TIMEOUT, config.HTTP_READ_TIMEOUT = 5.0, 0.2
+
+    async def consume(chunks):
+        return b''.join([chunk async for chunk in chunks])
+
+    async def scenario(stub, client):
+        client.retries = 0
+        started = time.perf_counter()
+        result = await client.fetch(stub.url + '/FVariables.txt', stream=consume)
+        return result, time.perf_counter() - started
+
+    result, elapsed = run_with_stub(scenario, stall_rate=1.0, stall=3.0)
+    assert result.status is None and result.data is None
+    assert elapsed < 2.0
+
+
+def test_connect_timeout_on_unanswered_connect(timeouts):
+    config.HTTP_CONNECT_TIMEOUT, config.HTTP_READ_TIMEOUT = 0.3, 10.0
+    # A listener that never accepts, with its backlog already full, leaves
+    # new connections unanswered.
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(0)
+    port = server.getsockname()[1]
+    fillers = []
+    for _ in range(8):
+        filler = socket.socket()
+        filler.setblocking(False)
+        try:
+            filler.connect(('127.0.0.1', port))
+        except BlockingIOError:
+            pass
+        fillers.append(filler)
+
+    async def scenario():
+        client = HTTPClient()
+        client.retries = 0
+        try:
+            started = time.perf_counter()
+            result = await client.fetch(f'http://127.0.0.1:{port}/')
+            return result, time.perf_counter() - started
+        finally:
+            await client.close()
+
+    try:
+        result, elapsed = asyncio.run(scenario())
+    finally:
+        for sock in fillers + [server]:
+            sock.close()
+    assert result.status is None
+    assert elapsed < 3.0
+
+
+def test_conditional_get_round_trips_validators():
+    async def scenario(stub, client):
+        url = stub.url + CLIENT_PATH
+        first = await client.fetch(url, conditional=True)
+        first_headers = stub.headers_seen[CLIENT_PATH]
+        second = await client.fetch(url, conditional=True)
+        second_headers = stub.headers_seen[CLIENT_PATH]
+        unconditional = await client.fetch(url)
+        return stub, first, first_headers, second, second_headers, unconditional
+
+    stub, first, first_headers, second, second_headers, unconditional = run_with_stub(scenario, conditional=True)
+    assert first.status == 200 and first.data
+    assert 'If-None-Match' not in first_headers
+    assert second.status == 304 and second.not_modified and second.data is None
+    assert second_headers['If-None-Match'].startswith('"')
+    assert second_headers['If-Modified-Since'] == stub.last_modified
+    assert unconditional.status == 200 and unconditional.data == first.data
+    assert stub.not_modified == 1
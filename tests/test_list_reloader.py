@@ -0,0 +1,64 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+import config
+from core.flag_index import RISK_BIT, WHITELIST_BIT
+from core.list_reloader import ListReloader
+
+
+@pytest.fixture
+def reloader(service, lists, monkeypatch):
+    lists(['FFlagRisky'], ['FFlagAllowed'])
+    monkeypatch.setattr(config, 'LIST_POLL_INTERVAL', 0.05)
+    monkeypatch.setattr(config, 'LIST_RELOAD_DEBOUNCE', 0.01)
+    monkeypatch.setattr(ListReloader, '_instance', None)
+    return ListReloader.instance()
+
+
+def replace_file(path: str, text: str) -> None:
+    # The way editors and deploy tools save: a new file renamed over the old.
+    with open(f"{path}.tmp", 'w') as f:
+        f.write(text)
+    os.replace(f"{path}.tmp", path)
+
+
+async def until(condition, timeout: float = 2.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, 'timed out'
+        await asyncio.sleep(0.01)
+
+
+def test_invalid_lists_are_rejected_and_valid_ones_swapped_in(service, reloader):
+    service.build_cache({'PCDesktopClient': {'applicationSettings': {
+        'FFlagRisky': 'True', 'FFlagAllowed': 'True', 'FFlagNext': 'True'
+    }}})
+    generation = service.generation
+    lookup = lambda name: service.snapshot.index.lookup(name)
+
+    async def scenario():
+        reloader.start()
+        try:
+            for broken in ('["FFlagNext"', '{"FFlagNext": true}', '["FFlagNext", 5]'):
+                replace_file(config.RISK_LIST_PATH, broken)
+                await asyncio.sleep(0.2)
+                assert lookup('FFlagRisky') & RISK_BIT and not lookup('FFlagNext') & RISK_BIT
+
+            replace_file(config.RISK_LIST_PATH, json.dumps(['FFlagNext']))
+            await until(lambda: lookup('FFlagNext') & RISK_BIT)
+            assert not lookup('FFlagRisky') & RISK_BIT
+
+            os.remove(config.WHITELIST_PATH)
+            await asyncio.sleep(0.2)
+            assert lookup('FFlagAllowed') & WHITELIST_BIT
+        finally:
+            await reloader.stop()
+
+    asyncio.run(scenario())
+
+    # Lists swap into the index without a new snapshot.
+    assert service.generation == generation
+    assert not reloader.running
@@ -0,0 +1,81 @@
+import pytest
+
+import config
+from api import handlers
+from utils.rate_limiter import MemoryBackend, RateLimiter, SharedMemoryBackend
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    # conftest turns rate limiting off for every other test.
+    monkeypatch.setattr(config, 'RATE_LIMIT_ENABLED', True)
+    monkeypatch.setattr(config, 'RATE_LIMITS', {'default': (5, 50), 'check': (5, 50), 'debug': (3, 30)})
+    monkeypatch.setattr(config, 'RATE_LIMIT_BACKEND', 'memory')
+    monkeypatch.setattr(RateLimiter, '_instance', None)
+    return RateLimiter.instance()
+
+
+def test_requests_over_the_limit_get_429_with_retry_after(limiter):
+    allowed = [handlers.rate_limit('/api/debug/flags', '10.0.0.1') for _ in range(3)]
+    assert allowed == [None, None, None]
+
+    payload, status, headers = handlers.rate_limit('/api/admin/refresh', '10.0.0.1')
+    # One token per 10 s in the debug class.
+    assert status == 429
+    assert payload == {'error': 'Rate limit exceeded', 'retry_after': 10}
+    assert headers == {'Retry-After': '10'}
+
+    # Buckets are per route class and per client.
+    assert handlers.rate_limit('/api/application/PCDesktopClient', '10.0.0.1') is None
+    assert handlers.rate_limit('/api/debug/flags', '10.0.0.2') is None
+
+
+def test_forwarded_for_only_counts_behind_a_trusted_proxy(limiter, monkeypatch):
+    monkeypatch.setattr(config, 'TRUST_PROXY_HEADERS', True)
+    # One client behind a proxy with several addresses.
+    for remote_addr in ('10.0.0.1', '10.0.0.2', '10.0.0.3'):
+        assert handlers.rate_limit('/api/debug/flags', remote_addr, '203.0.113.7, 10.0.0.254') is None
+    assert handlers.rate_limit('/api/debug/flags', '10.0.0.4', '203.0.113.7')[1] == 429
+
+    # Untrusted, the header is ignored and the peer address counts.
+    monkeypatch.setattr(config, 'TRUST_PROXY_HEADERS', False)
+    assert handlers.rate_limit('/api/debug/flags', '10.0.0.4', '203.0.113.7') is None
+
+
+def test_disabled_limiter_lets_everything_through(limiter):
+    limiter.enabled = False
+    assert all(limiter.check('debug', '10.0.0.1') == 0 for _ in range(10))
+
+
+@pytest.mark.parametrize('backend', ['memory', 'shared'])
+def test_buckets_refill_at_the_configured_rate(backend, tmp_path):
+    store = MemoryBackend(60) if backend == 'memory' else SharedMemoryBackend(str(tmp_path / 'rl.shm'), 64, 60)
+    try:
+        take = lambda now: store.take('check:10.0.0.1', 2, 0.5, now)
+        assert [take(100.0), take(100.0)] == [0.0, 0.0]
+        assert take(100.0) == pytest.approx(2.0)
+        assert take(101.0) == pytest.approx(1.0)
+        assert take(102.0) == 0.0
+    finally:
+        store.close()
+
+
+def test_memory_backend_forgets_idle_buckets():
+    store = MemoryBackend(10)
+    store.take('a', 1, 1, 0.0)
+    store.take('b', 1, 1, 5.0)
+    store.take('c', 1, 1, 12.0)
+    assert len(store) == 2
+
+
+def test_shared_backend_is_shared_between_processes(tmp_path):
+    # Two handles on one file stand in for two workers.
+    path = str(tmp_path / 'rl.shm')
+    first, second = SharedMemoryBackend(path, 64, 60), SharedMemoryBackend(path, 64, 60)
+    try:
+        assert first.take('debug:10.0.0.1', 1, 0.1, 100.0) == 0.0
+        assert second.take('debug:10.0.0.1', 1, 0.1, 100.0) == pytest.approx(10.0)
+        assert second.take('debug:10.0.0.2', 1, 0.1, 100.0) == 0.0
+    finally:
+        first.close()
+        second.close()
@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+from api import handlers
+from core import flag_service
+from core.flag_index import APP_BITS, RISK_BIT
+from core.flag_table import NAMES
+from core.flag_values import INT, VALUES
+
+PER_GENERATION = 300
+LISTED_GONE = 'FFlagListedGone'
+LISTED_LATER = 'FFlagListedLater'
+
+
+def generation_data(generation: int) -> dict:
+    settings = {f"FFlagGen{generation}N{i}": 'True' for i in range(PER_GENERATION)}
+    settings['FFlagAlways'] = 'False'
+    if generation == 0:
+        settings[LISTED_GONE] = 'True'
+    return {'PCDesktopClient': {'applicationSettings': settings}}
+
+
+def test_names_no_snapshot_uses_are_released_and_reused(service, lists, monkeypatch):
+    monkeypatch.setattr(flag_service, 'TABLE_RECLAIM_MIN', 0)
+    lists([LISTED_GONE, LISTED_LATER], [])
+
+    sizes = []
+    for generation in range(8):
+        previous = service.snapshot
+        service.build_cache(generation_data(generation))
+        sizes.append(len(NAMES))
+
+    # After the first two generations the id range grows by one
+    # generation's churn at most, however many go by. An id still in use,
+    # like the listed name's, can keep it from shrinking.
+    assert max(sizes[2:]) <= max(sizes[:2]) + PER_GENERATION + 2
+    assert NAMES.in_use() <= 2 * (PER_GENERATION + 2)
+
+    # The previous snapshot still resolves, for requests still serving it.
+    assert [flag.name for flag in previous.apps['PCDesktopClient']] == list(
+        generation_data(6)['PCDesktopClient']['applicationSettings']
+    )
+
+    body, status, _ = asyncio.run(handlers.get_application_flags('PCDesktopClient'))
+    assert status == 200
+    assert [flag['name'] for flag in json.loads(body)['flags']] == list(
+        generation_data(7)['PCDesktopClient']['applicationSettings']
+    )
+    payload, _ = asyncio.run(handlers.search_flags('fflaggen7n29'))
+    assert [result['name'] for result in payload['results'][:1]] == ['FFlagGen7N29']
+
+    # The listed name left its app but keeps its risk bit, and no name that
+    # took over a freed id inherits one.
+    names = list(generation_data(7)['PCDesktopClient']['applicationSettings'])
+    payload, _ = asyncio.run(handlers.check_flags({'flags': names + [LISTED_GONE], 'applications': ['PCDesktopClient']}))
+    assert payload['risk'] == [LISTED_GONE] and payload['valid'] == names
+
+    # A listed name interned after an index was built, as a refresh in
+    # progress does, may take a freed id that index covers.
+    scratch = NAMES.intern('FFlagScratch')
+    snapshot = service.build_cache(generation_data(8))
+    NAMES.release([scratch])
+    NAMES.intern(LISTED_LATER)
+    assert snapshot.index.lookup(LISTED_LATER) == RISK_BIT
+    assert snapshot.index.lookup_many([LISTED_LATER, 'FFlagAlways']) == [RISK_BIT, APP_BITS['PCDesktopClient']]
+
+
+def int_data(generation: int) -> dict:
+    settings = {f"DFIntGen{generation}N{i}": str(generation * 1000 + i) for i in range(PER_GENERATION)}
+    settings['FFlagAlways'] = 'False'
+    return {'PCDesktopClient': {'applicationSettings': settings}}
+
+
+def test_values_no_snapshot_uses_are_released_and_reused(service, monkeypatch):
+    monkeypatch.setattr(flag_service, 'TABLE_RECLAIM_MIN', 0)
+
+    for generation in range(8):
+        previous = service.snapshot
+        service.build_cache(int_data(generation))
+
+    # This generation's values and the previous one's.
+    assert VALUES.in_use() <= 2 * (PER_GENERATION + 1)
+    assert [flag.value for flag in previous.apps['PCDesktopClient']][:2] == [6000, 6001]
+    body, _, _ = asyncio.run(handlers.get_application_flags('PCDesktopClient'))
+    flags = json.loads(body)['flags']
+    assert [(flag['name'], flag['value'], flag['enabled']) for flag in flags[:2]] == [
+        ('DFIntGen7N0', 7000, True), ('DFIntGen7N1', 7001, True)
+    ]
+
+    # Released names are forgotten along with their kinds, and a freed value
+    # id is reused for a value parsed afresh.
+    assert VALUES.kinds_of(['DFIntGen0N1', 'DFIntGen7N1']) == [None, INT]
+    unused = VALUES.intern(INT, '123456')
+    VALUES.release([unused])
+    reused = VALUES.intern(INT, '-5;6')
+    assert reused == unused
+    assert (VALUES.raw(reused), VALUES.value(reused), VALUES.json(reused)) == ('-5;6', (-5, 6), '[-5, 6]')
+    assert VALUES.intern(INT, '123456') != reused
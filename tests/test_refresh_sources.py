@@ -0,0 +1,82 @@
+import asyncio
+
+from upstream_stub import UpstreamStub
+
+import config
+from core.flag_fetcher import FlagFetcher
+from core.flag_service import FlagService
+from utils.file_watcher import file_signature
+
+
+def test_failing_source_is_stale_without_failing_the_refresh(service, monkeypatch):
+    monkeypatch.setattr(service._fetcher._http, 'retries', 0)
+    # A supervisor worker following what this service publishes.
+    monkeypatch.setattr(FlagService, '_instance', None)
+    follower = FlagService.instance()
+    follower.follower = True
+
+    async def scenario():
+        stub = UpstreamStub(github_flags=200, client_flags=20)
+        url = await stub.start()
+        monkeypatch.setattr(FlagFetcher, 'GITHUB_URL', f"{url}/FVariables.txt")
+        monkeypatch.setattr(FlagFetcher, 'BASE_URL', f"{url}/v2/settings/application")
+        steps = {}
+
+        def step(name):
+            stats = service.refresh_stats
+            follower.follow_snapshot()
+            steps[name] = {
+                'generation': service.generation,
+                'failures': stats.consecutive_failures,
+                'error': stats.last_error,
+                'stale': sorted(app_id for app_id, status in service.snapshot.sources.items() if status.stale),
+                'file': file_signature(config.SNAPSHOT_PATH),
+                'sources': service.snapshot.sources,
+                'followed': (follower.generation, follower.snapshot.sources),
+            }
+
+        try:
+            await service.update_cache()
+            step('ok')
+            # From now on one client is gone for good.
+            del stub._clients['AndroidApp']
+            await asyncio.sleep(0.01)
+            await service.update_cache()
+            step('android gone')
+            await asyncio.sleep(0.01)
+            await service.update_cache()
+            step('android still gone')
+            stub.error_rate = 1.0
+            await service.update_cache()
+            step('all down')
+        finally:
+            await service.close()
+            await follower.close()
+            await stub.stop()
+        return steps
+
+    steps = asyncio.run(scenario())
+
+    ok, gone, still_gone, down = (steps[name] for name in ('ok', 'android gone', 'android still gone', 'all down'))
+    assert ok['failures'] == 0 and ok['stale'] == [] and ok['file'] is not None
+
+    # Partial progress is a successful refresh with a stale source.
+    assert gone['failures'] == 0 and gone['error'] is None
+    assert gone['stale'] == ['AndroidApp']
+    assert still_gone['failures'] == 0 and still_gone['stale'] == ['AndroidApp']
+
+    # No source verified at all: now the refresh fails and backs off.
+    assert down['failures'] == 1
+    assert down['error'].startswith('Serving stale data for')
+    assert down['stale'] == sorted(service.snapshot.apps)
+
+    # The data never changed, so neither did the snapshot file, but every
+    # refresh's source statuses, fresher verification times included,
+    # reached the follower.
+    for step in (gone, still_gone, down):
+        assert step['generation'] == ok['generation']
+        assert step['file'] == ok['file']
+    for step in (ok, gone, still_gone, down):
+        assert step['followed'] == (step['generation'], step['sources'])
+    pc = [step['sources']['PCDesktopClient'].verified_at for step in (ok, gone, still_gone)]
+    assert pc[0] < pc[1] < pc[2]
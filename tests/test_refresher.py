@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from core.refresher import CacheRefresher
+
+
+@pytest.fixture
+def refresher(service, monkeypatch):
+    monkeypatch.setattr(CacheRefresher, '_instance', None)
+    refresher = CacheRefresher.instance()
+    refresher.interval, refresher.retry_min, refresher.retry_max = 300, 5, 60
+    return refresher
+
+
+def test_next_delay_backs_off_exponentially_up_to_the_cap(refresher):
+    refresher.jitter = 0
+    assert [refresher.next_delay(failures) for failures in range(7)] == [300, 5, 10, 20, 40, 60, 60]
+
+
+def test_next_delay_jitter_stays_in_bounds(refresher):
+    refresher.jitter = 0.1
+    for failures, base in ((0, 300), (2, 10)):
+        delays = [refresher.next_delay(failures) for _ in range(200)]
+        assert all(base * 0.9 <= delay <= base * 1.1 for delay in delays)
+        assert len(set(delays)) > 1
+
+
+def test_next_delay_never_drops_below_a_second(refresher):
+    refresher.jitter, refresher.retry_min = 0.5, 0.1
+    assert min(refresher.next_delay(1) for _ in range(100)) == 1.0
+
+
+def test_failed_refreshes_schedule_backoff_delays(service, refresher, monkeypatch):
+    requested = []
+
+    outcomes = iter(['down', 'down', None, 'down'])
+
+    async def update_cache():
+        stats = service._refresh_stats
+        error = next(outcomes, None)
+        stats.consecutive_failures = stats.consecutive_failures + 1 if error else 0
+        if error:
+            raise RuntimeError(error)
+
+    def next_delay(failures):
+        requested.append(failures)
+        return 0.0
+
+    monkeypatch.setattr(service, 'update_cache', update_cache)
+    monkeypatch.setattr(refresher, 'next_delay', next_delay)
+
+    async def scenario():
+        refresher.start(initial_delay=0)
+        while len(requested) < 4:
+            await asyncio.sleep(0)
+        await refresher.stop()
+
+    asyncio.run(scenario())
+
+    # Each delay follows the failure count the last refresh left behind,
+    # and the loop keeps going through failed refreshes.
+    assert requested[:4] == [1, 2, 0, 1]
+    assert not refresher.running
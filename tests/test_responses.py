@@ -0,0 +1,79 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+
+from api import handlers
+from core.response_cache import ENCODING_PREFERENCE, etag_matches, negotiate_encoding
+
+AVAILABLE = ('gzip', 'identity')
+
+
+@pytest.mark.parametrize('accept_encoding, expected', [
+    (None, 'identity'),
+    ('', 'identity'),
+    ('gzip', 'gzip'),
+    ('GZIP, deflate', 'gzip'),
+    ('deflate', 'identity'),
+    ('gzip;q=0', 'identity'),
+    ('gzip;q=0.5, identity;q=0.8', 'identity'),
+    ('gzip;q=0.9, identity;q=0.8', 'gzip'),
+    ('*', 'gzip'),
+    ('*;q=0, identity', 'identity'),
+    ('gzip;q=bogus', 'identity'),
+])
+def test_negotiate_encoding(accept_encoding, expected):
+    assert negotiate_encoding(accept_encoding, AVAILABLE) == expected
+
+
+def test_negotiate_encoding_prefers_the_server_order_on_ties():
+    assert negotiate_encoding('identity, gzip', AVAILABLE) == 'gzip'
+    assert negotiate_encoding('*', ENCODING_PREFERENCE) == ENCODING_PREFERENCE[0]
+    assert negotiate_encoding('gzip, br, zstd', ('identity',)) == 'identity'
+
+
+def test_etag_matches():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('"x", W/"abc"', '"abc"')
+    assert etag_matches('*', '"abc"')
+    assert not etag_matches('"abc-gzip"', '"abc"')
+    assert not etag_matches(None, '"abc"')
+
+
+def test_application_flags_are_negotiated_and_revalidated(service):
+    service.build_cache({'PCDesktopClient': {'applicationSettings': {'FFlagServed': 'True', 'DFIntServed': '12'}}})
+
+    body, status, headers = asyncio.run(handlers.get_application_flags('PCDesktopClient', 'gzip'))
+    assert status == 200
+    assert headers['Content-Encoding'] == 'gzip' and headers['Vary'] == 'Accept-Encoding'
+    flags = json.loads(gzip.decompress(body))['flags']
+    assert [(flag['name'], flag['value']) for flag in flags] == [('FFlagServed', True), ('DFIntServed', 12)]
+    gzip_etag = headers['ETag']
+
+    plain, status, headers = asyncio.run(handlers.get_application_flags('PCDesktopClient'))
+    assert status == 200 and 'Content-Encoding' not in headers
+    assert json.loads(plain) == json.loads(gzip.decompress(body))
+    # Each representation has its own validator.
+    identity_etag = headers['ETag']
+    assert identity_etag != gzip_etag
+
+    body, status, headers = asyncio.run(handlers.get_application_flags('PCDesktopClient', 'gzip', gzip_etag))
+    assert (body, status) == (b'', 304)
+    assert headers['ETag'] == gzip_etag and 'Content-Type' not in headers
+    _, status, _ = asyncio.run(handlers.get_application_flags('PCDesktopClient', 'gzip', identity_etag))
+    assert status == 200
+
+    # New data, new validator.
+    service.build_cache({'PCDesktopClient': {'applicationSettings': {'FFlagServed': 'False', 'DFIntServed': '12'}}})
+    _, status, headers = asyncio.run(handlers.get_application_flags('PCDesktopClient', 'gzip', gzip_etag))
+    assert status == 200 and headers['ETag'] != gzip_etag
+
+
+def test_unknown_application_is_a_bad_request(service):
+    service.build_cache({'PCDesktopClient': {'applicationSettings': {'FFlagServed': 'True'}}})
+
+    payload, status = asyncio.run(handlers.get_application_flags('Toaster', 'gzip'))
+
+    assert status == 400
+    assert payload['error'] == 'Invalid application ID: Toaster'
@@ -0,0 +1,68 @@
+import asyncio
+
+import config
+from api import handlers
+from core import search_index
+
+NAMES = ['FFlagRenderFast', 'FFlagRender', 'DFFlagDebugFFlagRender', 'FFlagRenderSlow', 'FIntRenderLevel',
+         'FFlagPhysicsStep', 'DFIntTaskSchedulerTargetFps']
+
+
+def build(service, names=NAMES):
+    service.build_cache({
+        'PCDesktopClient': {'applicationSettings': {name: 'True' for name in names}},
+        'MacDesktopClient': {'applicationSettings': {'FFlagRender': 'True'}},
+    })
+
+
+def search(query, offset=None, limit=None):
+    payload, status = asyncio.run(handlers.search_flags(query, offset, limit))
+    assert status == 200, payload
+    return payload
+
+
+def test_results_are_ranked_exact_prefix_substring_fuzzy(service):
+    build(service)
+
+    payload = search('fflagrender')
+    assert [(result['name'], result['match']) for result in payload['results']] == [
+        ('FFlagRender', 'exact'),
+        ('FFlagRenderFast', 'prefix'),
+        ('FFlagRenderSlow', 'prefix'),
+        ('DFFlagDebugFFlagRender', 'substring'),
+    ]
+    assert payload['results'][0]['applications'] == ['PCDesktopClient', 'MacDesktopClient']
+    assert payload['has_more'] is False
+
+    # A typo only matches through shared trigrams.
+    [first, *_] = search(' FFlagRendrFast ')['results']
+    assert (first['name'], first['match']) == ('FFlagRenderFast', 'fuzzy')
+    assert search('zzzzzz')['results'] == []
+
+
+def test_pages_report_has_more(service):
+    build(service)
+
+    pages = [search('render', offset, '2') for offset in ('0', '2', '4')]
+
+    assert [page['has_more'] for page in pages] == [True, True, False]
+    names = [result['name'] for page in pages for result in page['results']]
+    assert names == [result['name'] for result in search('render', limit='10')['results']]
+    assert len(names) == 5 and len(set(names)) == 5
+
+
+def test_substring_scan_matches_the_posting_path(service, monkeypatch):
+    build(service)
+    expected = search('render')['results']
+
+    monkeypatch.setattr(search_index, 'SUBSTRING_MAX_POSTING', 0)
+    build(service, NAMES + ['FFlagUnrelated'])
+
+    assert search('render')['results'] == expected
+
+
+def test_bad_queries_are_rejected(service):
+    build(service)
+    for args in (('',), ('   ',), ('x' * (config.SEARCH_MAX_QUERY_LENGTH + 1),), ('render', '-1'), ('render', '0', 'ten')):
+        _, status = asyncio.run(handlers.search_flags(*args))
+        assert status == 400
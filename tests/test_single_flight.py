@@ -0,0 +1,111 @@
+import asyncio
+
+from upstream_stub import UpstreamStub
+
+import config
+from api import handlers
+from core.flag_fetcher import FlagFetcher
+from utils.single_flight import SingleFlight
+
+TOKEN = 'test-admin-token'
+
+
+def test_overlapping_runs_share_one_outcome():
+    flight = SingleFlight()
+    runs = []
+
+    async def work(result):
+        runs.append(result)
+        await asyncio.sleep(0.01)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def scenario():
+        shared = await asyncio.gather(*(flight.run(lambda: work('first')) for _ in range(3)))
+        errors = await asyncio.gather(*(flight.run(lambda: work(RuntimeError('down'))) for _ in range(2)),
+                                      return_exceptions=True)
+        # A finished run is never reused.
+        after = await flight.run(lambda: work('second'))
+        return shared, errors, after
+
+    shared, errors, after = asyncio.run(scenario())
+
+    assert shared == [('first', False), ('first', True), ('first', True)]
+    assert [str(error) for error in errors] == ['down', 'down']
+    assert after == ('second', False)
+    assert [str(run) for run in runs] == ['first', 'down', 'second']
+    assert not flight.in_flight
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_run():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return 'done'
+
+    async def scenario():
+        first = asyncio.ensure_future(flight.run(work))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(flight.run(work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(scenario()) == ('done', True)
+
+
+def test_admin_refresh_requires_a_configured_token(service, monkeypatch):
+    monkeypatch.setattr(config, 'ADMIN_TOKEN', '')
+    payload, status = asyncio.run(handlers.admin_refresh(f"Bearer {TOKEN}"))
+    assert status == 404 and payload == {'error': 'Admin endpoints are disabled'}
+
+    monkeypatch.setattr(config, 'ADMIN_TOKEN', TOKEN)
+    for authorization in (None, '', TOKEN, 'Bearer wrong', f"Basic {TOKEN}"):
+        payload, status, headers = asyncio.run(handlers.admin_refresh(authorization))
+        assert status == 401 and payload == {'error': 'Unauthorized'}
+        assert headers == {'WWW-Authenticate': 'Bearer'}
+
+
+def test_concurrent_refreshes_fetch_upstream_once(service, monkeypatch):
+    monkeypatch.setattr(config, 'ADMIN_TOKEN', TOKEN)
+    monkeypatch.setattr(service._fetcher._http, 'retries', 0)
+
+    async def scenario():
+        stub = UpstreamStub(github_flags=50, client_flags=5, latency=0.05)
+        url = await stub.start()
+        monkeypatch.setattr(FlagFetcher, 'GITHUB_URL', f"{url}/FVariables.txt")
+        monkeypatch.setattr(FlagFetcher, 'BASE_URL', f"{url}/v2/settings/application")
+        try:
+            admin = asyncio.ensure_future(handlers.admin_refresh(f"bearer {TOKEN}"))
+            await asyncio.sleep(0)
+            others = await asyncio.gather(service.update_cache(), service.update_cache(),
+                                          handlers.admin_refresh(f"Bearer {TOKEN}"))
+            return await admin, others, dict(stub.requests)
+        finally:
+            await service.close()
+            await stub.stop()
+
+    (first, status), (generation, again, (joined, joined_status)), requests = asyncio.run(scenario())
+
+    assert status == joined_status == 200
+    assert first == {'success': True, 'generation': service.generation, 'joined': False}
+    assert joined == {'success': True, 'generation': service.generation, 'joined': True}
+    assert generation == again == service.generation
+    # One round of upstream requests: FVariables.txt and each client once.
+    assert requests and set(requests.values()) == {1}
+
+
+def test_failed_admin_refresh_is_a_bad_gateway(service, monkeypatch):
+    monkeypatch.setattr(config, 'ADMIN_TOKEN', TOKEN)
+
+    async def failing():
+        raise RuntimeError('upstream down')
+
+    monkeypatch.setattr(service._fetcher, 'fetch_all_flags', failing)
+
+    payload, status = asyncio.run(handlers.admin_refresh(f"Bearer {TOKEN}"))
+
+    assert status == 502
+    assert payload == {'error': 'Refresh failed: upstream down', 'generation': service.generation}
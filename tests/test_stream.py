@@ -0,0 +1,103 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from api import handlers
+from core.update_broadcaster import UpdateBroadcaster
+
+
+@pytest.fixture
+def broadcaster(service, monkeypatch):
+    monkeypatch.setattr(UpdateBroadcaster, '_instance', None)
+    return UpdateBroadcaster.instance()
+
+
+def app_data(**settings):
+    return {'PCDesktopClient': {'applicationSettings': settings}}
+
+
+def parse(message: bytes) -> dict:
+    fields = dict(line.split(': ', 1) for line in message.decode().strip().split('\n'))
+    return {'event': fields['event'], 'id': fields.get('id'), 'data': json.loads(fields['data'])}
+
+
+async def next_message(stream) -> dict:
+    return parse(await asyncio.wait_for(stream.__anext__(), 2))
+
+
+def test_resume_from_last_event_id_replays_missed_diffs(service, broadcaster):
+    service.build_cache(app_data(FFlagStream='True'))
+    last_seen = service.generation
+    service.build_cache(app_data(FFlagStream='False'))
+    service.build_cache(app_data(FFlagStream='False', DFIntStream='3'))
+
+    async def scenario():
+        stream, status, headers = await handlers.stream_updates(diff=True, last_event_id=str(last_seen))
+        assert status == 200 and headers['Content-Type'] == 'text/event-stream'
+        assert await stream.__anext__() == b'retry: 5000\n\n'
+        messages = [await next_message(stream), await next_message(stream)]
+        await stream.aclose()
+        return messages
+
+    first, second = asyncio.run(scenario())
+
+    assert (first['event'], first['id']) == ('snapshot', str(last_seen + 1))
+    assert first['data']['changes'] == {'PCDesktopClient': {
+        'added': {}, 'removed': [], 'changed': {'FFlagStream': {'old': True, 'new': False}}
+    }}
+    assert first['data']['etags'] is None
+    assert (second['event'], second['id']) == ('snapshot', str(last_seen + 2))
+    assert second['data']['changes']['PCDesktopClient']['added'] == {'DFIntStream': 3}
+    # Only the current generation's event carries etags.
+    assert set(second['data']['etags']) == set(service.snapshot.responses)
+
+
+def test_resume_from_an_unknown_generation_asks_for_a_resync(service, broadcaster):
+    service.build_cache(app_data(FFlagStream='True'))
+
+    async def scenario():
+        stream, _, _ = await handlers.stream_updates(diff=True, last_event_id=str(service.generation + 10))
+        await stream.__anext__()
+        message = await next_message(stream)
+        await stream.aclose()
+        return message
+
+    message = asyncio.run(scenario())
+    assert message['event'] == 'resync'
+    assert message['data'] == {'generation': service.generation}
+
+
+def test_publishes_are_pushed_in_order_without_blocking_the_loop(service, broadcaster, monkeypatch):
+    service.build_cache(app_data(FFlagStream='True'))
+    import core.update_broadcaster as update_broadcaster
+    build = update_broadcaster.StreamEvent
+
+    def slow_event(snapshot, diff):
+        # Stands in for rendering a lazily loaded snapshot's responses.
+        time.sleep(0.2)
+        return build(snapshot, diff)
+
+    monkeypatch.setattr(update_broadcaster, 'StreamEvent', slow_event)
+
+    async def scenario():
+        stream, _, _ = await handlers.stream_updates('PCDesktopClient')
+        await stream.__anext__()
+        current = await next_message(stream)
+        started = time.perf_counter()
+        service.build_cache(app_data(FFlagStream='False'))
+        service.build_cache(app_data(FFlagStream='True'))
+        # The loop is free while both events are built.
+        await asyncio.sleep(0.01)
+        responsive = time.perf_counter() - started
+        messages = [await next_message(stream), await next_message(stream)]
+        await stream.aclose()
+        return current, responsive, messages
+
+    current, responsive, messages = asyncio.run(scenario())
+
+    generation = current['data']['generation']
+    assert responsive < 0.15
+    assert [message['id'] for message in messages] == [str(generation + 1), str(generation + 2)]
+    assert list(messages[1]['data']['etags']) == ['PCDesktopClient']
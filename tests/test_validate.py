@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from api import handlers
+from core.flag_values import BOOL, INT, STRING, value_error
+
+
+@pytest.mark.parametrize('value', ['0', '-12', '2147483647', '-2147483648', '1;2;3', 250, -1])
+def test_int_values_the_client_parses(value):
+    assert value_error(INT, value) is None
+
+
+@pytest.mark.parametrize('value', ['1_000', ' 12 ', '+5', '١٢', '1;;2', '1;', ';', '', '1.5', '0x10', True])
+def test_int_values_the_client_rejects(value):
+    assert value_error(INT, value) == 'expected an integer'
+
+
+def test_int_range_and_other_kinds():
+    assert value_error(INT, '2147483648') == 'integer out of 32-bit range'
+    assert value_error(INT, '1;-2147483649') == 'integer out of 32-bit range'
+    assert value_error(BOOL, 'TRUE') is None and value_error(BOOL, False) is None
+    assert value_error(BOOL, 'yes') == 'expected true or false'
+    assert value_error(STRING, 'anything') is None and value_error(STRING, 5) == 'expected a string'
+
+
+def test_validate_verdicts(service, lists):
+    lists(['FFlagRisky'], ['FFlagAllowed'])
+    service.build_cache({'PCDesktopClient': {'applicationSettings': {
+        'FFlagOnPc': 'True', 'DFIntOnPc': '5', 'FFlagRisky': 'False'
+    }}})
+
+    payload, status = asyncio.run(handlers.validate_profile({
+        'FFlagOnPc': 'false',
+        'DFIntOnPc': '1_000',
+        'FFlagRisky': 'True',
+        'FFlagAllowed': 'True',
+        'FFlagNowhere': 'True',
+        'NotAFlag': 'True',
+    }))
+
+    assert status == 200
+    assert payload['verdicts'] == {
+        'FFlagOnPc': 'valid',
+        'DFIntOnPc': 'invalid_value',
+        'FFlagRisky': 'risk',
+        'FFlagAllowed': 'whitelisted',
+        'FFlagNowhere': 'unknown',
+        'NotAFlag': 'invalid_name',
+    }
+    assert payload['errors'] == {'DFIntOnPc': 'expected an integer'}
+    assert payload['valid'] is False
+
+
+def test_validate_wrapped_form_only_with_its_own_keys(service):
+    service.build_cache({'PCDesktopClient': {'applicationSettings': {'FFlagOnPc': 'True'}}})
+
+    payload, status = asyncio.run(handlers.validate_profile({
+        'flags': {'FFlagOnPc': 'True'}, 'applications': ['MacDesktopClient']
+    }))
+    assert status == 200 and payload['verdicts'] == {'FFlagOnPc': 'unknown'}
+
+    # A bare profile that happens to have a "flags" object is still bare.
+    payload, status = asyncio.run(handlers.validate_profile({
+        'flags': {'FFlagOnPc': 'True'}, 'FFlagOnPc': 'True'
+    }))
+    assert status == 200
+    assert payload['verdicts'] == {'flags': 'invalid_name', 'FFlagOnPc': 'valid'}
@@ -0,0 +1,107 @@
+import json
+import os
+import subprocess
+import sys
+
+import config
+from core.flag_service import FlagService
+from core.flag_table import NAMES
+from core.flag_values import VALUES
+from core.snapshot_store import _HEADER, load_snapshot
+
+from conftest import ROOT
+
+RISKY = 'FFlagRiskyRender'
+RISKY_ELSEWHERE = 'FFlagRiskyNowhere'
+ALLOWED = 'DFIntAllowedFps'
+
+# Runs in a fresh interpreter, so the name table starts out empty the way it
+# does in a restarted server or a new supervisor worker, which then follows
+# the refresher's next generation.
+CHILD = '''
+import asyncio
+import json
+import sys
+
+import config
+config.RISK_LIST_PATH, config.WHITELIST_PATH, first, second = sys.argv[1:]
+
+from core.flag_service import FlagService
+
+service = FlagService.instance()
+
+def mapped():
+    apps = service.snapshot.apps.values()
+    return bool(apps) and all(isinstance(flags.ids, memoryview) for flags in apps)
+
+def risky():
+    result = asyncio.run(service.check_flags(%r, ['PCDesktopClient']))
+    return sorted(result.risk)
+
+config.SNAPSHOT_PATH = first
+assert service.load_snapshot()
+loaded = {'mapped': mapped(), 'risk': risky()}
+config.SNAPSHOT_PATH = second
+service.follow_snapshot()
+followed = {'mapped': mapped(), 'risk': risky(), 'generation': service.generation}
+print(json.dumps({'loaded': loaded, 'followed': followed}))
+''' % ([RISKY, RISKY_ELSEWHERE, ALLOWED],)
+
+
+def test_warm_start_and_follow_with_lists_keep_the_mapped_arrays(tmp_path, monkeypatch):
+    service = FlagService.instance()
+    settings = {RISKY: 'True', ALLOWED: '60', 'FFlagPlainOne': 'False'}
+    flag_data = {'PCDesktopClient': {'applicationSettings': settings}}
+
+    first = str(tmp_path / 'first.snap')
+    monkeypatch.setattr(config, 'SNAPSHOT_PATH', first)
+    assert service.save_snapshot(service.build_cache(flag_data))
+
+    # The next generation adds a name, as a refresh would before a worker
+    # follows it.
+    second = str(tmp_path / 'second.snap')
+    monkeypatch.setattr(config, 'SNAPSHOT_PATH', second)
+    settings['FFlagPlainTwo'] = 'True'
+    snapshot = service.build_cache(flag_data)
+    assert service.save_snapshot(snapshot)
+
+    risk_path, whitelist_path = tmp_path / 'risklist.json', tmp_path / 'whitelist.json'
+    risk_path.write_text(json.dumps([RISKY, RISKY_ELSEWHERE]))
+    whitelist_path.write_text(json.dumps([ALLOWED]))
+
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD, str(risk_path), str(whitelist_path), first, second],
+        cwd=ROOT, env=dict(os.environ, PYTHONPATH=os.path.join(ROOT, 'src')),
+        check=True, capture_output=True, text=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+
+    assert result['loaded'] == {'mapped': True, 'risk': sorted([RISKY, RISKY_ELSEWHERE])}
+    assert result['followed'] == {
+        'mapped': True,
+        'risk': sorted([RISKY, RISKY_ELSEWHERE]),
+        'generation': snapshot.generation
+    }
+
+
+def test_snapshot_file_holds_only_what_the_snapshot_uses(service):
+    for generation in range(3):
+        service.build_cache({'PCDesktopClient': {'applicationSettings': {
+            **{f"FFlagDense{generation}N{i}": 'True' for i in range(50)},
+            **{f"DFIntDense{generation}N{i}": str(generation * 1000 + i) for i in range(20)},
+        }}})
+    snapshot = service.snapshot
+    assert service.save_snapshot(snapshot)
+
+    with open(config.SNAPSHOT_PATH, 'rb') as f:
+        _, _, _, name_count, _, value_count, *_ = _HEADER.unpack(f.read(_HEADER.size))
+    used_values = set(snapshot.apps['PCDesktopClient'].values)
+    assert name_count == 70 < len(NAMES)
+    assert value_count == len(used_values) < len(VALUES)
+
+    stored = load_snapshot(config.SNAPSHOT_PATH)
+    [(app_id, flags)] = stored.apps.items()
+    assert app_id == 'PCDesktopClient'
+    assert [(flag.name, flag.value) for flag in flags] == [
+        (flag.name, flag.value) for flag in snapshot.apps['PCDesktopClient']
+    ]
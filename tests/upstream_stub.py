@@ -0,0 +1,137 @@
+import asyncio
+import hashlib
+import json
+import random
+from typing import Dict, Optional, Tuple
+
+from aiohttp import web
+
+from config import VALID_APPLICATIONS
+from core.fvariables import FLAG_PREFIXES, default_value
+
+# Local stand-in for clientsettings.roblox.com and the FVariables.txt raw
+# file, with injectable latency and failures. Point FlagFetcher.BASE_URL at
+# f"{stub.url}/v2/settings/application" and GITHUB_URL at f"{stub.url}/FVariables.txt".
+# The benchmarks serve their own synthetic data through `data`.
+
+CLIENTS = [app_id for app_id in VALID_APPLICATIONS if app_id != 'ALL']
+
+
+def stub_data(github_flags: int, client_flags: int, seed: int = 1) -> Tuple[bytes, Dict[str, dict]]:
+    # FVariables.txt and flag data shaped like FlagFetcher.fetch_all_flags():
+    # GitHub defaults under ALL, each client's overrides merged on top.
+    rng = random.Random(seed)
+    names = [f"{FLAG_PREFIXES[i % len(FLAG_PREFIXES)]}Stub{i}" for i in range(github_flags)]
+    fvariables = "".join(f"[C++] {name}\n" for name in names).encode()
+    github = {name: default_value(name) for name in names}
+    flag_data = {'ALL': {'applicationSettings': dict(github)}}
+    for client in CLIENTS:
+        settings = dict(github)
+        for name in rng.sample(names, min(client_flags, len(names))):
+            if name.startswith(('DFInt', 'FInt')):
+                settings[name] = str(rng.randint(1, 10000))
+            elif name.startswith(('DFString', 'FString')):
+                settings[name] = f"value{rng.randint(0, 99)}"
+            else:
+                settings[name] = 'True'
+        flag_data[client] = {'applicationSettings': settings}
+    return fvariables, flag_data
+
+
+class UpstreamStub:
+    def __init__(self, github_flags: int = 5000, client_flags: int = 500, latency: float = 0.0,
+                 error_rate: float = 0.0, stall_rate: float = 0.0, stall: float = 5.0,
+                 reset_rate: float = 0.0, seed: int = 1, conditional: bool = False,
+                 data: Optional[Tuple[bytes, Dict[str, dict]]] = None):
+        self.latency = latency
+        self.error_rate = error_rate  # answered with 503
+        self.stall_rate = stall_rate  # headers sent, then the body stalls for `stall` seconds
+        self.stall = stall
+        self.reset_rate = reset_rate  # connection dropped without a response
+        self.fail_next = 0  # this many upcoming requests get a 503, whatever the rates
+        # Send ETag / Last-Modified and answer matching conditional GETs with 304
+        self.conditional = conditional
+        self.last_modified = 'Wed, 21 Oct 2015 07:28:00 GMT'
+        self.requests: Dict[str, int] = {}
+        self.not_modified = 0
+        # path -> request headers of the latest request for it
+        self.headers_seen: Dict[str, Dict[str, str]] = {}
+        self._rng = random.Random(seed)
+        self._fvariables, flag_data = data if data is not None else stub_data(github_flags, client_flags, seed)
+        self._clients = {
+            client: {'applicationSettings': {
+                name: value for name, value in flag_data[client]['applicationSettings'].items()
+                if value != flag_data['ALL']['applicationSettings'].get(name)
+            }}
+            for client in flag_data if client != 'ALL'
+        }
+        self._runner: Optional[web.AppRunner] = None
+        self.url = ''
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        app = web.Application()
+        app.router.add_get('/FVariables.txt', self._fvariables_handler)
+        app.router.add_get('/v2/settings/application/{client}', self._client_handler)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+        self._runner = None
+
+    async def _fault(self, request: web.Request) -> Optional[web.StreamResponse]:
+        self.requests[request.path] = self.requests.get(request.path, 0) + 1
+        self.headers_seen[request.path] = dict(request.headers)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if self.fail_next:
+            self.fail_next -= 1
+            return web.Response(status=503, headers={'Retry-After': '0'})
+        roll = self._rng.random()
+        if roll < self.error_rate:
+            return web.Response(status=503, headers={'Retry-After': '0'})
+        roll -= self.error_rate
+        if roll < self.reset_rate:
+            request.transport.close()
+            return web.Response(status=500)
+        roll -= self.reset_rate
+        if roll < self.stall_rate:
+            response = web.StreamResponse()
+            await response.prepare(request)
+            await response.write(b'[C++] ')
+            await asyncio.sleep(self.stall)
+            return response
+        return None
+
+    async def _fvariables_handler(self, request: web.Request) -> web.StreamResponse:
+        # Responses are mappings, falsy when empty, so compare with None
+        fault = await self._fault(request)
+        if fault is not None:
+            return fault
+        return self._respond(request, self._fvariables, 'text/plain')
+
+    async def _client_handler(self, request: web.Request) -> web.StreamResponse:
+        client = request.match_info['client']
+        fault = await self._fault(request)
+        if fault is not None:
+            return fault
+        if client not in self._clients:
+            return web.Response(status=404)
+        return self._respond(request, json.dumps(self._clients[client]).encode(), 'application/json')
+
+    def _respond(self, request: web.Request, body: bytes, content_type: str) -> web.Response:
+        if not self.conditional:
+            return web.Response(body=body, content_type=content_type)
+        headers = {'ETag': f'"{hashlib.sha1(body).hexdigest()[:16]}"', 'Last-Modified': self.last_modified}
+        if (request.headers.get('If-None-Match') == headers['ETag']
+                or request.headers.get('If-Modified-Since') == self.last_modified):
+            self.not_modified += 1
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=body, content_type=content_type, headers=headers)